@@ -7,21 +7,59 @@ from telebot import TeleBot  # Add this import
 PROJECT_ROOT = Path(__file__).resolve().parent
 sys.path.append(str(PROJECT_ROOT))
 
-from telegram_bot.src.config.settings import BOT_TOKEN
+from telegram_bot.src.config.settings import (
+    BOT_TOKEN,
+    RUN_MODE,
+    ASYNC_EXECUTOR_WORKERS,
+    POLL_TIMEOUT,
+    WEBHOOK_URL,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_WORKERS,
+    ALLOWED_UPDATES
+)
 from telegram_bot.src.handlers.admin_handler import AdminHandler
 from telegram_bot.src.handlers.user_handler import UserHandler
 from telegram_bot.src.utils import utils
 
 def main():
     try:
-        bot = TeleBot(BOT_TOKEN, parse_mode=None)
+        # In async mode handlers run inline on the engine's worker threads
+        bot = TeleBot(BOT_TOKEN, parse_mode=None, threaded=RUN_MODE == "polling")
         
+        # Create and migrate the schema before any handler touches the database
+        utils.db.setup()
+
         # Initialize handlers
         admin_handler = AdminHandler(bot, utils.db, utils.logger)
         user_handler = UserHandler(bot, utils.db, utils.logger)
         
-        utils.logger.info("Bot starting...")
-        bot.infinity_polling(timeout=60)
+        utils.db.start()
+        utils.logger.info(f"Bot starting ({RUN_MODE} mode)...")
+        if RUN_MODE in ("async", "webhook"):
+            from telegram_bot.src.utils.async_engine import AsyncEngine
+            engine = AsyncEngine(
+                bot,
+                executor_workers=ASYNC_EXECUTOR_WORKERS,
+                poll_timeout=POLL_TIMEOUT
+            )
+            engine.allowed_updates = ALLOWED_UPDATES
+            if RUN_MODE == "webhook":
+                from telegram_bot.src.utils.webhook_server import WebhookServer
+                WebhookServer(
+                    engine,
+                    WEBHOOK_SECRET,
+                    host=WEBHOOK_HOST,
+                    port=WEBHOOK_PORT,
+                    path=WEBHOOK_PATH,
+                    workers=WEBHOOK_WORKERS
+                ).run(WEBHOOK_URL)
+            else:
+                engine.run()
+        else:
+            bot.infinity_polling(timeout=POLL_TIMEOUT, allowed_updates=ALLOWED_UPDATES)
         
     except Exception as e:
         utils.logger.error(f"Bot crashed: {str(e)}")
@@ -0,0 +1,35 @@
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from ..src.config import config
+from ..src.utils.database import Database
+
+@contextmanager
+def temp_database(**overrides):
+    """Yield a Database on a throwaway file, with config attributes overridden while it is open"""
+    with tempfile.TemporaryDirectory() as directory:
+        overrides = dict(overrides, DB_PATH=str(Path(directory) / 'bench.db'), BACKUP_DIR=Path(directory) / 'backups')
+        saved = {name: getattr(config, name) for name in overrides}
+        for name, value in overrides.items():
+            setattr(config, name, value)
+        try:
+            db = Database()
+            db.setup()
+            yield db
+            db.close()
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+
+@contextmanager
+def timed(label: str, count: int = None):
+    """Print the time taken by the block, and the rate when count is given"""
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    rate = f", {count / elapsed:,.0f}/s" if count else ''
+    print(f"{label}: {elapsed:.3f}s{rate}")
+
+# Export
+__all__ = ['temp_database', 'timed']
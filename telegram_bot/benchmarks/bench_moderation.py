@@ -0,0 +1,59 @@
+"""Keyword matching cost as the moderation lexicon grows.
+
+Run with ``python -m telegram_bot.benchmarks.bench_moderation``. Times
+``Lexicon.find`` over a fixed sample of chat messages for lexicons of
+increasing size, next to the ``any(keyword in text)`` scan it replaced.
+The automaton's cost per message should stay flat while the scan grows
+with the number of terms.
+"""
+import argparse
+import random
+import string
+import time
+from ..src.utils.moderation import Lexicon, normalize_text
+
+def make_terms(rng: random.Random, count: int) -> list:
+    terms = set()
+    while len(terms) < count:
+        terms.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+    return sorted(terms)
+
+def make_messages(rng: random.Random, count: int) -> list:
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 8))) for _ in range(2000)]
+    return [' '.join(rng.choices(words, k=rng.randint(3, 40))) for _ in range(count)]
+
+def per_message(check, messages) -> float:
+    count = 0
+    started = time.perf_counter()
+    for message in messages:
+        check(message)
+        count += 1
+    return (time.perf_counter() - started) / count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 50000])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--scan-limit', type=int, default=10000, help='largest lexicon to time the plain scan on')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = make_messages(rng, args.messages)
+    print(f"{args.messages} messages, average {sum(map(len, messages)) / len(messages):.0f} characters")
+    print(f"{'terms':>7} {'build ms':>9} {'automaton us':>13} {'scan us':>9}")
+    for size in args.sizes:
+        terms = make_terms(rng, size)
+        started = time.perf_counter()
+        lexicon = Lexicon(terms)
+        build = time.perf_counter() - started
+        automaton = per_message(lexicon.find, messages)
+        scan = '-'
+        if size <= args.scan_limit:
+            scan_terms = [normalize_text(term) for term in terms]
+            cost = per_message(lambda text: any(term in text for term in scan_terms), map(normalize_text, messages))
+            scan = f"{cost * 1e6:.1f}"
+        print(f"{size:>7} {build * 1000:>9.1f} {automaton * 1e6:>13.1f} {scan:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Full-text search latency over a synthetic corpus of saved conversations.
+
+Run with ``python -m telegram_bot.benchmarks.bench_search``. Builds
+100k saved conversations (20 per user, the premium limit) through the
+same code path as ``Database.save_conversation``, then times
+``Database.search_conversations`` for frequent words, rare words and
+prefixes, on the first page and a later one. A LIKE scan over the
+user's messages is timed as the baseline the FTS5 index replaces.
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+from sqlalchemy import text
+from . import temp_database, timed
+from ..src.models.user import User
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'da', 'fu', 'gi', 'ho', 'ja', 'pe']
+
+def make_vocabulary(size: int) -> list:
+    words = (''.join(parts) for parts in itertools.product(SYLLABLES, repeat=3))
+    return list(itertools.islice(words, size))
+
+def make_conversation(rng: random.Random, vocabulary: list, weights: list) -> dict:
+    messages = []
+    for i in range(rng.randint(2, 10)):
+        words = rng.choices(vocabulary, weights, k=rng.randint(8, 40))
+        messages.append({'role': 'user' if i % 2 == 0 else 'assistant', 'content': ' '.join(words)})
+    return {'messages': messages}
+
+def build_corpus(db, conversations: int, per_user: int, vocabulary: list, seed: int):
+    rng = random.Random(seed)
+    # Zipf-like word frequencies, as in real text
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    users = -(-conversations // per_user)
+    session = db.Session()
+    try:
+        session.add_all(User(telegram_id=i) for i in range(1, users + 1))
+        session.commit()
+        for n in range(conversations):
+            telegram_id = n // per_user + 1
+            title = ' '.join(rng.choices(vocabulary, weights, k=3))
+            db._apply_save_conversation(session, telegram_id, title, make_conversation(rng, vocabulary, weights))
+            if n % 1000 == 999:
+                session.commit()
+        session.commit()
+    finally:
+        session.close()
+    return users
+
+def like_scan(db, telegram_id: int, query: str, limit: int) -> list:
+    session = db.ReadSession()
+    try:
+        return session.execute(text(
+            "SELECT m.conversation_id, m.seq FROM conversation_messages m "
+            "JOIN conversations c ON c.id = m.conversation_id JOIN users u ON u.id = c.user_id "
+            "WHERE u.telegram_id = :telegram_id AND m.content LIKE :pattern LIMIT :limit"
+        ), {'telegram_id': telegram_id, 'pattern': f'%{query}%', 'limit': limit}).all()
+    finally:
+        session.close()
+
+def measure(search, users: int, queries: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    latencies = []
+    hits = 0
+    for _ in range(queries):
+        started = time.perf_counter()
+        hits += bool(search(rng.randint(1, users)))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95)], hits / queries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conversations', type=int, default=100000)
+    parser.add_argument('--per-user', type=int, default=20)
+    parser.add_argument('--vocabulary', type=int, default=3000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(args.vocabulary)
+    cases = {
+        'frequent word': lambda db, user: db.search_conversations(user, vocabulary[0]),
+        'rare word': lambda db, user: db.search_conversations(user, vocabulary[-1]),
+        'two words': lambda db, user: db.search_conversations(user, f'{vocabulary[1]} {vocabulary[2]}'),
+        'prefix': lambda db, user: db.search_conversations(user, vocabulary[5][:4]),
+        'frequent, page 3': lambda db, user: db.search_conversations(user, vocabulary[0], offset=10),
+        'LIKE scan': lambda db, user: like_scan(db, user, vocabulary[-1], 5)
+    }
+
+    with temp_database() as db:
+        with timed(f"Indexed {args.conversations:,} conversations", args.conversations):
+            users = build_corpus(db, args.conversations, args.per_user, vocabulary, args.seed)
+        print(f"{'query':<18} {'p50 ms':>8} {'p95 ms':>8} {'hit rate':>9}")
+        for label, case in cases.items():
+            p50, p95, hit_rate = measure(lambda user: case(db, user), users, args.queries, args.seed)
+            print(f"{label:<18} {p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {hit_rate:>9.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Concurrent read/write throughput of each SQLite storage profile.
+
+Run with ``python -m telegram_bot.benchmarks.bench_storage``. Reader
+threads look up random users through ``Database.get_user`` (with the
+user cache disabled) while writer threads update random users through
+``Database.update_user``. 'legacy' is the rollback-journal profile the
+bot used before DB_STORAGE_PROFILE existed; 'wal' is the default.
+"""
+import argparse
+import random
+import threading
+import time
+from . import temp_database
+from ..src.config import config
+from ..src.models.user import User
+
+def seed_users(db, count: int):
+    session = db.Session()
+    try:
+        session.add_all(User(telegram_id=i, username=f'user{i}') for i in range(1, count + 1))
+        session.commit()
+    finally:
+        session.close()
+
+def run_profile(profile: str, users: int, readers: int, writers: int, seconds: float) -> dict:
+    with temp_database(DB_STORAGE_PROFILE=profile, USER_CACHE_TTL=0) as db:
+        seed_users(db, users)
+        stop = threading.Event()
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def work(kind: str):
+            done = errors = 0
+            while not stop.is_set():
+                telegram_id = random.randint(1, users)
+                try:
+                    if kind == 'reads':
+                        db.get_user(telegram_id)
+                    elif not db.update_user(telegram_id, {'message_count': random.randint(0, 1000)}):
+                        errors += 1
+                        continue
+                    done += 1
+                except Exception:
+                    errors += 1
+            with lock:
+                counts[kind] += done
+                counts['errors'] += errors
+
+        threads = [threading.Thread(target=work, args=('reads',)) for _ in range(readers)]
+        threads += [threading.Thread(target=work, args=('writes',)) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return {kind: value / seconds if kind != 'errors' else value for kind, value in counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', default=['legacy', 'wal'], choices=sorted(config.DB_STORAGE_PROFILES))
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.users} users, {args.seconds:g}s per profile")
+    print(f"{'profile':<8} {'reads/s':>10} {'writes/s':>10} {'errors':>7}")
+    for profile in args.profiles:
+        result = run_profile(profile, args.users, args.readers, args.writers, args.seconds)
+        print(f"{profile:<8} {result['reads']:>10,.0f} {result['writes']:>10,.0f} {result['errors']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -35,6 +35,84 @@ class Config:
         self.DB_PATH = str(self.DATA_DIR / 'bot_data.db')
         self.DB_BACKUP_INTERVAL = 12  # hours
         self.DB_BACKUP_RETENTION = 15  # days
+        self.DB_BACKUP_PAGES_PER_STEP = 1024
+        self.DB_BACKUP_STEP_SLEEP = 0.05  # seconds between page steps
+        self.DB_BACKUP_MAX_IN_MEMORY = 64 * 1024 * 1024  # bytes; larger databases go through a temporary copy
+        self.SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', '4'))  # threads running scheduled jobs
+        self.PREMIUM_EXPIRY_SWEEP_SECONDS = 600  # interval of the bulk expiry of lapsed subscriptions
+        
+        # SQLite storage profile (connection pragmas) and pool sizing
+        self.DB_STORAGE_PROFILE = os.getenv('DB_STORAGE_PROFILE', 'wal')
+        self.DB_STORAGE_PROFILES = {
+            "wal": {
+                "busy_timeout": 5000,  # ms
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "cache_size": -65536,  # 64MB
+                "mmap_size": 268435456,  # 256MB
+                "temp_store": "MEMORY"
+            },
+            "legacy": {
+                "busy_timeout": 5000,
+                "journal_mode": "DELETE",
+                "synchronous": "FULL"
+            }
+        }
+        self.DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '8'))
+        
+        # User cache configuration
+        self.USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+        self.USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))  # seconds
+        self.ENTITLEMENT_REFRESH_SECONDS = 300  # reload of the premium index, for changes by other workers
+        
+        # Write-behind (group commit) configuration
+        self.DB_WRITE_BEHIND = os.getenv('DB_WRITE_BEHIND', 'false').lower() == 'true'
+        self.DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', '100'))
+        self.DB_WRITE_FLUSH_MS = int(os.getenv('DB_WRITE_FLUSH_MS', '50'))
+        self.DB_WRITE_QUEUE_SIZE = int(os.getenv('DB_WRITE_QUEUE_SIZE', '10000'))
+        self.DB_WRITE_PUT_TIMEOUT = 5  # seconds before falling back to a direct write
+        
+        # Rate limiter state: 'memory' (per process) or 'sqlite' (shared by all workers on this host)
+        self.RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+        self.RATE_LIMIT_DB_PATH = str(self.DATA_DIR / 'rate_limits.db')
+        
+        # Active conversation store: memory budget and disk spill
+        self.SESSION_SPILL_PATH = str(self.DATA_DIR / 'sessions.db')
+        self.SESSION_MEMORY_BUDGET = int(os.getenv('SESSION_MEMORY_BUDGET', str(64 * 1024 * 1024)))  # bytes
+        self.SESSION_IDLE_TIMEOUT = 3600  # seconds before an idle conversation is spilled
+        
+        # Outbound message dispatcher (Telegram flood limits)
+        self.OUTBOUND_WORKERS = int(os.getenv('OUTBOUND_WORKERS', '4'))
+        self.OUTBOUND_GLOBAL_RATE = 30  # messages per second across all chats
+        self.OUTBOUND_CHAT_RATE = 1  # messages per second per chat
+        self.OUTBOUND_GROUP_RATE_PER_MINUTE = 20  # messages per minute per group
+        
+        # Group moderation lexicons: global.txt plus optional <chat_id>.txt files
+        self.MODERATION_LEXICON_DIR = Path(os.getenv('MODERATION_LEXICON_DIR', str(self.DATA_DIR / 'moderation')))
+        
+        # AI moderation of group messages, batched into one model call per window
+        self.MISTRAL_API_URL = os.getenv('MISTRAL_API_URL', 'https://api.mistral.ai/v1/chat/completions')
+        self.AI_MODERATION_ENABLED = os.getenv('AI_MODERATION_ENABLED', 'false').lower() == 'true'
+        self.AI_MODERATION_MODEL = os.getenv('AI_MODERATION_MODEL', 'mistral-small-latest')
+        self.AI_MODERATION_BATCH_SIZE = 20
+        self.AI_MODERATION_WINDOW = 0.5  # seconds to collect a batch
+        self.AI_MODERATION_TIMEOUT = 3  # seconds before falling back to keywords
+        self.AI_MODERATION_MAX_WAIT = 5  # seconds a message may queue before the keyword check decides it
+        
+        # Streamed chat replies from the Mistral agent
+        self.MISTRAL_AGENT_URL = os.getenv('MISTRAL_AGENT_URL', 'https://api.mistral.ai/v1/agents/completions')
+        self.LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '100'))
+        self.LLM_TIMEOUT = 120  # seconds for a whole streamed reply
+        self.LLM_EDIT_INTERVAL = 1.0  # seconds between edits of a streaming reply
+        self.LLM_MAX_CONCURRENT = int(os.getenv('LLM_MAX_CONCURRENT', '16'))  # model calls at once
+        self.LLM_MAX_QUEUE = 200  # model calls waiting for a slot
+        self.LLM_QUEUE_TIMEOUTS = (30, 10)  # seconds a premium / normal request may wait before "busy"
+        
+        # Reply cache; set RESPONSE_CACHE_PERSIST=true to keep it in a SQLite file across restarts
+        self.RESPONSE_CACHE_PATH = (
+            str(self.DATA_DIR / 'responses.db')
+            if os.getenv('RESPONSE_CACHE_PERSIST', 'false').lower() == 'true' else None
+        )
         
         # Encryption setup
         self._setup_encryption()
@@ -12,6 +12,21 @@ AGENT_ID = os.getenv("AGENT_ID")
 AUTHORIZED_USER_ID = int(os.getenv("AUTHORIZED_USER_ID", "1242077717"))
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "@royalcaptain")
 
+# Run mode: "polling" (threaded TeleBot), "async" (asyncio engine) or "webhook"
+RUN_MODE = os.getenv("RUN_MODE", "polling")
+ASYNC_EXECUTOR_WORKERS = int(os.getenv("ASYNC_EXECUTOR_WORKERS", "32"))  # Updates handled at once
+POLL_TIMEOUT = 60
+# chat_member updates are only delivered when requested explicitly
+ALLOWED_UPDATES = ["message", "edited_message", "callback_query", "my_chat_member", "chat_member"]
+
+# Webhook mode
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public URL registered with Telegram, optional
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # Generated when empty; required if WEBHOOK_URL is not set
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+
 # Premium pricing (in TON)
 PREMIUM_PRICES = {
     "1_month": {"price": 10, "discount": 0},
@@ -34,6 +49,28 @@ USER_LIMITS = {
     }
 }
 
+# Model prompt size per turn, in estimated tokens: a running summary of older
+# turns plus recent messages; older messages are summarized in batches of
+# CONTEXT_STALE_TOKENS
+CONTEXT_TOKEN_BUDGET = 4000
+CONTEXT_SUMMARY_TOKENS = 500
+CONTEXT_STALE_TOKENS = 500
+
+# Cached replies to opening questions
+RESPONSE_CACHE_SIZE = 1000
+RESPONSE_CACHE_TTL = 86400  # seconds
+
+# Saved chats pagination
+SAVED_CHATS_PAGE_SIZE = 10
+CHAT_HISTORY_PAGE_SIZE = 20
+SEARCH_PAGE_SIZE = 5
+
+# Admin broadcast
+BROADCAST_BATCH_SIZE = 500
+
+# Scheduled group posts of one daily slot are spread over this many seconds
+POST_SLOT_SPREAD_SECONDS = 600
+
 # Database settings
 DB_FILE = "bot_data.db"
 BACKUP_INTERVAL_HOURS = 12
@@ -44,6 +81,23 @@ BACKUP_PASSWORD = "@Sxw2z4ab7fkj"
 MAX_MESSAGES_PER_MINUTE = 60
 COMMAND_COOLDOWN_SECONDS = 30
 
+# Group flood / duplicate-spam detection
+FLOOD_USER_LIMIT = 5  # messages per user ...
+FLOOD_USER_WINDOW = 10  # ... within this many seconds
+FLOOD_CHAT_LIMIT = 30  # messages per group ...
+FLOOD_CHAT_WINDOW = 10  # ... within this many seconds before raid mode kicks in
+DUPLICATE_LIMIT = 3  # near-identical messages within DUPLICATE_WINDOW
+DUPLICATE_WINDOW = 120
+FLOOD_MUTE_HOURS = 1
+
+# Group warnings: WARNING_LIMIT warnings mute a user; each warning's weight halves every WARNING_HALF_LIFE_DAYS
+WARNING_LIMIT = 3
+WARNING_HALF_LIFE_DAYS = 7
+WARNING_FLUSH_SECONDS = 5
+
+# Group admin rosters are cached this many seconds (chat_member updates refresh them sooner)
+ADMIN_CACHE_TTL = 600
+
 # Logging settings
 LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "INFO")
 LOG_FILE_PATH = os.getenv("LOG_FILE_PATH", "logs/bot.log")
\ No newline at end of file
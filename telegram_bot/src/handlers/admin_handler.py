@@ -1,9 +1,11 @@
 from telebot import TeleBot, types
 from datetime import datetime, timedelta
 from typing import Dict, Optional
-from ..config.settings import PREMIUM_PRICES, AUTHORIZED_USER_ID, ADMIN_USERNAME
+from ..config.settings import PREMIUM_PRICES, AUTHORIZED_USER_ID, ADMIN_USERNAME, BROADCAST_BATCH_SIZE
 from ..utils.database import Database
 from ..utils.logger import Logger
+from ..utils.outbound import OutboundDispatcher
+from ..utils.broadcast import BroadcastRunner
 
 def is_admin(message):
     return (
@@ -17,13 +19,17 @@ class AdminHandler:
         self.db = db
         self.logger = logger
         self.stealth_mode = False
+        self.outbound = OutboundDispatcher.for_bot(bot)
+        self.broadcasts = BroadcastRunner(db, self.outbound, BROADCAST_BATCH_SIZE)
+        self.broadcast_messages: Dict[int, int] = {}  # {broadcast_id: status message_id}
         self._setup_handlers()
+        self.broadcasts.resume_all(self._report_broadcast)
 
     def _setup_handlers(self):
         @self.bot.message_handler(commands=['admin'])
         def admin_panel(message):
             if not is_admin(message):
-                self.bot.reply_to(message, "Unauthorized access.")
+                self.outbound.reply_to(message, "Unauthorized access.")
                 return
             
             markup = types.InlineKeyboardMarkup(row_width=2)
@@ -36,7 +42,49 @@ class AdminHandler:
                 types.InlineKeyboardButton("View Logs", callback_data="admin_logs")
             ]
             markup.add(*buttons)
-            self.bot.reply_to(message, "Admin Control Panel:", reply_markup=markup)
+            self.outbound.reply_to(message, "Admin Control Panel:", reply_markup=markup)
+
+        @self.bot.message_handler(commands=['broadcast'])
+        def broadcast(message):
+            if not is_admin(message):
+                self.outbound.reply_to(message, "Unauthorized access.")
+                return
+
+            text = message.text.partition(' ')[2].strip()
+            if not text:
+                self.outbound.reply_to(message, "Usage: /broadcast <message to send to all users>")
+                return
+
+            broadcast_id = self.db.create_broadcast(message.from_user.id, text)
+            if not broadcast_id:
+                self.outbound.reply_to(message, "Failed to create broadcast.")
+                return
+            # The progress reports edit this message, so wait for its id
+            status = self.outbound.reply_to(message, f"📣 Broadcast #{broadcast_id} started...").result()
+            self.broadcast_messages[broadcast_id] = status.message_id
+            self.broadcasts.start(broadcast_id, self._report_broadcast)
+            self.logger.admin_action(message.from_user.id, 'broadcast', {'broadcast_id': broadcast_id})
+
+    def _report_broadcast(self, progress: dict):
+        """Show live broadcast counters to the admin who started it"""
+        text = (
+            f"📣 Broadcast #{progress['id']} {'finished' if progress['status'] == 'done' else 'in progress'}\n"
+            f"Sent: {progress['sent']}\n"
+            f"Failed: {progress['failed']}\n"
+            f"Blocked: {progress['blocked']}\n"
+            f"Throughput: {progress['throughput']:.1f} msg/s"
+        )
+        try:
+            message_id = self.broadcast_messages.get(progress['id'])
+            if message_id:
+                self.outbound.submit('edit_message_text', progress['admin_id'], text, message_id=message_id)
+            else:
+                status = self.outbound.send_message(progress['admin_id'], text).result()
+                self.broadcast_messages[progress['id']] = status.message_id
+            if progress['status'] == 'done':
+                self.broadcast_messages.pop(progress['id'], None)
+        except Exception as e:
+            self.logger.error(f"Broadcast progress update failed: {str(e)}")
 
     def promote_to_premium(self, user_id: int, duration: str) -> bool:
         """
@@ -55,8 +103,9 @@ class AdminHandler:
             if not months:
                 return False
                 
-            expiry_date = datetime.now() + timedelta(days=30*months)
-            self.db.update_user_premium_status(user_id, True, expiry_date)
+            expiry_date = datetime.utcnow() + timedelta(days=30*months)
+            if not self.db.update_premium_status(user_id, True, expiry_date):
+                return False
             self.logger.info(f"User {user_id} promoted to premium for {duration}")
             return True
         except Exception as e:
@@ -1,12 +1,21 @@
 from telebot import TeleBot, types
 from datetime import datetime, timedelta
-import schedule
-import threading
-import time
 from typing import Dict, List, Optional
-from ..config.settings import AUTHORIZED_USER_ID
+from ..config import config
+from ..config.settings import (
+    AUTHORIZED_USER_ID, FLOOD_USER_LIMIT, FLOOD_USER_WINDOW, FLOOD_CHAT_LIMIT,
+    FLOOD_CHAT_WINDOW, DUPLICATE_LIMIT, DUPLICATE_WINDOW, FLOOD_MUTE_HOURS, ADMIN_CACHE_TTL,
+    WARNING_LIMIT, WARNING_HALF_LIFE_DAYS, WARNING_FLUSH_SECONDS, POST_SLOT_SPREAD_SECONDS
+)
 from ..utils.database import Database
 from ..utils.logger import Logger
+from ..utils.warning_ledger import WarningLedger
+from ..utils.outbound import OutboundDispatcher
+from ..utils.post_fanout import PostFanout
+from ..utils.moderation import ModerationEngine
+from ..utils.flood import FloodDetector, USER_FLOOD, DUPLICATE
+from ..utils.ai_moderation import AIModerator
+from ..utils.admin_cache import AdminStatusCache
 from ..models.user import User
 
 class GroupHandler:
@@ -15,17 +24,101 @@ class GroupHandler:
         self.db = db
         self.logger = logger
         self.pending_groups: Dict[int, dict] = {}
-        self.scheduled_posts: Dict[int, List[dict]] = {}
-        self.warning_counts: Dict[int, Dict[int, int]] = {}  # {group_id: {user_id: warning_count}}
+        self.warnings = WarningLedger(
+            db,
+            half_life=WARNING_HALF_LIFE_DAYS * 86400,
+            flush_interval=WARNING_FLUSH_SECONDS
+        )
+        self.outbound = OutboundDispatcher.for_bot(bot)
+        self.moderation = ModerationEngine(config.MODERATION_LEXICON_DIR)
+        self.flood = FloodDetector(
+            user_limit=FLOOD_USER_LIMIT,
+            user_window=FLOOD_USER_WINDOW,
+            chat_limit=FLOOD_CHAT_LIMIT,
+            chat_window=FLOOD_CHAT_WINDOW,
+            duplicate_limit=DUPLICATE_LIMIT,
+            duplicate_window=DUPLICATE_WINDOW
+        )
+        self.admin_cache = AdminStatusCache(bot, ttl=ADMIN_CACHE_TTL)
+        self.ai_moderator = None
+        if config.AI_MODERATION_ENABLED and config.MISTRAL_API_KEY:
+            self.ai_moderator = AIModerator(
+                config.MISTRAL_API_URL,
+                config.MISTRAL_API_KEY,
+                config.AI_MODERATION_MODEL,
+                fallback=self._is_toxic_content,
+                batch_size=config.AI_MODERATION_BATCH_SIZE,
+                batch_window=config.AI_MODERATION_WINDOW,
+                timeout=config.AI_MODERATION_TIMEOUT,
+                max_wait=config.AI_MODERATION_MAX_WAIT
+            )
+        self.fanout = PostFanout(db, self.outbound, spread_seconds=POST_SLOT_SPREAD_SECONDS)
+        self.scheduler = db.scheduler
+        self.scheduler.register('group_post_slot', lambda payload: self.fanout.deliver_slot(payload['slot']))
+        self._setup_post_slots()
         self._setup_handlers()
-        self._start_scheduler()
 
     def _setup_handlers(self):
-        @self.bot.message_handler(func=lambda message: message.chat.type in ['group', 'supergroup'])
+        @self.bot.chat_member_handler()
+        def handle_chat_member(update):
+            self.admin_cache.update_member(update.chat.id, update.new_chat_member.user.id, update.new_chat_member.status)
+
+        @self.bot.my_chat_member_handler()
+        def handle_my_chat_member(update):
+            self.admin_cache.invalidate(update.chat.id)
+
+        @self.bot.message_handler(commands=['slot_report'])
+        def slot_report(message):
+            if message.from_user.id != AUTHORIZED_USER_ID:
+                return
+            parts = message.text.split()
+            if len(parts) != 2:
+                self.outbound.reply_to(message, "Usage: /slot_report HH:MM")
+                return
+            report = self.get_slot_report(parts[1])
+            if not report:
+                self.outbound.reply_to(message, "No deliveries recorded for this slot.")
+                return
+            drain = f"{report['drain_seconds']:.0f}s" if report['drain_seconds'] is not None else "n/a"
+            self.outbound.reply_to(
+                message,
+                f"📬 Slot {report['slot_run']}\n"
+                f"Posts: {report['total']} (sent {report['sent']}, failed {report['failed']}, queued {report['queued']})\n"
+                f"Drained in: {drain}\n"
+                f"Avg delay after planned time: {report['avg_delay'] or 0:.1f}s (max {report['max_delay'] or 0:.1f}s)"
+            )
+
+        @self.bot.message_handler(commands=['reload_filters'])
+        def reload_filters(message):
+            if message.from_user.id != AUTHORIZED_USER_ID:
+                return
+            self.moderation.reload()
+            self.outbound.reply_to(message, "Reloading moderation filters...")
+
+        @self.bot.message_handler(
+            content_types=['text', 'photo', 'video', 'document', 'animation', 'audio', 'voice'],
+            func=lambda message: message.chat.type in ['group', 'supergroup']
+            and not (message.text or '').startswith('/')
+        )
         def handle_group_message(message):
-            if self._is_toxic_content(message.text):
-                self.warn_user(message.chat.id, message.from_user.id, "Inappropriate content")
-                self.bot.delete_message(message.chat.id, message.message_id)
+            chat_id, user_id = message.chat.id, message.from_user.id
+            text = message.text or message.caption
+            verdict = self.flood.check(chat_id, user_id, text)
+            if verdict == USER_FLOOD:
+                self.outbound.submit('delete_message', chat_id, message.message_id)
+                self.mute_user(chat_id, user_id, duration=FLOOD_MUTE_HOURS)
+                self.flood.reset_user(chat_id, user_id)
+            elif verdict == DUPLICATE:
+                self.outbound.submit('delete_message', chat_id, message.message_id)
+                self.warn_user(chat_id, user_id, "Repeated message")
+            elif text and self.ai_moderator:
+                def on_verdict(flagged: bool, source: str):
+                    if flagged:
+                        self._remove_toxic_message(message)
+
+                self.ai_moderator.submit(chat_id, text, on_verdict)
+            elif self._is_toxic_content(text, chat_id):
+                self._remove_toxic_message(message)
 
         @self.bot.message_handler(commands=['schedule_post'])
         def schedule_post(message):
@@ -37,82 +130,86 @@ class GroupHandler:
             buttons = [types.InlineKeyboardButton(time, callback_data=f"schedule_{time}") 
                       for time in times]
             markup.add(*buttons)
-            self.bot.reply_to(message, "Select posting time:", reply_markup=markup)
-
-    def _start_scheduler(self):
-        def run_scheduler():
-            while True:
-                schedule.run_pending()
-                time.sleep(60)
+            self.outbound.reply_to(message, "Select posting time:", reply_markup=markup)
 
-        scheduler_thread = threading.Thread(target=run_scheduler)
-        scheduler_thread.daemon = True
-        scheduler_thread.start()
+    def _is_toxic_content(self, text: Optional[str], chat_id: int = None) -> bool:
+        return self.moderation.check(text, chat_id) is not None
 
-    def _is_toxic_content(self, text: str) -> bool:
-        # AI-powered content moderation
-        toxic_keywords = ['spam', 'abuse', 'hate']  # Basic implementation
-        return any(keyword in text.lower() for keyword in toxic_keywords)
+    def _remove_toxic_message(self, message):
+        self.warn_user(message.chat.id, message.from_user.id, "Inappropriate content")
+        self.outbound.submit('delete_message', message.chat.id, message.message_id)
 
     def _is_admin(self, chat_id: int, user_id: int) -> bool:
-        try:
-            chat_member = self.bot.get_chat_member(chat_id, user_id)
-            return chat_member.status in ['creator', 'administrator']
-        except:
-            return False
+        return self.admin_cache.is_admin(chat_id, user_id)
 
     def warn_user(self, chat_id: int, user_id: int, reason: str):
-        if chat_id not in self.warning_counts:
-            self.warning_counts[chat_id] = {}
+        # Scores decay, so round: three quick warnings still reach 3
+        warnings = int(self.warnings.add(chat_id, user_id) + 0.5)
         
-        if user_id not in self.warning_counts[chat_id]:
-            self.warning_counts[chat_id][user_id] = 0
+        warning_msg = f"⚠️ Warning {warnings}/{WARNING_LIMIT}: {reason}"
+        self.outbound.send_message(chat_id, warning_msg)
         
-        self.warning_counts[chat_id][user_id] += 1
-        warnings = self.warning_counts[chat_id][user_id]
-        
-        warning_msg = f"⚠️ Warning {warnings}/3: {reason}"
-        self.bot.send_message(chat_id, warning_msg)
-        
-        if warnings >= 3:
+        if warnings >= WARNING_LIMIT:
             self.mute_user(chat_id, user_id, duration=24)  # 24 hour mute
-            self.warning_counts[chat_id][user_id] = 0
+            self.warnings.reset(chat_id, user_id)
 
     def mute_user(self, chat_id: int, user_id: int, duration: int):
         until_date = datetime.now() + timedelta(hours=duration)
-        try:
-            self.bot.restrict_chat_member(
-                chat_id, 
-                user_id,
-                until_date=until_date,
-                permissions=types.ChatPermissions(
-                    can_send_messages=False,
-                    can_send_media_messages=False,
-                    can_send_other_messages=False
-                )
-            )
-            self.bot.send_message(
+
+        def on_restricted(future):
+            if future.exception():
+                self.logger.error(f"Failed to mute user: {str(future.exception())}")
+                return
+            self.outbound.send_message(
                 chat_id,
                 f"User has been muted for {duration} hours due to multiple warnings."
             )
             self.logger.warning(f"User {user_id} muted in group {chat_id}")
-        except Exception as e:
-            self.logger.error(f"Failed to mute user: {str(e)}")
 
-    def schedule_group_post(self, chat_id: int, time: str, content: str):
-        if chat_id not in self.scheduled_posts:
-            self.scheduled_posts[chat_id] = []
-        
-        schedule.every().day.at(time).do(
-            lambda: self.bot.send_message(chat_id, content)
+        self.outbound.submit(
+            'restrict_chat_member',
+            chat_id,
+            user_id,
+            until_date=until_date,
+            permissions=types.ChatPermissions(
+                can_send_messages=False,
+                can_send_media_messages=False,
+                can_send_other_messages=False
+            ),
+            callback=on_restricted
         )
-        
-        self.scheduled_posts[chat_id].append({
-            'time': time,
-            'content': content
-        })
+
+    def _setup_post_slots(self):
+        # Posts scheduled as individual jobs are moved into their slot
+        for job in self.scheduler.jobs('group_post'):
+            self.db.add_scheduled_post(job['payload']['chat_id'], job['daily_at'], job['payload']['content'])
+            self.scheduler.cancel(job['name'])
+        for slot in self.db.get_post_slots():
+            self._schedule_slot(slot)
+
+    def _schedule_slot(self, slot: str):
+        # One job per daily slot fans out to every post of that slot
+        self.scheduler.schedule_daily(f"group_post_slot:{slot}", 'group_post_slot', slot, {'slot': slot})
+
+    def schedule_group_post(self, chat_id: int, time: str, content: str):
+        if self.db.add_scheduled_post(chat_id, time, content) is None:
+            return
+        self._schedule_slot(time)
         self.logger.info(f"Scheduled post for group {chat_id} at {time}")
 
+    def get_scheduled_posts(self, chat_id: int) -> List[dict]:
+        """Get the daily posts scheduled for a group"""
+        return [
+            {'time': post['slot'], 'content': post['content']}
+            for post in self.db.get_scheduled_posts(chat_id)
+        ]
+
+    def get_slot_report(self, slot: str) -> Optional[dict]:
+        """Get delivery stats of the latest run of a daily slot"""
+        self.fanout.flush()
+        slot_run = self.db.get_last_slot_run(slot)
+        return self.db.get_slot_report(slot_run) if slot_run else None
+
     def verify_group_join(self, chat_id: int) -> bool:
         """Verify if the bot should join a group"""
         if chat_id in self.pending_groups:
@@ -124,7 +221,7 @@ class GroupHandler:
             types.InlineKeyboardButton("Deny", callback_data=f"deny_group_{chat_id}")
         )
         
-        self.bot.send_message(
+        self.outbound.send_message(
             AUTHORIZED_USER_ID,
             f"Bot was added to group {chat_id}. Approve?",
             reply_markup=markup
@@ -141,8 +238,9 @@ class GroupHandler:
         try:
             stats = {
                 'member_count': self.bot.get_chat_member_count(chat_id),
-                'warnings': len(self.warning_counts.get(chat_id, {})),
-                'scheduled_posts': len(self.scheduled_posts.get(chat_id, [])),
+                'warnings': self.warnings.count(chat_id),
+                'scheduled_posts': len(self.get_scheduled_posts(chat_id)),
+                'admin_cache': self.admin_cache.get_stats(),
             }
             return stats
         except Exception as e:
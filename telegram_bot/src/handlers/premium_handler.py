@@ -1,16 +1,20 @@
 from telebot import TeleBot, types
 from datetime import datetime, timedelta
 import json
+import time
 from typing import Dict, Optional
 from ..config.settings import PREMIUM_PRICES, USER_LIMITS
 from ..utils.database import Database
 from ..utils.logger import Logger
+from ..utils.outbound import OutboundDispatcher, PRIORITY_REPLY
+from ..utils.entitlements import from_epoch
 
 class PremiumHandler:
     def __init__(self, bot: TeleBot, db: Database, logger: Logger):
         self.bot = bot
         self.db = db
         self.logger = logger
+        self.outbound = OutboundDispatcher.for_bot(bot)
         self.pending_payments: Dict[int, dict] = {}
         self.referral_rewards = {
             1: "3_days",
@@ -44,7 +48,7 @@ class PremiumHandler:
             markup.add(*buttons)
             markup.add(types.InlineKeyboardButton("💎 Benefits", callback_data="premium_benefits"))
             
-            self.bot.reply_to(
+            self.outbound.reply_to(
                 message,
                 "🌟 Premium Subscription Options:\n\n"
                 "Choose your subscription duration:",
@@ -81,11 +85,12 @@ class PremiumHandler:
             ]
             markup.add(*buttons)
             
-            self.bot.send_message(
+            self.outbound.send_message(
                 user_id,
                 f"Total Amount: {price} TON\n"
                 f"Duration: {duration.replace('_', ' ').title()}\n\n"
                 "Choose your payment method:",
+                priority=PRIORITY_REPLY,
                 reply_markup=markup
             )
             return True
@@ -96,17 +101,7 @@ class PremiumHandler:
 
     def check_premium_status(self, user_id: int) -> bool:
         """Check if user has active premium subscription"""
-        try:
-            user_data = self.db.get_user(user_id)
-            if not user_data or not user_data.get('is_premium'):
-                return False
-                
-            expiry_date = datetime.fromisoformat(user_data.get('premium_expiry', ''))
-            return expiry_date > datetime.now()
-            
-        except Exception as e:
-            self.logger.error(f"Premium status check error: {str(e)}")
-            return False
+        return self.db.entitlements.is_active(user_id)
 
     def process_referral(self, referrer_id: int, referred_id: int) -> bool:
         """Process referral rewards"""
@@ -117,7 +112,7 @@ class PremiumHandler:
                 if referral_count == count:
                     days = int(reward.split('_')[0])
                     self.extend_premium(referrer_id, days)
-                    self.bot.send_message(
+                    self.outbound.send_message(
                         referrer_id,
                         f"🎁 You've received {days} days of premium for referring {count} users!"
                     )
@@ -132,17 +127,9 @@ class PremiumHandler:
     def extend_premium(self, user_id: int, days: int) -> bool:
         """Extend premium subscription by specified days"""
         try:
-            user_data = self.db.get_user(user_id)
-            current_expiry = datetime.fromisoformat(
-                user_data.get('premium_expiry', datetime.now().isoformat())
-            )
-            
-            if not self.check_premium_status(user_id):
-                current_expiry = datetime.now()
-                
-            new_expiry = current_expiry + timedelta(days=days)
-            self.db.update_user_premium_status(user_id, True, new_expiry)
-            return True
+            current_expiry = max(self.db.entitlements.expiry(user_id), time.time())
+            new_expiry = from_epoch(current_expiry + days * 86400)
+            return self.db.update_premium_status(user_id, True, new_expiry)
             
         except Exception as e:
             self.logger.error(f"Premium extension error: {str(e)}")
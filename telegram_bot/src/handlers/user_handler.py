@@ -1,25 +1,80 @@
 import json
+import time
 from telebot import TeleBot, types
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
-from ..config.settings import USER_LIMITS, MAX_MESSAGES_PER_MINUTE
+from ..config.settings import (
+    USER_LIMITS,
+    MAX_MESSAGES_PER_MINUTE,
+    COMMAND_COOLDOWN_SECONDS,
+    SAVED_CHATS_PAGE_SIZE,
+    CHAT_HISTORY_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_SUMMARY_TOKENS,
+    CONTEXT_STALE_TOKENS,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL
+)
 from ..utils.database import Database
 from ..utils.logger import Logger
+from ..utils.rate_limiter import RateLimiter
+from ..utils.session_store import ConversationStore
+from ..utils.reply_engine import ReplyEngine, AgentStreamClient
+from ..utils.outbound import OutboundDispatcher, PRIORITY_REPLY
+from ..utils.llm_admission import AdmissionController, PRIORITY_PREMIUM, PRIORITY_NORMAL
+from ..utils.context_builder import ContextBuilder
+from ..utils.response_cache import ResponseCache
+from ..config import config
 
 class UserHandler:
     def __init__(self, bot: TeleBot, db: Database, logger: Logger):
         self.bot = bot
         self.db = db
         self.logger = logger
-        self.user_messages: Dict[int, List[datetime]] = {}  # Track message timestamps
-        self.active_conversations: Dict[int, dict] = {}  # Track active conversations
+        self.outbound = OutboundDispatcher.for_bot(bot)
+        self.rate_limiter = RateLimiter(MAX_MESSAGES_PER_MINUTE, COMMAND_COOLDOWN_SECONDS)
+        self.active_conversations = ConversationStore(  # Track active conversations
+            config.SESSION_SPILL_PATH,
+            config.SESSION_MEMORY_BUDGET,
+            config.SESSION_IDLE_TIMEOUT
+        )
         self.anonymous_users: set = set()  # Users in anonymous mode
+        self.search_queries: Dict[int, str] = {}  # Last /search query per user, for paging
+        self.reply_engine = ReplyEngine(
+            bot,
+            AgentStreamClient(
+                config.MISTRAL_AGENT_URL,
+                config.MISTRAL_API_KEY,
+                config.AGENT_ID,
+                max_connections=config.LLM_MAX_CONNECTIONS,
+                timeout=config.LLM_TIMEOUT
+            ),
+            edit_interval=config.LLM_EDIT_INTERVAL,
+            admission=AdmissionController(
+                max_concurrent=config.LLM_MAX_CONCURRENT,
+                max_queue=config.LLM_MAX_QUEUE,
+                queue_timeouts=config.LLM_QUEUE_TIMEOUTS
+            )
+        )
+        self.context_builder = ContextBuilder(
+            budget=CONTEXT_TOKEN_BUDGET,
+            summary_budget=CONTEXT_SUMMARY_TOKENS,
+            stale_tokens=CONTEXT_STALE_TOKENS
+        )
+        self.response_cache = ResponseCache(
+            config.RESPONSE_CACHE_PATH,
+            max_entries=RESPONSE_CACHE_SIZE,
+            ttl=RESPONSE_CACHE_TTL
+        )
         self._setup_handlers()
 
     def _setup_handlers(self):
         @self.bot.message_handler(commands=['start'])
         def start(message):
             try:
+                if not self.check_command_cooldown(message.from_user.id, 'start'):
+                    return
                 markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
                 markup.add(
                     types.KeyboardButton("New Chat"),
@@ -29,7 +84,7 @@ class UserHandler:
                 )
                 
                 welcome_text = "Welcome! How can I assist you today?"
-                self.bot.reply_to(message, welcome_text, reply_markup=markup)
+                self.outbound.reply_to(message, welcome_text, reply_markup=markup)
                 
                 if not self.db.user_exists(message.from_user.id):
                     user_data = {
@@ -42,13 +97,29 @@ class UserHandler:
                     
             except Exception as e:
                 self.logger.error(f"Start command error: {str(e)}")
-                self.bot.reply_to(message, "An error occurred. Please try again.")
+                self.outbound.reply_to(message, "An error occurred. Please try again.")
+
+        @self.bot.message_handler(commands=['search'])
+        def search(message):
+            try:
+                if not self.check_command_cooldown(message.from_user.id, 'search'):
+                    self.outbound.reply_to(message, "Please wait a bit before searching again.")
+                    return
+                query = message.text.partition(' ')[2].strip()
+                if not query:
+                    self.outbound.reply_to(message, "Usage: /search <words to find in your saved chats>")
+                    return
+                self.search_queries[message.from_user.id] = query
+                self.show_search_results(message, message.from_user.id, page=0)
+            except Exception as e:
+                self.logger.error(f"Search command error: {str(e)}")
+                self.outbound.reply_to(message, "An error occurred. Please try again.")
 
         @self.bot.message_handler(func=lambda message: message.text in ["New Chat", "Settings", "Saved Chats", "Help"])
         def handle_buttons(message):
             try:
                 if message.text == "New Chat":
-                    self.bot.reply_to(message, "Starting a new chat. How can I help you?")
+                    self.outbound.reply_to(message, "Starting a new chat. How can I help you?")
                 elif message.text == "Settings":
                     self.show_settings(message)
                 elif message.text == "Saved Chats":
@@ -57,7 +128,40 @@ class UserHandler:
                     self.show_help(message)
             except Exception as e:
                 self.logger.error(f"Button handler error: {str(e)}")
-                self.bot.reply_to(message, "An error occurred. Please try again.")
+                self.outbound.reply_to(message, "An error occurred. Please try again.")
+
+        @self.bot.message_handler(
+            func=lambda message: message.chat.type == 'private' and not message.text.startswith('/')
+        )
+        def handle_text(message):
+            try:
+                self.handle_message(message)
+            except Exception as e:
+                self.logger.error(f"Message handler error: {str(e)}")
+                self.outbound.reply_to(message, "An error occurred. Please try again.")
+
+        @self.bot.callback_query_handler(
+            func=lambda call: call.data.startswith(('saved_page_', 'chat_open_', 'chat_delete_', 'search_page_'))
+        )
+        def handle_saved_chats_callback(call):
+            try:
+                if call.data.startswith('saved_page_'):
+                    before_id = int(call.data[len('saved_page_'):])
+                    self.show_saved_chats(call.message, user_id=call.from_user.id, before_id=before_id)
+                elif call.data.startswith('search_page_'):
+                    page = int(call.data[len('search_page_'):])
+                    self.show_search_results(call.message, call.from_user.id, page)
+                elif call.data.startswith('chat_delete_'):
+                    conversation_id = int(call.data[len('chat_delete_'):])
+                    deleted = self.db.delete_conversation(call.from_user.id, conversation_id)
+                    self.outbound.send_message(call.message.chat.id, "Chat deleted." if deleted else "Chat not found.", priority=PRIORITY_REPLY)
+                else:
+                    conversation_id, after_seq = map(int, call.data[len('chat_open_'):].split('_'))
+                    self.show_chat_history(call.message, call.from_user.id, conversation_id, after_seq)
+                self.bot.answer_callback_query(call.id)
+            except Exception as e:
+                self.logger.error(f"Saved chats callback error: {str(e)}")
+                self.bot.answer_callback_query(call.id, "An error occurred. Please try again.")
 
     def show_settings(self, message):
         markup = types.InlineKeyboardMarkup()
@@ -65,16 +169,79 @@ class UserHandler:
             types.InlineKeyboardButton("Language", callback_data="settings_language"),
             types.InlineKeyboardButton("Notifications", callback_data="settings_notifications")
         )
-        self.bot.reply_to(message, "Settings Menu:", reply_markup=markup)
+        self.outbound.reply_to(message, "Settings Menu:", reply_markup=markup)
+
+    def show_saved_chats(self, message, user_id: int = None, before_id: int = None):
+        """Show one page of the user's saved chats, newest first"""
+        user_id = user_id or message.from_user.id
+        chats = self.db.get_saved_conversations(user_id, before_id, SAVED_CHATS_PAGE_SIZE)
+        if not chats:
+            text = "No more saved chats." if before_id else "You have no saved chats yet."
+            self.outbound.send_message(message.chat.id, text, priority=PRIORITY_REPLY)
+            return
 
-    def show_saved_chats(self, message):
-        self.bot.reply_to(message, "Your saved chats will appear here.")
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for chat in chats:
+            markup.add(types.InlineKeyboardButton(
+                chat['title'] or "Untitled chat", callback_data=f"chat_open_{chat['id']}_0"
+            ))
+        if len(chats) == SAVED_CHATS_PAGE_SIZE:
+            markup.add(types.InlineKeyboardButton("More »", callback_data=f"saved_page_{chats[-1]['id']}"))
+        self.outbound.send_message(message.chat.id, "Your saved chats:", priority=PRIORITY_REPLY, reply_markup=markup)
+
+    def show_chat_history(self, message, user_id: int, conversation_id: int, after_seq: int = 0):
+        """Show one page of messages from a saved chat"""
+        messages = self.db.get_conversation_messages(user_id, conversation_id, after_seq, CHAT_HISTORY_PAGE_SIZE)
+        if not messages:
+            self.outbound.send_message(message.chat.id, "No more messages in this chat.", priority=PRIORITY_REPLY)
+            return
+
+        lines = [f"{'You' if msg['role'] == 'user' else 'AI'}: {msg['content']}" for msg in messages]
+        text = "\n\n".join(lines)[:4000]
+        markup = types.InlineKeyboardMarkup()
+        if after_seq == 0:
+            markup.add(types.InlineKeyboardButton("🗑 Delete", callback_data=f"chat_delete_{conversation_id}"))
+        if len(messages) == CHAT_HISTORY_PAGE_SIZE:
+            markup.add(types.InlineKeyboardButton(
+                "More »", callback_data=f"chat_open_{conversation_id}_{messages[-1]['seq']}"
+            ))
+        self.outbound.send_message(message.chat.id, text, priority=PRIORITY_REPLY, reply_markup=markup)
+
+    def show_search_results(self, message, user_id: int, page: int):
+        """Show one page of ranked /search results over the user's saved chats"""
+        query = self.search_queries.get(user_id)
+        if not query:
+            self.outbound.send_message(message.chat.id, "Search expired. Please run /search again.", priority=PRIORITY_REPLY)
+            return
+
+        results = self.db.search_conversations(user_id, query, page * SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE)
+        if not results:
+            text = "No more results." if page else f"Nothing found for \"{query}\"."
+            self.outbound.send_message(message.chat.id, text, priority=PRIORITY_REPLY)
+            return
+
+        lines = [f"{result['title'] or 'Untitled chat'}\n{result['snippet']}" for result in results]
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for result in results:
+            markup.add(types.InlineKeyboardButton(
+                f"Open: {result['title'] or 'Untitled chat'}",
+                callback_data=f"chat_open_{result['conversation_id']}_{max(result['seq'] - 1, 0)}"
+            ))
+        if len(results) == SEARCH_PAGE_SIZE:
+            markup.add(types.InlineKeyboardButton("More »", callback_data=f"search_page_{page + 1}"))
+        self.outbound.send_message(
+            message.chat.id,
+            f"Results for \"{query}\" (page {page + 1}):\n\n" + "\n\n".join(lines),
+            priority=PRIORITY_REPLY,
+            reply_markup=markup
+        )
 
     def show_help(self, message):
         help_text = """
 Available commands:
 /start - Start the bot
 /help - Show this help message
+/search <query> - Search your saved chats
         
 Button functions:
 • New Chat - Start a new conversation
@@ -82,7 +249,7 @@ Button functions:
 • Saved Chats - View your chat history
 • Help - Show help information
         """
-        self.bot.reply_to(message, help_text)
+        self.outbound.reply_to(message, help_text)
 
     def register_user(self, user) -> bool:
         """Register new user in database"""
@@ -111,22 +278,11 @@ Button functions:
 
     def check_rate_limit(self, user_id: int) -> bool:
         """Check if user has exceeded rate limits"""
-        current_time = datetime.now()
-        if user_id not in self.user_messages:
-            self.user_messages[user_id] = []
-            
-        # Remove messages older than 1 minute
-        self.user_messages[user_id] = [
-            msg_time for msg_time in self.user_messages[user_id]
-            if current_time - msg_time < timedelta(minutes=1)
-        ]
-        
-        # Check if user exceeded limit
-        if len(self.user_messages[user_id]) >= MAX_MESSAGES_PER_MINUTE:
-            return False
-            
-        self.user_messages[user_id].append(current_time)
-        return True
+        return self.rate_limiter.allow_message(user_id)
+
+    def check_command_cooldown(self, user_id: int, command: str) -> bool:
+        """Check if user may run the command again"""
+        return self.rate_limiter.allow_command(user_id, command)
 
     def start_conversation(self, user_id: int) -> bool:
         """Start new conversation for user"""
@@ -137,7 +293,7 @@ Button functions:
                 
             self.active_conversations[user_id] = {
                 'messages': [],
-                'started': datetime.now(),
+                'started': datetime.now().isoformat(),
                 'message_count': 0
             }
             return True
@@ -183,6 +339,14 @@ Button functions:
         is_premium = self.db.is_premium_user(user_id)
         return USER_LIMITS['premium'] if is_premium else USER_LIMITS['normal']
 
+    def get_reply_stats(self) -> dict:
+        """Get reply streaming and prompt building metrics"""
+        return {
+            'replies': self.reply_engine.get_stats(),
+            'context': self.context_builder.get_stats(),
+            'cache': self.response_cache.get_stats()
+        }
+
     def prompt_save_conversation(self, user_id: int):
         """Prompt user to save current conversation"""
         markup = types.InlineKeyboardMarkup(row_width=2)
@@ -192,7 +356,7 @@ Button functions:
         ]
         markup.add(*buttons)
         
-        self.bot.send_message(
+        self.outbound.send_message(
             user_id,
             "Would you like to save the current conversation?",
             reply_markup=markup
@@ -203,28 +367,90 @@ Button functions:
         user_id = message.from_user.id
         
         if not self.check_rate_limit(user_id):
-            self.bot.reply_to(message, "Please slow down! You're sending messages too quickly.")
+            self.outbound.reply_to(message, "Please slow down! You're sending messages too quickly.")
             return False
             
         if user_id not in self.active_conversations:
             self.start_conversation(user_id)
             
-        conv = self.active_conversations[user_id]
         limits = self.get_user_limits(user_id)
-        
-        if conv['message_count'] >= limits['messages_per_conv']:
-            self.bot.reply_to(
-                message,
-                "You've reached the message limit for this conversation. "
-                "Please start a new one."
-            )
-            return False
-            
-        conv['messages'].append({
-            'role': 'user',
-            'content': message.text,
-            'timestamp': datetime.now().isoformat()
-        })
-        conv['message_count'] += 1
-        
-        return True
\ No newline at end of file
+        # Pinned, so another thread spilling it cannot drop these changes
+        with self.active_conversations.use(user_id) as conv:
+            if conv['message_count'] >= limits['messages_per_conv']:
+                self.outbound.reply_to(
+                    message,
+                    "You've reached the message limit for this conversation. "
+                    "Please start a new one."
+                )
+                return False
+
+            user_message = {
+                'role': 'user',
+                'content': message.text,
+                'timestamp': datetime.now().isoformat()
+            }
+            conv['messages'].append(user_message)
+            conv['message_count'] += 1
+            self.active_conversations.touch(user_id, added_bytes=len(json.dumps(user_message)))
+            prompt = self.context_builder.build(conv)
+            started = conv['started']
+
+        cache_key = self._response_cache_key(user_id, prompt)
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.reply_engine.deliver(message.chat.id, message.message_id, cached)
+                self._record_reply(user_id, started, cached)
+                return True
+
+        requested_at = time.monotonic()
+        self.reply_engine.reply(
+            message.chat.id,
+            message.message_id,
+            prompt,
+            on_done=lambda text: self._record_reply(user_id, started, text, cache_key, requested_at),
+            priority=PRIORITY_PREMIUM if self._is_premium(user_id) else PRIORITY_NORMAL
+        )
+        return True
+
+    def _is_premium(self, user_id: int) -> bool:
+        """Check premium status through the premium handler when the factory set one up"""
+        from . import HandlerFactory  # Imported here: the handlers package imports this module
+        premium_handler = HandlerFactory.get_handler('premium')
+        if premium_handler:
+            return premium_handler.check_premium_status(user_id)
+        return self.db.is_premium_user(user_id)
+
+    def _response_cache_key(self, user_id: int, prompt: List[dict]) -> Optional[str]:
+        """Cache key for an opening question; None when the reply depends on history or the user is anonymous"""
+        if len(prompt) != 1 or user_id in self.anonymous_users:
+            return None
+        settings = (self.db.get_user(user_id) or {}).get('settings') or {}
+        if settings.get('anonymous_mode'):
+            return None
+        return ResponseCache.make_key(
+            prompt[0]['content'],
+            settings.get('ai_personality', 'friendly'),
+            settings.get('language', 'en')
+        )
+
+    def _record_reply(self, user_id: int, started: str, text: Optional[str],
+                      cache_key: str = None, requested_at: float = None):
+        """Append a finished assistant reply to the conversation it answers"""
+        if text and cache_key:
+            self.response_cache.put(cache_key, text, time.monotonic() - requested_at)
+        if not text:
+            return  # The reply failed
+        try:
+            with self.active_conversations.use(user_id) as conv:
+                if conv['started'] != started:
+                    return  # The user has started a new conversation meanwhile
+                assistant_message = {
+                    'role': 'assistant',
+                    'content': text,
+                    'timestamp': datetime.now().isoformat()
+                }
+                conv['messages'].append(assistant_message)
+                self.active_conversations.touch(user_id, added_bytes=len(json.dumps(assistant_message)))
+        except KeyError:
+            return  # Saved or discarded meanwhile
\ No newline at end of file
@@ -25,7 +25,17 @@ from .config.settings import (
     MISTRAL_API_KEY, 
     AGENT_ID, 
     AUTHORIZED_USER_ID, 
-    ADMIN_USERNAME
+    ADMIN_USERNAME,
+    RUN_MODE,
+    ASYNC_EXECUTOR_WORKERS,
+    POLL_TIMEOUT,
+    WEBHOOK_URL,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_WORKERS,
+    ALLOWED_UPDATES
 )
 from .handlers.admin_handler import AdminHandler
 from .handlers.user_handler import UserHandler
@@ -57,14 +67,39 @@ def verify_credentials():
 def run_bot():
     try:
         verify_credentials()
-        bot = TeleBot(BOT_TOKEN)
+        bot = TeleBot(BOT_TOKEN, threaded=RUN_MODE == "polling")
         
+        # Create and migrate the schema before any handler touches the database
+        utils.db.setup()
+
         # Initialize handlers
         admin_handler = AdminHandler(bot, utils.db, utils.logger)
         user_handler = UserHandler(bot, utils.db, utils.logger)
         
-        utils.logger.info("Bot starting...")
-        bot.polling(none_stop=True)
+        utils.db.start()
+        utils.logger.info(f"Bot starting ({RUN_MODE} mode)...")
+        if RUN_MODE in ("async", "webhook"):
+            from .utils.async_engine import AsyncEngine
+            engine = AsyncEngine(
+                bot,
+                executor_workers=ASYNC_EXECUTOR_WORKERS,
+                poll_timeout=POLL_TIMEOUT
+            )
+            engine.allowed_updates = ALLOWED_UPDATES
+            if RUN_MODE == "webhook":
+                from .utils.webhook_server import WebhookServer
+                WebhookServer(
+                    engine,
+                    WEBHOOK_SECRET,
+                    host=WEBHOOK_HOST,
+                    port=WEBHOOK_PORT,
+                    path=WEBHOOK_PATH,
+                    workers=WEBHOOK_WORKERS
+                ).run(WEBHOOK_URL)
+            else:
+                engine.run()
+        else:
+            bot.polling(none_stop=True, timeout=POLL_TIMEOUT, allowed_updates=ALLOWED_UPDATES)
         
     except Exception as e:
         utils.logger.error(f"Bot crashed: {str(e)}")
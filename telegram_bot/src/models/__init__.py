@@ -8,7 +8,11 @@ Base = declarative_base()
 
 # Import models
 from .user import User
-from .conversation import Conversation
+from .conversation import Conversation, ConversationMessage
+from .broadcast import Broadcast
+from .warning import GroupWarning
+from .scheduled_job import ScheduledJob
+from .scheduled_post import ScheduledPost, PostDelivery
 
 # Create database engine
 engine = create_engine('sqlite:///bot_data.db')
@@ -25,4 +29,5 @@ def create_tables():
     Base.metadata.create_all(engine)
 
 # Export models
-__all__ = ['Base', 'User', 'Conversation']
\ No newline at end of file
+__all__ = ['Base', 'User', 'Conversation', 'ConversationMessage', 'Broadcast', 'GroupWarning', 'ScheduledJob',
+           'ScheduledPost', 'PostDelivery']
\ No newline at end of file
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from . import Base
+
+class Broadcast(Base):
+    __tablename__ = 'broadcasts'
+
+    id = Column(Integer, primary_key=True)
+    admin_id = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String(20), default='running')  # running, done, failed
+    
+    # Checkpoint: recipients are streamed in users.id order
+    last_user_id = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    blocked = Column(Integer, default=0)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    def to_dict(self) -> dict:
+        """Convert broadcast object to dictionary"""
+        return {
+            'id': self.id,
+            'admin_id': self.admin_id,
+            'text': self.text,
+            'status': self.status,
+            'last_user_id': self.last_user_id,
+            'sent': self.sent,
+            'failed': self.failed,
+            'blocked': self.blocked,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from . import Base
@@ -9,8 +9,39 @@ class Conversation(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     title = Column(String(255))
-    content = Column(JSON)
+    content = Column(JSON)  # Conversation metadata; messages live in conversation_messages
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Relationships
+    user = relationship("User", back_populates="conversations")
+    messages = relationship(
+        "ConversationMessage",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        lazy="dynamic"
+    )
+
+class ConversationMessage(Base):
+    __tablename__ = 'conversation_messages'
+    __table_args__ = (
+        Index('ix_conversation_messages_conversation_seq', 'conversation_id', 'seq', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id'), nullable=False)
+    seq = Column(Integer, nullable=False)
+    role = Column(String(20))
+    content = Column(Text)
+    ts = Column(DateTime, default=datetime.utcnow)
+
     # Relationship
-    user = relationship("User", back_populates="conversations")
\ No newline at end of file
+    conversation = relationship("Conversation", back_populates="messages")
+
+    def to_dict(self) -> dict:
+        """Convert message object to dictionary"""
+        return {
+            'seq': self.seq,
+            'role': self.role,
+            'content': self.content,
+            'timestamp': self.ts.isoformat() if self.ts else None
+        }
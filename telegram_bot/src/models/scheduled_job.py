@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, JSON
+from . import Base
+
+class ScheduledJob(Base):
+    __tablename__ = 'scheduled_jobs'
+
+    name = Column(String(255), primary_key=True)
+    handler = Column(String(100), nullable=False)  # Name registered with the scheduler
+    payload = Column(JSON, default=dict)
+    
+    # Either a fixed interval or a daily local time ("HH:MM")
+    interval_seconds = Column(Integer, nullable=True)
+    daily_at = Column(String(5), nullable=True)
+    
+    # Unix times; next_run doubles as a claim token between workers
+    next_run = Column(Float, nullable=False)
+    last_run = Column(Float, nullable=True)
+    enabled = Column(Boolean, default=True)
+
+    def to_dict(self) -> dict:
+        """Convert job object to dictionary"""
+        return {
+            'name': self.name,
+            'handler': self.handler,
+            'payload': self.payload or {},
+            'interval_seconds': self.interval_seconds,
+            'daily_at': self.daily_at,
+            'next_run': self.next_run,
+            'last_run': self.last_run,
+            'enabled': self.enabled
+        }
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, Index
+from datetime import datetime
+from . import Base
+
+class ScheduledPost(Base):
+    __tablename__ = 'scheduled_posts'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, nullable=False)
+    slot = Column(String(5), nullable=False)  # Daily local time, "HH:MM"
+    content = Column(Text, nullable=False)
+    active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_scheduled_posts_slot', 'slot', 'id'),
+    )
+
+    def to_dict(self) -> dict:
+        """Convert post object to dictionary"""
+        return {
+            'id': self.id,
+            'chat_id': self.chat_id,
+            'slot': self.slot,
+            'content': self.content,
+            'active': self.active
+        }
+
+class PostDelivery(Base):
+    __tablename__ = 'post_deliveries'
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, nullable=False)
+    chat_id = Column(Integer, nullable=False)
+    slot_run = Column(String(16), nullable=False)  # "YYYY-MM-DD HH:MM" of the slot firing
+    status = Column(String(10), default='queued')  # queued, sent, failed
+    
+    # Unix times
+    planned_at = Column(Float, nullable=False)
+    sent_at = Column(Float, nullable=True)
+    error = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        Index('ix_post_deliveries_slot_run', 'slot_run', 'status'),
+    )
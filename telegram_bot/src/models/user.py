@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from . import Base
@@ -30,6 +30,10 @@ class User(Base):
     
     # Settings and preferences
     settings = Column(JSON, default={})
+
+    __table_args__ = (
+        Index('ix_users_premium_expiry_active', 'premium_expiry', sqlite_where=is_premium == True),
+    )
     
     # Relationships
     conversations = relationship("Conversation", back_populates="user")
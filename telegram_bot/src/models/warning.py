@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, Float
+from . import Base
+
+class GroupWarning(Base):
+    __tablename__ = 'group_warnings'
+
+    chat_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    
+    # Decaying warning score as of updated_at (unix time); it halves every
+    # WARNING_HALF_LIFE_DAYS, so old warnings fade out instead of counting forever
+    score = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(Float, nullable=False)
+
+    def to_dict(self) -> dict:
+        """Convert warning object to dictionary"""
+        return {
+            'chat_id': self.chat_id,
+            'user_id': self.user_id,
+            'score': self.score,
+            'updated_at': self.updated_at
+        }
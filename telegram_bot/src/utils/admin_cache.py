@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from telebot import TeleBot
+from .logger import logger
+
+ADMIN_STATUSES = ('creator', 'administrator')
+
+class AdminStatusCache:
+    """Cached admin rosters, so admin checks are local lookups.
+
+    The first check in a chat loads its whole admin list with one
+    ``get_chat_administrators`` call; later checks for any user of that
+    chat are answered from memory until ``ttl`` expires. ``chat_member``
+    updates patch the roster in place and ``my_chat_member`` updates drop
+    it, so promotions and demotions apply without waiting for the TTL.
+    If reloading a roster fails, the last one loaded keeps answering, even
+    past its TTL, and the reload is retried after ``retry_after`` seconds.
+    """
+
+    def __init__(self, bot: TeleBot, ttl: float = 600, max_chats: int = 10000, retry_after: float = 30):
+        self.bot = bot
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.max_chats = max_chats
+        self._rosters: OrderedDict = OrderedDict()  # chat_id -> (set of admin ids, expires_at)
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'warms': 0,
+            'updates': 0,
+            'invalidations': 0,
+            'errors': 0,
+            'stale_answers': 0
+        }
+
+    def _cached_roster(self, chat_id: int) -> Optional[set]:
+        entry = self._rosters.get(chat_id)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        self._rosters.move_to_end(chat_id)
+        return entry[0]
+
+    def is_admin(self, chat_id: int, user_id: int) -> bool:
+        """Check if user is an admin of chat, loading the chat's roster on a miss"""
+        if chat_id > 0:
+            return False  # Private chats have no admins
+        with self._lock:
+            admins = self._cached_roster(chat_id)
+            if admins is not None:
+                self.stats['hits'] += 1
+                return user_id in admins
+            self.stats['misses'] += 1
+
+        admins = self.warm(chat_id)
+        return admins is not None and user_id in admins
+
+    def warm(self, chat_id: int) -> Optional[set]:
+        """Load a chat's admin roster in one API call; on failure return the last roster loaded, if any"""
+        try:
+            members = self.bot.get_chat_administrators(chat_id)
+        except Exception as e:
+            logger.error(f"Loading admins of chat {chat_id} failed: {str(e)}")
+            with self._lock:
+                self.stats['errors'] += 1
+                entry = self._rosters.get(chat_id)
+                if entry is None:
+                    return None
+                # A stale roster beats treating every admin as a regular member
+                self.stats['stale_answers'] += 1
+                self._rosters[chat_id] = (entry[0], time.monotonic() + self.retry_after)
+                return entry[0]
+
+        admins = {member.user.id for member in members if member.status in ADMIN_STATUSES}
+        with self._lock:
+            self.stats['warms'] += 1
+            self._rosters[chat_id] = (admins, time.monotonic() + self.ttl)
+            self._rosters.move_to_end(chat_id)
+            if len(self._rosters) > self.max_chats:
+                self._rosters.popitem(last=False)
+        return admins
+
+    def update_member(self, chat_id: int, user_id: int, status: str):
+        """Apply a chat_member update to a cached roster"""
+        with self._lock:
+            admins = self._cached_roster(chat_id)
+            if admins is None:
+                return
+            self.stats['updates'] += 1
+            if status in ADMIN_STATUSES:
+                admins.add(user_id)
+            else:
+                admins.discard(user_id)
+
+    def invalidate(self, chat_id: int):
+        with self._lock:
+            if self._rosters.pop(chat_id, None) is not None:
+                self.stats['invalidations'] += 1
+
+    def get_stats(self) -> dict:
+        """Get cache metrics"""
+        with self._lock:
+            stats = dict(self.stats, chats=len(self._rosters))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+# Export
+__all__ = ['AdminStatusCache']
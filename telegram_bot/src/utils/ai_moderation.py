@@ -0,0 +1,186 @@
+import json
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from .logger import logger
+
+SYSTEM_PROMPT = (
+    "You moderate Telegram group chats. You receive a JSON list of messages. "
+    "Flag a message if it is spam, scam, harassment, hate speech or sexual content. "
+    'Reply only with JSON of the form {"flags": [true, false, ...]}, '
+    "one boolean per message, in the same order."
+)
+
+class _Item:
+    __slots__ = ('chat_id', 'text', 'callback', 'queued')
+
+    def __init__(self, chat_id: int, text: str, callback: Callable[[bool, str], None]):
+        self.chat_id = chat_id
+        self.text = text
+        self.callback = callback
+        self.queued = time.monotonic()
+
+class AIModerator:
+    """Classifies group messages with a chat-completions model in micro-batches.
+
+    ``submit`` never blocks: messages are collected for up to
+    ``batch_window`` seconds or ``batch_size`` messages, then one request
+    classifies the whole batch and each message's callback gets
+    ``(flagged, source)``. If the model errors, times out or answers with
+    the wrong shape, the ``fallback`` check (the keyword engine) decides
+    instead and ``source`` is ``'fallback'``.
+
+    At most ``workers`` batches are in flight. While they are, messages wait
+    in the bounded queue, and any message that has waited longer than
+    ``max_wait`` seconds when its batch goes out is decided by the fallback
+    too. ``timeout`` bounds the whole request, not each socket read.
+    """
+
+    def __init__(self, api_url: str, api_key: str, model: str,
+                 fallback: Callable[[str, int], bool], batch_size: int = 20,
+                 batch_window: float = 0.5, timeout: float = 3.0,
+                 max_pending: int = 1000, workers: int = 2, max_wait: float = 5.0):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.fallback = fallback
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-moderation')
+        self._slots = threading.Semaphore(workers)  # Batches in flight
+        self._lock = threading.Lock()
+        self.stats = {
+            'messages': 0,
+            'batches': 0,
+            'flagged': 0,
+            'fallbacks': 0,
+            'dropped_to_fallback': 0,
+            'expired_to_fallback': 0,
+            'total_batch_latency': 0.0
+        }
+        threading.Thread(target=self._collect, name='ai-moderation-batcher', daemon=True).start()
+
+    def submit(self, chat_id: int, text: str, callback: Callable[[bool, str], None]):
+        """Queue text for classification; callback(flagged, source) runs on a worker thread"""
+        try:
+            self._queue.put_nowait(_Item(chat_id, text, callback))
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped_to_fallback'] += 1
+            self._finish(_Item(chat_id, text, callback), self.fallback(text, chat_id), 'fallback')
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Wait for a free worker rather than piling batches up in the executor
+            self._slots.acquire()
+            batch = self._expire(batch)
+            if batch:
+                self._executor.submit(self._classify, batch)
+            else:
+                self._slots.release()
+
+    def _expire(self, batch: List[_Item]) -> List[_Item]:
+        """Decide items that waited past max_wait with the fallback, return the rest"""
+        cutoff = time.monotonic() - self.max_wait
+        fresh = [item for item in batch if item.queued >= cutoff]
+        if len(fresh) < len(batch):
+            with self._lock:
+                self.stats['expired_to_fallback'] += len(batch) - len(fresh)
+            for item in batch:
+                if item.queued < cutoff:
+                    self._finish(item, self.fallback(item.text, item.chat_id), 'fallback')
+        return fresh
+
+    def _request(self, texts: List[str]) -> Optional[List[bool]]:
+        body = json.dumps({
+            'model': self.model,
+            'messages': [
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': json.dumps(texts, ensure_ascii=False)}
+            ],
+            'response_format': {'type': 'json_object'},
+            'temperature': 0
+        }).encode('utf-8')
+        request = urllib.request.Request(
+            self.api_url,
+            data=body,
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {self.api_key}'
+            }
+        )
+        deadline = time.monotonic() + self.timeout
+        chunks = []
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            # The socket timeout applies per read, so a trickling answer is cut off here
+            while True:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"no complete answer within {self.timeout}s")
+                chunk = response.read(16384)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        payload = json.loads(b''.join(chunks))
+        flags = json.loads(payload['choices'][0]['message']['content'])['flags']
+        if len(flags) != len(texts):
+            raise ValueError(f"expected {len(texts)} verdicts, got {len(flags)}")
+        return [bool(flag) for flag in flags]
+
+    def _classify(self, batch: List[_Item]):
+        started = time.monotonic()
+        try:
+            flags = self._request([item.text for item in batch])
+            source = 'ai'
+        except Exception as e:
+            logger.warning(f"AI moderation batch of {len(batch)} fell back to keywords: {str(e)}")
+            flags = [self.fallback(item.text, item.chat_id) for item in batch]
+            source = 'fallback'
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            self.stats['batches'] += 1
+            self.stats['total_batch_latency'] += time.monotonic() - started
+            if source == 'fallback':
+                self.stats['fallbacks'] += len(batch)
+        for item, flagged in zip(batch, flags):
+            self._finish(item, flagged, source)
+
+    def _finish(self, item: _Item, flagged: bool, source: str):
+        with self._lock:
+            self.stats['messages'] += 1
+            if flagged:
+                self.stats['flagged'] += 1
+        try:
+            item.callback(flagged, source)
+        except Exception as e:
+            logger.error(f"AI moderation callback failed: {str(e)}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        batches = stats['batches']
+        batched = stats['messages'] - stats['dropped_to_fallback'] - stats['expired_to_fallback']
+        stats['avg_batch_size'] = batched / batches if batches else 0.0
+        stats['avg_batch_latency'] = stats['total_batch_latency'] / batches if batches else 0.0
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+# Export
+__all__ = ['AIModerator']
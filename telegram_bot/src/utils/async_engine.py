@@ -0,0 +1,149 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from telebot import TeleBot, types
+from telebot.async_telebot import AsyncTeleBot
+from .logger import logger
+
+def update_chat_id(update: types.Update) -> Optional[int]:
+    """Return the chat an update belongs to, or None if it has no chat"""
+    for attr in ('message', 'edited_message', 'channel_post', 'edited_channel_post',
+                 'my_chat_member', 'chat_member', 'chat_join_request'):
+        obj = getattr(update, attr, None)
+        if obj is not None:
+            return obj.chat.id
+    callback_query = getattr(update, 'callback_query', None)
+    if callback_query is not None and callback_query.message is not None:
+        return callback_query.message.chat.id
+    return None
+
+class AsyncEngine:
+    """Asyncio run mode for the bot.
+
+    Updates are fetched with AsyncTeleBot and dispatched concurrently.
+    Updates from the same chat are processed strictly in arrival order. The
+    synchronous handlers registered on ``bot`` run in a pool of
+    ``executor_workers`` threads, so their blocking Telegram and DB calls
+    never block the loop; at most that many updates are handled at once and
+    the rest wait in their chat's queue. Model calls do not hold these
+    threads, since replies stream on the ``ReplyEngine`` loop.
+    """
+
+    def __init__(self, bot: TeleBot, executor_workers: int = 32, poll_timeout: int = 60,
+                 max_pending: int = 10000):
+        self.bot = bot
+        self.api = AsyncTeleBot(bot.token)
+        self.executor_workers = executor_workers
+        self.poll_timeout = poll_timeout
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix='handler')
+        self.allowed_updates: Optional[List[str]] = None
+        self._chat_queues: Dict[object, deque] = {}
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._drained: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {
+            'received': 0,
+            'processed': 0,
+            'failed': 0,
+            'inflight': 0,
+            'active_chats': 0
+        }
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    async def dispatch(self, update: types.Update):
+        """Queue an update behind earlier updates from the same chat"""
+        if self._inflight is None:
+            self._setup_loop_state()
+        while self._pending >= self.max_pending:
+            self._drained.clear()
+            await self._drained.wait()
+
+        self.stats['received'] += 1
+        self._pending += 1
+        key = update_chat_id(update)
+        if key is None:
+            key = ('update', update.update_id)
+
+        queue = self._chat_queues.get(key)
+        if queue is not None:
+            queue.append(update)
+            return
+        self._chat_queues[key] = deque([update])
+        self.stats['active_chats'] = len(self._chat_queues)
+        asyncio.create_task(self._drain_chat(key))
+
+    async def _drain_chat(self, key):
+        queue = self._chat_queues[key]
+        try:
+            while queue:
+                update = queue[0]
+                async with self._inflight:
+                    self.stats['inflight'] += 1
+                    try:
+                        await self._process(update)
+                        self.stats['processed'] += 1
+                    except Exception as e:
+                        self.stats['failed'] += 1
+                        logger.error(f"Update {update.update_id} failed: {str(e)}")
+                    finally:
+                        self.stats['inflight'] -= 1
+                queue.popleft()
+                self._pending -= 1
+                if self._pending < self.max_pending:
+                    self._drained.set()
+        finally:
+            del self._chat_queues[key]
+            self.stats['active_chats'] = len(self._chat_queues)
+
+    async def _process(self, update: types.Update):
+        await self._loop.run_in_executor(self.executor, self.bot.process_new_updates, [update])
+
+    def _setup_loop_state(self):
+        self._loop = asyncio.get_running_loop()
+        # Hold updates in their chat queues rather than in the executor's queue
+        self._inflight = asyncio.Semaphore(self.executor_workers)
+        self._drained = asyncio.Event()
+
+    async def poll(self):
+        """Long-poll getUpdates and dispatch every update"""
+        self._setup_loop_state()
+        await self.api.delete_webhook()
+        offset = None
+        while True:
+            try:
+                updates = await self.api.get_updates(
+                    offset=offset,
+                    timeout=self.poll_timeout,
+                    allowed_updates=self.allowed_updates
+                )
+            except Exception as e:
+                logger.error(f"Polling failed: {str(e)}")
+                await asyncio.sleep(3)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                await self.dispatch(update)
+
+    async def close(self):
+        await self.api.close_session()
+        self.executor.shutdown(wait=True)
+
+    async def _run_polling(self):
+        try:
+            await self.poll()
+        finally:
+            await self.close()
+
+    def run(self):
+        """Run the polling loop until interrupted"""
+        logger.info(f"Async engine starting ({self.executor_workers} handler threads)")
+        asyncio.run(self._run_polling())
+
+# Export
+__all__ = ['AsyncEngine', 'update_chat_id']
@@ -0,0 +1,137 @@
+import gzip
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from .logger import logger
+
+class BackupEngine:
+    """Online SQLite backup compressed with gzip.
+
+    The backup reads the database inside one read transaction, which pins
+    a WAL snapshot: the bot keeps writing meanwhile, and those writes can
+    neither leak into the backup nor make SQLite restart the copy.
+    Databases up to ``max_in_memory`` bytes are serialized and streamed
+    straight into the gzip file, without a temporary copy. Larger ones are
+    copied ``pages_per_step`` pages at a time to a temporary file that is
+    then gzipped in ``CHUNK_SIZE`` chunks, so memory use stays bounded.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, db_path: str, backup_dir: Path, pages_per_step: int = 1024,
+                 step_sleep: float = 0.05, compresslevel: int = 6,
+                 max_in_memory: int = 64 * 1024 * 1024):
+        self.db_path = db_path
+        self.backup_dir = Path(backup_dir)
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.compresslevel = compresslevel
+        self.max_in_memory = max_in_memory
+        self._last_logged_percent = 0
+        self.stats = {
+            'in_progress': False,
+            'backups': 0,
+            'failures': 0,
+            'pages_total': 0,
+            'pages_copied': 0,
+            'last_started': None,
+            'last_duration': None,
+            'last_size': None,
+            'last_compressed_size': None,
+            'last_path': None
+        }
+
+    def create_backup(self) -> Optional[Path]:
+        """Create a compressed backup and return its path, or None on failure"""
+        started = time.monotonic()
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_path = self.backup_dir / f'backup_{timestamp}.db.gz'
+        part_path = backup_path.with_suffix('.gz.part')
+        copy_path = backup_path.with_suffix('.part')
+
+        self.stats.update({
+            'in_progress': True,
+            'pages_total': 0,
+            'pages_copied': 0,
+            'last_started': datetime.now().isoformat()
+        })
+        self._last_logged_percent = 0
+        try:
+            with closing(sqlite3.connect(self.db_path, isolation_level=None)) as src:
+                src.execute('BEGIN')
+                page_count = src.execute('PRAGMA page_count').fetchone()[0]  # Starts the read transaction
+                db_size = page_count * src.execute('PRAGMA page_size').fetchone()[0]
+                if db_size <= self.max_in_memory:
+                    data = memoryview(src.serialize())
+                    src.execute('COMMIT')
+                    self.stats.update({'pages_total': page_count, 'pages_copied': page_count})
+                    with gzip.open(part_path, 'wb', compresslevel=self.compresslevel) as out:
+                        for offset in range(0, len(data), self.CHUNK_SIZE):
+                            out.write(data[offset:offset + self.CHUNK_SIZE])
+                    del data
+                else:
+                    with closing(sqlite3.connect(str(copy_path))) as dst:
+                        src.backup(dst, pages=self.pages_per_step, progress=self._on_progress)
+                    src.execute('COMMIT')
+                    with copy_path.open('rb') as copy, \
+                         gzip.open(part_path, 'wb', compresslevel=self.compresslevel) as out:
+                        shutil.copyfileobj(copy, out, self.CHUNK_SIZE)
+            part_path.rename(backup_path)
+
+            duration = time.monotonic() - started
+            self.stats.update({
+                'backups': self.stats['backups'] + 1,
+                'last_duration': duration,
+                'last_size': db_size,
+                'last_compressed_size': backup_path.stat().st_size,
+                'last_path': str(backup_path)
+            })
+            logger.info(
+                f"Backup created: {backup_path.name} "
+                f"({db_size} bytes -> {self.stats['last_compressed_size']} bytes in {duration:.2f}s)"
+            )
+            return backup_path
+
+        except Exception as e:
+            self.stats['failures'] += 1
+            part_path.unlink(missing_ok=True)
+            logger.error(f"Backup creation failed: {str(e)}")
+            return None
+        finally:
+            copy_path.unlink(missing_ok=True)
+            self.stats['in_progress'] = False
+
+    def _on_progress(self, status: int, remaining: int, total: int):
+        self.stats['pages_total'] = total
+        self.stats['pages_copied'] = total - remaining
+        percent = (total - remaining) * 100 // total if total else 100
+        if percent >= self._last_logged_percent + 10:
+            self._last_logged_percent = percent - percent % 10
+            logger.info(f"Backup progress: {percent}% ({total - remaining}/{total} pages)")
+        if remaining:
+            # Release the source between steps so bot traffic is not blocked
+            time.sleep(self.step_sleep)
+
+    def cleanup_old_backups(self, retention_days: int) -> int:
+        """Delete backups older than the retention period, return number removed"""
+        cutoff_date = datetime.now() - timedelta(days=retention_days)
+        removed = 0
+        # Backups made before the switch to gzip are zip archives
+        for backup_file in [*self.backup_dir.glob('backup_*.db.gz'), *self.backup_dir.glob('backup_*.zip')]:
+            try:
+                timestamp_str = backup_file.name[len('backup_'):].split('.', 1)[0]
+                backup_date = datetime.strptime(timestamp_str, '%Y%m%d_%H%M%S')
+            except ValueError:
+                continue
+
+            if backup_date < cutoff_date:
+                backup_file.unlink()
+                removed += 1
+        return removed
+
+# Export
+__all__ = ['BackupEngine']
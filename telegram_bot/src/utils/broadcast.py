@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import wait
+from typing import Callable, Dict, Optional
+from telebot.apihelper import ApiTelegramException
+from .database import Database
+from .outbound import OutboundDispatcher, PRIORITY_BULK
+from .logger import logger
+
+class BroadcastRunner:
+    """Sends an admin broadcast to every user, resumable after a crash.
+
+    Recipients are read in keyset batches of ``batch_size`` users ordered
+    by users.id, so memory stays flat regardless of the user count. Each
+    batch is sent through the outbound dispatcher's bulk lane, and the
+    counters plus the last delivered users.id are checkpointed to the
+    ``broadcasts`` table once the batch completes. After a restart a
+    broadcast resumes from its checkpoint; at most one batch is re-sent.
+    """
+
+    def __init__(self, db: Database, outbound: OutboundDispatcher, batch_size: int = 500):
+        self.db = db
+        self.outbound = outbound
+        self.batch_size = batch_size
+        self._running: Dict[int, threading.Thread] = {}
+        self._lock = threading.Lock()
+
+    def start(self, broadcast_id: int, on_progress: Optional[Callable[[dict], None]] = None) -> bool:
+        """Run a broadcast in the background; on_progress gets stats after every batch"""
+        with self._lock:
+            if broadcast_id in self._running:
+                return False
+            thread = threading.Thread(
+                target=self._run,
+                args=(broadcast_id, on_progress),
+                name=f'broadcast-{broadcast_id}',
+                daemon=True
+            )
+            self._running[broadcast_id] = thread
+        thread.start()
+        return True
+
+    def resume_all(self, on_progress: Optional[Callable[[dict], None]] = None) -> int:
+        """Resume every broadcast left running by a previous process"""
+        broadcasts = self.db.get_unfinished_broadcasts()
+        for broadcast in broadcasts:
+            logger.info(f"Resuming broadcast {broadcast['id']} after user {broadcast['last_user_id']}")
+            self.start(broadcast['id'], on_progress)
+        return len(broadcasts)
+
+    def _run(self, broadcast_id: int, on_progress: Optional[Callable[[dict], None]]):
+        try:
+            broadcast = self.db.get_broadcast(broadcast_id)
+            if not broadcast or broadcast['status'] != 'running':
+                return
+            self._deliver(broadcast, on_progress)
+        except Exception as e:
+            logger.error(f"Broadcast {broadcast_id} failed: {str(e)}")
+            broadcast = self.db.get_broadcast(broadcast_id)
+            if broadcast:
+                self.db.checkpoint_broadcast(
+                    broadcast_id, broadcast['last_user_id'], broadcast['sent'],
+                    broadcast['failed'], broadcast['blocked'], status='failed'
+                )
+        finally:
+            with self._lock:
+                self._running.pop(broadcast_id, None)
+
+    def _deliver(self, broadcast: dict, on_progress: Optional[Callable[[dict], None]]):
+        counts = {key: broadcast[key] for key in ('sent', 'failed', 'blocked')}
+        cursor = broadcast['last_user_id']
+        started = time.monotonic()
+        delivered_this_run = 0
+
+        while True:
+            recipients = self.db.get_broadcast_recipients(cursor, self.batch_size)
+            if not recipients:
+                break
+
+            futures = [
+                self.outbound.send_message(telegram_id, broadcast['text'], priority=PRIORITY_BULK)
+                for _, telegram_id in recipients
+            ]
+            wait(futures)
+            for future in futures:
+                error = future.exception()
+                if error is None:
+                    counts['sent'] += 1
+                elif isinstance(error, ApiTelegramException) and error.error_code == 403:
+                    counts['blocked'] += 1
+                else:
+                    counts['failed'] += 1
+
+            cursor = recipients[-1][0]
+            delivered_this_run += len(recipients)
+            self.db.checkpoint_broadcast(broadcast['id'], cursor, **counts)
+            if on_progress:
+                elapsed = time.monotonic() - started
+                on_progress(dict(
+                    counts,
+                    id=broadcast['id'],
+                    admin_id=broadcast['admin_id'],
+                    status='running',
+                    throughput=delivered_this_run / elapsed if elapsed else 0.0
+                ))
+
+        self.db.checkpoint_broadcast(broadcast['id'], cursor, status='done', **counts)
+        elapsed = time.monotonic() - started
+        logger.info(f"Broadcast {broadcast['id']} finished: {counts}")
+        if on_progress:
+            on_progress(dict(
+                counts,
+                id=broadcast['id'],
+                admin_id=broadcast['admin_id'],
+                status='done',
+                throughput=delivered_this_run / elapsed if elapsed else 0.0
+            ))
+
+# Export
+__all__ = ['BroadcastRunner']
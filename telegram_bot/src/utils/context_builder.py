@@ -0,0 +1,147 @@
+import re
+import threading
+import time
+from typing import Callable, List
+from .logger import logger
+
+CHARS_PER_TOKEN = 4  # Rough average for Mistral's tokenizer on English text
+MESSAGE_OVERHEAD = 4  # Role and separator tokens per message
+SUMMARY_LINE_CHARS = 160
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+def count_tokens(text: str) -> int:
+    """Estimate the prompt tokens a message costs"""
+    return -(-len(text or '') // CHARS_PER_TOKEN) + MESSAGE_OVERHEAD
+
+def extractive_summary(previous: str, messages: List[dict], max_tokens: int) -> str:
+    """Append the first sentence of each message to a summary, dropping its oldest lines to fit max_tokens"""
+    lines = previous.splitlines() if previous else []
+    for message in messages:
+        content = ' '.join((message.get('content') or '').split())
+        if not content:
+            continue
+        first = _SENTENCE_END.split(content, 1)[0]
+        if len(first) > SUMMARY_LINE_CHARS:
+            first = first[:SUMMARY_LINE_CHARS - 1].rstrip() + '…'
+        lines.append(f"{message['role']}: {first}")
+
+    tokens = [count_tokens(line) for line in lines]
+    total = sum(tokens)
+    drop = 0
+    while total > max_tokens and drop < len(lines):
+        total -= tokens[drop]
+        drop += 1
+    return '\n'.join(lines[drop:])
+
+class ContextBuilder:
+    """Builds the model prompt of a conversation within a token budget.
+
+    Each message's token count is computed once and stored on the message,
+    and the window bounds are kept in the conversation's ``context`` state,
+    so a turn only counts the new messages. The prompt is a running
+    summary of older turns followed by the recent messages. When the
+    recent messages outgrow their share of the budget, the oldest ones
+    leave the window but stay in the prompt until more than
+    ``stale_tokens`` have built up; only then are they folded into the
+    summary. The summary therefore changes every few turns, not on every
+    one.
+    """
+
+    def __init__(self, budget: int = 4000, summary_budget: int = 500, stale_tokens: int = 500,
+                 summarizer: Callable[[str, List[dict], int], str] = extractive_summary):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.stale_tokens = stale_tokens
+        self.window_budget = max(budget - summary_budget - stale_tokens, 0)
+        self.summarizer = summarizer
+        self._lock = threading.Lock()
+        self.stats = {
+            'builds': 0,
+            'summaries': 0,
+            'compacted_messages': 0,
+            'total_prompt_tokens': 0,
+            'max_prompt_tokens': 0,
+            'last_prompt_tokens': 0,
+            'total_build_time': 0.0,
+            'max_build_time': 0.0
+        }
+
+    def build(self, conversation: dict) -> List[dict]:
+        """Get the messages to send for a conversation, updating its cached context state"""
+        started = time.perf_counter()
+        messages = conversation['messages']
+        state = conversation.setdefault('context', {
+            'counted': 0,  # Messages whose tokens are included below
+            'start': 0,  # First message of the window
+            'window_tokens': 0,
+            'summarized': 0,  # Messages folded into the summary
+            'pending_tokens': 0,  # Tokens of messages between summarized and start
+            'summary': ''
+        })
+
+        for message in messages[state['counted']:]:
+            if 'tokens' not in message:
+                message['tokens'] = count_tokens(message['content'])
+            state['window_tokens'] += message['tokens']
+        state['counted'] = len(messages)
+
+        # The newest message always stays in the window, even when it alone is over budget
+        while state['window_tokens'] > self.window_budget and state['start'] < len(messages) - 1:
+            tokens = messages[state['start']]['tokens']
+            state['window_tokens'] -= tokens
+            state['pending_tokens'] += tokens
+            state['start'] += 1
+
+        if state['pending_tokens'] > self.stale_tokens:
+            self._refresh_summary(messages, state)
+
+        prompt = [{'role': m['role'], 'content': m['content']} for m in messages[state['summarized']:]]
+        prompt_tokens = state['window_tokens'] + state['pending_tokens']
+        if state['summary']:
+            summary = "Summary of the earlier conversation:\n" + state['summary']
+            prompt.insert(0, {'role': 'system', 'content': summary})
+            prompt_tokens += count_tokens(summary)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats['builds'] += 1
+            self.stats['total_prompt_tokens'] += prompt_tokens
+            self.stats['max_prompt_tokens'] = max(self.stats['max_prompt_tokens'], prompt_tokens)
+            self.stats['last_prompt_tokens'] = prompt_tokens
+            self.stats['total_build_time'] += elapsed
+            self.stats['max_build_time'] = max(self.stats['max_build_time'], elapsed)
+        return prompt
+
+    def _refresh_summary(self, messages: List[dict], state: dict):
+        # Fold up to a user message, since the model rejects an assistant turn right after the summary
+        end = state['start']
+        while end > state['summarized'] and messages[end]['role'] != 'user':
+            end -= 1
+        if end == state['summarized']:
+            return
+
+        folded = messages[state['summarized']:end]
+        try:
+            summary = self.summarizer(state['summary'], folded, self.summary_budget)
+        except Exception as e:
+            logger.error(f"Conversation summary failed: {str(e)}")
+            return
+        state['summary'] = summary
+        state['pending_tokens'] -= sum(message['tokens'] for message in folded)
+        state['summarized'] = end
+        with self._lock:
+            self.stats['summaries'] += 1
+            self.stats['compacted_messages'] += len(folded)
+
+    def get_stats(self) -> dict:
+        """Get prompt sizes (tokens) and build times (seconds)"""
+        with self._lock:
+            stats = dict(self.stats)
+        builds = stats['builds']
+        stats['avg_prompt_tokens'] = stats['total_prompt_tokens'] / builds if builds else 0.0
+        stats['avg_build_time'] = stats['total_build_time'] / builds if builds else 0.0
+        return stats
+
+# Export
+__all__ = ['ContextBuilder', 'count_tokens', 'extractive_summary']
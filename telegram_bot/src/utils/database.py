@@ -1,78 +1,278 @@
-import sqlite3
-import schedule
+import atexit
+import copy
 import threading
 import time
-import zipfile
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Optional, List
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, text, update
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import QueuePool
-from ..models import Base, User, Conversation
+from ..models import (
+    Base, User, Conversation, ConversationMessage, Broadcast, GroupWarning, ScheduledJob,
+    ScheduledPost, PostDelivery
+)
 from ..config import config
 from .logger import logger
+from .backup import BackupEngine
+from .write_queue import WriteBehindQueue
+from .scheduler import Scheduler
+from .entitlements import EntitlementIndex, to_epoch, from_epoch
+
+_MISSING = object()
+
+def decay(score: float, age: float, half_life: float) -> float:
+    """Value of a decaying score after age seconds"""
+    if not score:
+        return 0.0
+    return score * 0.5 ** (max(age, 0.0) / half_life)
+
+class UserCache:
+    """Bounded LRU cache with TTL for user rows, keyed by telegram_id"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # {telegram_id: (expires_at, user_dict)}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int):
+        """Return cached user dict (None for a known-missing user) or _MISSING"""
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[telegram_id]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(telegram_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, telegram_id: int, user: Optional[dict]):
+        with self._lock:
+            self._entries[telegram_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(telegram_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int):
+        with self._lock:
+            self._entries.pop(telegram_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get cache hit/miss counters"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
 
 class Database:
+    """Data access for the bot.
+
+    Constructing a Database only builds the engines and in-process state;
+    nothing touches the database file until ``setup()`` creates and migrates
+    the schema. ``start()`` then starts the background workers (write-behind
+    queue and scheduler), and ``close()`` stops them again.
+    """
+
     def __init__(self):
-        self.engine = create_engine(
-            f'sqlite:///{config.DB_PATH}',
-            poolclass=QueuePool,
-            pool_size=10,
-            max_overflow=20,
-            pool_timeout=30
-        )
+        # SQLite allows a single writer at a time, so all writes share one
+        # pooled connection while reads get their own pool of connections
+        # that can run concurrently with it under WAL.
+        self.storage_profile = config.DB_STORAGE_PROFILES[config.DB_STORAGE_PROFILE]
+        self.engine = self._create_engine(pool_size=1)
+        self.read_engine = self._create_engine(pool_size=config.DB_READ_POOL_SIZE, read_only=True)
         self.Session = scoped_session(sessionmaker(bind=self.engine))
+        self.ReadSession = scoped_session(sessionmaker(bind=self.read_engine))
+        self.user_cache = UserCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+        self.backup_engine = BackupEngine(
+            config.DB_PATH,
+            config.BACKUP_DIR,
+            pages_per_step=config.DB_BACKUP_PAGES_PER_STEP,
+            step_sleep=config.DB_BACKUP_STEP_SLEEP,
+            max_in_memory=config.DB_BACKUP_MAX_IN_MEMORY
+        )
+        self.write_queue = None
+        self.entitlements = EntitlementIndex(self.get_premium_expiries, config.ENTITLEMENT_REFRESH_SECONDS)
+        self.scheduler = Scheduler(self, workers=config.SCHEDULER_WORKERS)
+
+    def setup(self):
+        """Create and migrate the schema, load the premium index and define the built-in jobs"""
         Base.metadata.create_all(self.engine)
+        self._setup_search_index()
+        self._setup_premium_index()
+        self._migrate_conversation_blobs()
+        self._backfill_search_index()
+        self.entitlements.load()
         self._setup_backup_schedule()
+        self._setup_premium_expiry_schedule()
 
-    def _setup_backup_schedule(self):
-        schedule.every(config.DB_BACKUP_INTERVAL).hours.do(self.create_backup)
-        schedule.every().day.do(self.cleanup_old_backups)
-        
-        backup_thread = threading.Thread(target=self._run_schedule, daemon=True)
-        backup_thread.start()
+    def start(self):
+        """Start the write-behind queue (if configured) and the scheduler"""
+        if config.DB_WRITE_BEHIND:
+            self.enable_write_behind()
+        self.scheduler.start()
 
-    def _run_schedule(self):
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+    def close(self):
+        """Stop background workers, flush pending writes and close all connections"""
+        self.scheduler.stop()
+        self.shutdown()
+        self.Session.remove()
+        self.ReadSession.remove()
+        self.engine.dispose()
+        self.read_engine.dispose()
 
-    def create_backup(self) -> bool:
+    def _create_engine(self, pool_size: int, read_only: bool = False):
+        engine = create_engine(
+            f'sqlite:///{config.DB_PATH}',
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=30,
+            connect_args={'check_same_thread': False}
+        )
+
+        @event.listens_for(engine, 'connect')
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in self.storage_profile.items():
+                cursor.execute(f'PRAGMA {pragma}={value}')
+            if read_only:
+                cursor.execute('PRAGMA query_only=ON')
+            cursor.close()
+            dbapi_connection.create_function('decay', 3, decay, deterministic=True)
+
+        return engine
+
+    def _setup_search_index(self):
+        """Create the FTS5 index over saved conversation titles and messages"""
+        # One row per title (seq 0) and per message; 'owner' holds a u<users.id>
+        # token so searches are restricted to one user inside the FTS query.
+        # Message rows reuse the conversation_messages id as their rowid and
+        # title rows take minus the conversation id, so rows are deleted by rowid.
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS conversation_search USING fts5("
+                "title, content, owner, conversation_id UNINDEXED, seq UNINDEXED, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+
+    def _setup_premium_index(self):
+        """Index the expiry of active subscriptions on databases created before the model declared it"""
+        with self.engine.begin() as connection:
+            # Replaced by the partial index, which skips the many users who never had premium
+            connection.execute(text("DROP INDEX IF EXISTS ix_users_premium_expiry"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_users_premium_expiry_active "
+                "ON users (premium_expiry) WHERE is_premium = 1"
+            ))
+
+    def _backfill_search_index(self):
+        """Index conversations saved before the search index existed"""
+        session = self.Session()
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_path = config.BACKUP_DIR / f'backup_{timestamp}.db'
-            
-            # Create backup
-            with sqlite3.connect(config.DB_PATH) as src, \
-                 sqlite3.connect(str(backup_path)) as dst:
-                src.backup(dst)
-            
-            # Compress backup
-            zip_path = backup_path.with_suffix('.zip')
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.write(backup_path, arcname=backup_path.name)
-            
-            # Remove uncompressed backup
-            backup_path.unlink()
-            return True
-            
+            # Version 3 keys the index rows by rowid
+            if session.execute(text('PRAGMA user_version')).scalar() >= 3:
+                return
+            session.execute(text("DELETE FROM conversation_search"))
+            session.execute(text(
+                "INSERT INTO conversation_search (rowid, title, content, owner, conversation_id, seq) "
+                "SELECT -id, title, '', 'u' || user_id, id, 0 FROM conversations"
+            ))
+            session.execute(text(
+                "INSERT INTO conversation_search (rowid, title, content, owner, conversation_id, seq) "
+                "SELECT m.id, '', m.content, 'u' || c.user_id, c.id, m.seq "
+                "FROM conversation_messages m JOIN conversations c ON c.id = m.conversation_id"
+            ))
+            session.execute(text('PRAGMA user_version = 3'))
+            session.commit()
         except Exception as e:
-            logger.error(f"Backup creation failed: {str(e)}")
-            return False
+            session.rollback()
+            logger.error(f"Search index backfill failed: {str(e)}")
+        finally:
+            session.close()
+
+    def _migrate_conversation_blobs(self):
+        """Move messages out of legacy JSON conversation blobs into conversation_messages"""
+        session = self.Session()
+        try:
+            if session.execute(text('PRAGMA user_version')).scalar() >= 1:
+                return
+            legacy = session.query(Conversation).filter(
+                text("json_extract(conversations.content, '$.messages') IS NOT NULL")
+            ).all()
+            for conversation in legacy:
+                content = dict(conversation.content)
+                self._add_messages(session, conversation.id, content.pop('messages'), start_seq=1)
+                conversation.content = content
+            session.execute(text('PRAGMA user_version = 1'))
+            session.commit()
+            if legacy:
+                logger.info(f"Migrated {len(legacy)} conversations to conversation_messages")
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Conversation migration failed: {str(e)}")
+        finally:
+            session.close()
+
+    def enable_write_behind(self):
+        """Route conversation saves and user updates through a group-commit queue"""
+        if self.write_queue:
+            return
+        self.write_queue = WriteBehindQueue(
+            self.Session,
+            batch_size=config.DB_WRITE_BATCH_SIZE,
+            flush_interval=config.DB_WRITE_FLUSH_MS / 1000,
+            max_size=config.DB_WRITE_QUEUE_SIZE,
+            put_timeout=config.DB_WRITE_PUT_TIMEOUT
+        )
+        atexit.register(self.shutdown)
+
+    def flush_writes(self):
+        """Wait until all queued writes are committed"""
+        if self.write_queue:
+            self.write_queue.flush()
+
+    def shutdown(self):
+        """Flush pending writes and stop background workers"""
+        if self.write_queue:
+            self.write_queue.close()
+
+    def _setup_backup_schedule(self):
+        self.scheduler.register('db_backup', lambda payload: self.create_backup())
+        self.scheduler.register('backup_cleanup', lambda payload: self.cleanup_old_backups())
+        self.scheduler.schedule_interval('db_backup', 'db_backup', config.DB_BACKUP_INTERVAL * 3600)
+        self.scheduler.schedule_interval('backup_cleanup', 'backup_cleanup', 86400)
+
+    def _setup_premium_expiry_schedule(self):
+        self.scheduler.register('premium_expiry', lambda payload: self.expire_premium_users())
+        self.scheduler.schedule_interval('premium_expiry', 'premium_expiry', config.PREMIUM_EXPIRY_SWEEP_SECONDS)
+
+    def create_backup(self) -> bool:
+        return self.backup_engine.create_backup() is not None
 
     def cleanup_old_backups(self):
         try:
-            cutoff_date = datetime.now() - timedelta(days=config.DB_BACKUP_RETENTION)
-            for backup_file in config.BACKUP_DIR.glob('backup_*.rar'):
-                timestamp_str = backup_file.stem.split('_')[1]
-                backup_date = datetime.strptime(timestamp_str, '%Y%m%d_%H%M%S')
-                
-                if backup_date < cutoff_date:
-                    backup_file.unlink()
+            self.backup_engine.cleanup_old_backups(config.DB_BACKUP_RETENTION)
         except Exception as e:
             logger.error(f"Backup cleanup failed: {str(e)}")
 
+    def get_backup_stats(self) -> dict:
+        """Get progress and duration metrics of the backup engine"""
+        return dict(self.backup_engine.stats)
+
     # User Operations
     def add_user(self, user_data: dict) -> bool:
         try:
@@ -80,6 +280,7 @@ class Database:
             user = User(**user_data)
             session.add(user)
             session.commit()
+            self.user_cache.invalidate(user_data.get('telegram_id'))
             return True
         except Exception as e:
             session.rollback()
@@ -89,21 +290,35 @@ class Database:
             session.close()
 
     def get_user(self, telegram_id: int) -> Optional[dict]:
+        cached = self.user_cache.get(telegram_id)
+        if cached is not _MISSING:
+            return dict(cached) if cached else None
         try:
-            session = self.Session()
+            session = self.ReadSession()
             user = session.query(User).filter_by(telegram_id=telegram_id).first()
-            return user.to_dict() if user else None
+            user_data = user.to_dict() if user else None
+            self.user_cache.set(telegram_id, user_data)
+            return dict(user_data) if user_data else None
         finally:
             session.close()
 
     def update_user(self, telegram_id: int, data: dict) -> bool:
+        """Update user fields; queued instead of committed inline in write-behind mode"""
+        # A queued update can't report a missing user, so check before queueing
+        if self.write_queue and self.user_exists(telegram_id):
+            data = copy.deepcopy(data)
+            self.user_cache.invalidate(telegram_id)
+            queued = self.write_queue.submit(
+                lambda session: self._apply_user_update(session, telegram_id, data),
+                on_commit=lambda: self.user_cache.invalidate(telegram_id)
+            )
+            if queued:
+                return True
         try:
             session = self.Session()
-            user = session.query(User).filter_by(telegram_id=telegram_id).first()
-            if user:
-                for key, value in data.items():
-                    setattr(user, key, value)
+            if self._apply_user_update(session, telegram_id, data):
                 session.commit()
+                self.user_cache.invalidate(telegram_id)
                 return True
             return False
         except Exception as e:
@@ -113,6 +328,14 @@ class Database:
         finally:
             session.close()
 
+    def _apply_user_update(self, session, telegram_id: int, data: dict) -> bool:
+        user = session.query(User).filter_by(telegram_id=telegram_id).first()
+        if not user:
+            return False
+        for key, value in data.items():
+            setattr(user, key, value)
+        return True
+
     def delete_user(self, telegram_id: int) -> bool:
         try:
             session = self.Session()
@@ -120,6 +343,7 @@ class Database:
             if user:
                 session.delete(user)
                 session.commit()
+                self.user_cache.invalidate(telegram_id)
                 return True
             return False
         except Exception as e:
@@ -132,14 +356,25 @@ class Database:
     def user_exists(self, telegram_id: int) -> bool:
         """Check if user exists in database"""
         try:
-            session = self.Session()
-            exists = session.query(User).filter_by(telegram_id=telegram_id).first() is not None
-            return exists
+            return self.get_user(telegram_id) is not None
         except Exception as e:
             logger.error(f"Error checking user existence: {str(e)}")
             return False
-        finally:
-            session.close()
+
+    def is_premium_user(self, telegram_id: int) -> bool:
+        """Check if user has an active premium subscription"""
+        return self.entitlements.is_active(telegram_id)
+
+    def update_user_ban_status(self, telegram_id: int, is_banned: bool, reason: str = None) -> bool:
+        """Ban or unban a user"""
+        return self.update_user(telegram_id, {
+            'is_banned': is_banned,
+            'ban_reason': reason if is_banned else None
+        })
+
+    def get_cache_stats(self) -> dict:
+        """Get user cache hit/miss statistics"""
+        return self.user_cache.stats()
 
     # Premium Operations
     def update_premium_status(self, telegram_id: int, is_premium: bool, expiry_date: datetime) -> bool:
@@ -150,6 +385,8 @@ class Database:
                 user.is_premium = is_premium
                 user.premium_expiry = expiry_date
                 session.commit()
+                self.user_cache.invalidate(telegram_id)
+                self.entitlements.set(telegram_id, to_epoch(expiry_date) if is_premium and expiry_date else None)
                 return True
             return False
         except Exception as e:
@@ -159,20 +396,58 @@ class Database:
         finally:
             session.close()
 
+    def get_premium_expiries(self, now: float) -> Dict[int, float]:
+        """Get telegram_id -> expiry (unix time) of subscriptions active at now"""
+        try:
+            session = self.ReadSession()
+            rows = session.query(User.telegram_id, User.premium_expiry).filter(
+                User.is_premium == True,
+                User.premium_expiry > from_epoch(now)
+            ).all()
+            return {telegram_id: to_epoch(expiry) for telegram_id, expiry in rows}
+        finally:
+            session.close()
+
+    def expire_premium_users(self) -> int:
+        """Clear is_premium on every lapsed subscription in one UPDATE"""
+        now = datetime.utcnow()
+        try:
+            session = self.Session()
+            # A single statement, so a renewal committed during the sweep is never expired
+            telegram_ids = session.execute(
+                update(User)
+                .where(User.is_premium == True, User.premium_expiry <= now)
+                .values(is_premium=False)
+                .returning(User.telegram_id)
+            ).scalars().all()
+            session.commit()
+            for telegram_id in telegram_ids:
+                self.user_cache.invalidate(telegram_id)
+            self.entitlements.prune(to_epoch(now))
+            if telegram_ids:
+                logger.info(f"Expired {len(telegram_ids)} premium subscriptions")
+            return len(telegram_ids)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Premium expiry sweep failed: {str(e)}")
+            return 0
+        finally:
+            session.close()
+
     # Conversation Operations
     def save_conversation(self, telegram_id: int, title: str, conversation: dict) -> bool:
+        """Save a conversation; queued instead of committed inline in write-behind mode"""
+        if self.write_queue and self.user_exists(telegram_id):
+            # The caller keeps appending to the live conversation, so queue a snapshot
+            conversation = copy.deepcopy(conversation)
+            queued = self.write_queue.submit(
+                lambda session: self._apply_save_conversation(session, telegram_id, title, conversation)
+            )
+            if queued:
+                return True
         try:
             session = self.Session()
-            user = session.query(User).filter_by(telegram_id=telegram_id).first()
-            if user:
-                conv_data = {
-                    'user_id': user.id,
-                    'title': title,
-                    'content': conversation,
-                    'created_at': datetime.now()
-                }
-                conversation = Conversation(**conv_data)
-                session.add(conversation)
+            if self._apply_save_conversation(session, telegram_id, title, conversation):
                 session.commit()
                 return True
             return False
@@ -181,4 +456,536 @@ class Database:
             logger.error(f"Conversation save failed: {str(e)}")
             return False
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+
+    def _apply_save_conversation(self, session, telegram_id: int, title: str, conversation: dict) -> bool:
+        user = session.query(User).filter_by(telegram_id=telegram_id).first()
+        if not user:
+            return False
+        metadata = {k: v for k, v in conversation.items() if k != 'messages'}
+        saved = Conversation(
+            user_id=user.id,
+            title=title,
+            content=metadata,
+            created_at=datetime.now()
+        )
+        session.add(saved)
+        session.flush()
+        added = self._add_messages(session, saved.id, conversation.get('messages', []), start_seq=1)
+        session.flush()
+        self._index_rows(session, user.id, saved.id, [(-saved.id, title or '', '', 0)])
+        self._index_messages(session, user.id, saved.id, added)
+        return True
+
+    def append_messages(self, conversation_id: int, messages: List[dict]) -> bool:
+        """Append messages to a saved conversation without rewriting its history"""
+        try:
+            session = self.Session()
+            owner_id = session.query(Conversation.user_id).filter_by(id=conversation_id).scalar()
+            if owner_id is None:
+                return False
+            last_seq = session.query(func.max(ConversationMessage.seq)).filter_by(
+                conversation_id=conversation_id
+            ).scalar() or 0
+            added = self._add_messages(session, conversation_id, messages, start_seq=last_seq + 1)
+            session.flush()
+            self._index_messages(session, owner_id, conversation_id, added)
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Message append failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    def _add_messages(self, session, conversation_id: int, messages: List[dict],
+                      start_seq: int) -> List[ConversationMessage]:
+        added = [
+            ConversationMessage(
+                conversation_id=conversation_id,
+                seq=start_seq + offset,
+                role=message.get('role'),
+                content=message.get('content'),
+                ts=datetime.fromisoformat(message['timestamp']) if message.get('timestamp') else datetime.now()
+            )
+            for offset, message in enumerate(messages)
+        ]
+        session.add_all(added)
+        return added
+
+    def _index_messages(self, session, owner_id: int, conversation_id: int, messages: List[ConversationMessage]):
+        """Index flushed messages under their conversation_messages ids"""
+        self._index_rows(session, owner_id, conversation_id, [
+            (message.id, '', message.content or '', message.seq)
+            for message in messages
+        ])
+
+    def _index_rows(self, session, owner_id: int, conversation_id: int, rows: List[tuple]):
+        if not rows:
+            return
+        session.execute(
+            text(
+                "INSERT INTO conversation_search (rowid, title, content, owner, conversation_id, seq) "
+                "VALUES (:rowid, :title, :content, :owner, :conversation_id, :seq)"
+            ),
+            [
+                {
+                    'rowid': rowid,
+                    'title': title,
+                    'content': content,
+                    'owner': f'u{owner_id}',
+                    'conversation_id': conversation_id,
+                    'seq': seq
+                }
+                for rowid, title, content, seq in rows
+            ]
+        )
+
+    def delete_conversation(self, telegram_id: int, conversation_id: int) -> bool:
+        """Delete a user's saved conversation, its messages and its search entries"""
+        try:
+            session = self.Session()
+            conversation = session.query(Conversation) \
+                .join(User, Conversation.user_id == User.id) \
+                .filter(User.telegram_id == telegram_id, Conversation.id == conversation_id) \
+                .first()
+            if not conversation:
+                return False
+            # conversation_id is UNINDEXED in the FTS table, so delete its rows by rowid
+            message_ids = session.query(ConversationMessage.id).filter_by(conversation_id=conversation_id).all()
+            session.execute(
+                text("DELETE FROM conversation_search WHERE rowid = :rowid"),
+                [{'rowid': -conversation_id}] + [{'rowid': message_id} for message_id, in message_ids]
+            )
+            session.query(ConversationMessage).filter_by(conversation_id=conversation_id).delete()
+            session.delete(conversation)
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Conversation deletion failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    def search_conversations(self, telegram_id: int, query: str, offset: int = 0, limit: int = 5) -> List[dict]:
+        """Full-text search over a user's saved conversations, best matches first"""
+        terms = [term.replace('"', '""') for term in query.split()]
+        if not terms:
+            return []
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        try:
+            session = self.ReadSession()
+            owner_id = session.query(User.id).filter_by(telegram_id=telegram_id).scalar()
+            if owner_id is None:
+                return []
+            rows = session.execute(
+                text(
+                    "SELECT s.conversation_id, s.seq, c.title, "
+                    "snippet(conversation_search, -1, '«', '»', '…', 12) AS snippet "
+                    "FROM conversation_search s JOIN conversations c ON c.id = s.conversation_id "
+                    "WHERE conversation_search MATCH :match "
+                    "ORDER BY rank LIMIT :limit OFFSET :offset"
+                ),
+                {
+                    'match': f'owner:u{owner_id} AND {{title content}}: ({match})',
+                    'limit': limit,
+                    'offset': offset
+                }
+            ).all()
+            return [
+                {
+                    'conversation_id': row.conversation_id,
+                    'seq': row.seq,
+                    'title': row.title,
+                    'snippet': row.snippet
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.error(f"Conversation search failed: {str(e)}")
+            return []
+        finally:
+            session.close()
+
+    def get_saved_conversations(self, telegram_id: int, before_id: int = None, limit: int = 10) -> List[dict]:
+        """Get a page of a user's saved conversations, newest first (keyset on id)"""
+        try:
+            session = self.ReadSession()
+            query = session.query(Conversation.id, Conversation.title, Conversation.created_at) \
+                .join(User, Conversation.user_id == User.id) \
+                .filter(User.telegram_id == telegram_id)
+            if before_id:
+                query = query.filter(Conversation.id < before_id)
+            rows = query.order_by(Conversation.id.desc()).limit(limit).all()
+            return [
+                {
+                    'id': row.id,
+                    'title': row.title,
+                    'created_at': row.created_at.isoformat() if row.created_at else None
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.error(f"Error loading saved conversations: {str(e)}")
+            return []
+        finally:
+            session.close()
+
+    def get_conversation_messages(self, telegram_id: int, conversation_id: int,
+                                  after_seq: int = 0, limit: int = 20) -> List[dict]:
+        """Get a page of messages of a user's conversation (keyset on seq)"""
+        try:
+            session = self.ReadSession()
+            rows = session.query(ConversationMessage) \
+                .join(Conversation, ConversationMessage.conversation_id == Conversation.id) \
+                .join(User, Conversation.user_id == User.id) \
+                .filter(
+                    User.telegram_id == telegram_id,
+                    ConversationMessage.conversation_id == conversation_id,
+                    ConversationMessage.seq > after_seq
+                ) \
+                .order_by(ConversationMessage.seq) \
+                .limit(limit).all()
+            return [row.to_dict() for row in rows]
+        except Exception as e:
+            logger.error(f"Error loading conversation messages: {str(e)}")
+            return []
+        finally:
+            session.close()
+
+    # Broadcast Operations
+    def create_broadcast(self, admin_id: int, text: str) -> Optional[int]:
+        try:
+            session = self.Session()
+            broadcast = Broadcast(admin_id=admin_id, text=text, status='running')
+            session.add(broadcast)
+            session.commit()
+            return broadcast.id
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Broadcast creation failed: {str(e)}")
+            return None
+        finally:
+            session.close()
+
+    def get_broadcast(self, broadcast_id: int) -> Optional[dict]:
+        try:
+            session = self.ReadSession()
+            broadcast = session.get(Broadcast, broadcast_id)
+            return broadcast.to_dict() if broadcast else None
+        finally:
+            session.close()
+
+    def get_unfinished_broadcasts(self) -> List[dict]:
+        """Get broadcasts interrupted before completion"""
+        try:
+            session = self.ReadSession()
+            return [b.to_dict() for b in session.query(Broadcast).filter_by(status='running').all()]
+        except Exception as e:
+            logger.error(f"Error loading broadcasts: {str(e)}")
+            return []
+        finally:
+            session.close()
+
+    def get_broadcast_recipients(self, after_user_id: int, limit: int) -> List[tuple]:
+        """Get the next batch of (users.id, telegram_id) of non-banned users (keyset on id)"""
+        session = self.ReadSession()
+        try:
+            return [
+                (row.id, row.telegram_id)
+                for row in session.query(User.id, User.telegram_id)
+                .filter(User.id > after_user_id, User.is_banned.isnot(True))
+                .order_by(User.id)
+                .limit(limit)
+            ]
+        finally:
+            session.close()
+
+    def checkpoint_broadcast(self, broadcast_id: int, last_user_id: int, sent: int,
+                             failed: int, blocked: int, status: str = 'running') -> bool:
+        """Persist broadcast progress so it can resume after a crash"""
+        try:
+            session = self.Session()
+            broadcast = session.get(Broadcast, broadcast_id)
+            if not broadcast:
+                return False
+            broadcast.last_user_id = last_user_id
+            broadcast.sent = sent
+            broadcast.failed = failed
+            broadcast.blocked = blocked
+            broadcast.status = status
+            broadcast.updated_at = datetime.utcnow()
+            if status != 'running':
+                broadcast.finished_at = datetime.utcnow()
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Broadcast checkpoint failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    # Group Warning Operations
+    def get_group_warning(self, chat_id: int, user_id: int) -> Optional[tuple]:
+        """Get (score, updated_at) of a user's warnings in a group"""
+        session = self.ReadSession()
+        try:
+            warning = session.get(GroupWarning, (chat_id, user_id))
+            return (warning.score, warning.updated_at) if warning else None
+        finally:
+            session.close()
+
+    def add_group_warnings(self, increments: List[tuple], half_life: float) -> bool:
+        """Merge (chat_id, user_id, score, as_of) increments into the stored decaying scores"""
+        # Both sides are decayed to the later timestamp in SQL, so increments
+        # from several workers can be merged without reading rows first
+        try:
+            session = self.Session()
+            session.execute(text(
+                "INSERT INTO group_warnings (chat_id, user_id, score, updated_at) "
+                "VALUES (:chat_id, :user_id, :score, :as_of) "
+                "ON CONFLICT (chat_id, user_id) DO UPDATE SET "
+                "score = decay(score, excluded.updated_at - updated_at, :half_life) "
+                "+ decay(excluded.score, updated_at - excluded.updated_at, :half_life), "
+                "updated_at = MAX(updated_at, excluded.updated_at)"
+            ), [
+                {'chat_id': chat_id, 'user_id': user_id, 'score': score, 'as_of': as_of, 'half_life': half_life}
+                for chat_id, user_id, score, as_of in increments
+            ])
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Warning flush failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    def reset_group_warnings(self, resets: List[tuple]) -> bool:
+        """Clear (chat_id, user_id, as_of) warning scores"""
+        try:
+            session = self.Session()
+            session.execute(text(
+                "UPDATE group_warnings SET score = 0, updated_at = :as_of "
+                "WHERE chat_id = :chat_id AND user_id = :user_id"
+            ), [
+                {'chat_id': chat_id, 'user_id': user_id, 'as_of': as_of}
+                for chat_id, user_id, as_of in resets
+            ])
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Warning reset failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    def get_chat_warnings(self, chat_id: int) -> List[tuple]:
+        """Get (user_id, score, updated_at) of every warned user in a group"""
+        session = self.ReadSession()
+        try:
+            return [
+                (row.user_id, row.score, row.updated_at)
+                for row in session.query(GroupWarning).filter_by(chat_id=chat_id)
+            ]
+        finally:
+            session.close()
+
+    def prune_group_warnings(self, before: float) -> int:
+        """Delete warnings untouched since before (unix time)"""
+        try:
+            session = self.Session()
+            deleted = session.query(GroupWarning).filter(GroupWarning.updated_at < before).delete()
+            session.commit()
+            return deleted
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Warning pruning failed: {str(e)}")
+            return 0
+        finally:
+            session.close()
+
+    # Scheduled Job Operations
+    def get_scheduled_jobs(self) -> List[dict]:
+        session = self.ReadSession()
+        try:
+            return [job.to_dict() for job in session.query(ScheduledJob).all()]
+        except Exception as e:
+            logger.error(f"Error loading scheduled jobs: {str(e)}")
+            return []
+        finally:
+            session.close()
+
+    def get_scheduled_job(self, name: str) -> Optional[dict]:
+        session = self.ReadSession()
+        try:
+            job = session.get(ScheduledJob, name)
+            return job.to_dict() if job else None
+        finally:
+            session.close()
+
+    def save_scheduled_job(self, job: dict) -> bool:
+        """Create or replace a scheduled job"""
+        try:
+            session = self.Session()
+            session.merge(ScheduledJob(**job))
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Saving scheduled job failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    def delete_scheduled_job(self, name: str) -> bool:
+        try:
+            session = self.Session()
+            session.query(ScheduledJob).filter_by(name=name).delete()
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Deleting scheduled job failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    def claim_scheduled_job(self, name: str, expected_run: float, next_run: float, now: float) -> bool:
+        """Advance a job's next_run if it is still expected_run; False if another worker got there first"""
+        try:
+            session = self.Session()
+            claimed = session.query(ScheduledJob).filter_by(name=name, next_run=expected_run).update(
+                {'next_run': next_run, 'last_run': now}
+            )
+            session.commit()
+            return claimed == 1
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Claiming scheduled job failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    # Scheduled Post Operations
+    def add_scheduled_post(self, chat_id: int, slot: str, content: str) -> Optional[int]:
+        try:
+            session = self.Session()
+            post = ScheduledPost(chat_id=chat_id, slot=slot, content=content)
+            session.add(post)
+            session.commit()
+            return post.id
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Scheduling post failed: {str(e)}")
+            return None
+        finally:
+            session.close()
+
+    def get_scheduled_posts(self, chat_id: int) -> List[dict]:
+        session = self.ReadSession()
+        try:
+            return [
+                post.to_dict()
+                for post in session.query(ScheduledPost).filter_by(chat_id=chat_id, active=True)
+            ]
+        finally:
+            session.close()
+
+    def get_post_slots(self) -> List[str]:
+        """Get the distinct daily times that have active posts"""
+        session = self.ReadSession()
+        try:
+            return [row.slot for row in session.query(ScheduledPost.slot).filter_by(active=True).distinct()]
+        finally:
+            session.close()
+
+    def count_slot_posts(self, slot: str) -> int:
+        session = self.ReadSession()
+        try:
+            return session.query(func.count(ScheduledPost.id)).filter_by(slot=slot, active=True).scalar()
+        finally:
+            session.close()
+
+    def get_slot_posts(self, slot: str, after_id: int, limit: int) -> List[tuple]:
+        """Get the next batch of (id, chat_id, content) posted at slot (keyset on id)"""
+        session = self.ReadSession()
+        try:
+            return [
+                (row.id, row.chat_id, row.content)
+                for row in session.query(ScheduledPost.id, ScheduledPost.chat_id, ScheduledPost.content)
+                .filter(ScheduledPost.slot == slot, ScheduledPost.active.is_(True), ScheduledPost.id > after_id)
+                .order_by(ScheduledPost.id)
+                .limit(limit)
+            ]
+        finally:
+            session.close()
+
+    def create_post_deliveries(self, deliveries: List[dict]) -> List[int]:
+        """Insert queued deliveries and return their ids in order"""
+        try:
+            session = self.Session()
+            rows = [PostDelivery(status='queued', **delivery) for delivery in deliveries]
+            session.add_all(rows)
+            session.commit()
+            return [row.id for row in rows]
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Recording post deliveries failed: {str(e)}")
+            return []
+        finally:
+            session.close()
+
+    def update_post_deliveries(self, results: List[tuple]) -> bool:
+        """Record (delivery_id, status, sent_at, error) outcomes"""
+        try:
+            session = self.Session()
+            session.execute(text(
+                "UPDATE post_deliveries SET status = :status, sent_at = :sent_at, error = :error "
+                "WHERE id = :id"
+            ), [
+                {'id': delivery_id, 'status': status, 'sent_at': sent_at, 'error': error}
+                for delivery_id, status, sent_at, error in results
+            ])
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Updating post deliveries failed: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+    def get_slot_report(self, slot_run: str) -> Optional[dict]:
+        """Summarise the deliveries of one slot firing"""
+        session = self.ReadSession()
+        try:
+            row = session.execute(text(
+                "SELECT COUNT(*) AS total, "
+                "SUM(status = 'sent') AS sent, SUM(status = 'failed') AS failed, "
+                "SUM(status = 'queued') AS queued, MIN(planned_at) AS first_planned, "
+                "MAX(planned_at) AS last_planned, MAX(sent_at) AS last_sent, "
+                "AVG(CASE WHEN status = 'sent' THEN sent_at - planned_at END) AS avg_delay, "
+                "MAX(CASE WHEN status = 'sent' THEN sent_at - planned_at END) AS max_delay "
+                "FROM post_deliveries WHERE slot_run = :slot_run"
+            ), {'slot_run': slot_run}).mappings().first()
+            if not row or not row['total']:
+                return None
+            report = dict(row, slot_run=slot_run)
+            report['drain_seconds'] = (row['last_sent'] - row['first_planned']) if row['last_sent'] else None
+            return report
+        finally:
+            session.close()
+
+    def get_last_slot_run(self, slot: str) -> Optional[str]:
+        session = self.ReadSession()
+        try:
+            return session.query(func.max(PostDelivery.slot_run)).filter(
+                PostDelivery.slot_run.like(f'% {slot}')
+            ).scalar()
+        finally:
+            session.close()
@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+from .logger import logger
+
+def to_epoch(value: datetime) -> float:
+    """Unix time of a datetime; naive values are UTC, as stored in users.premium_expiry"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def from_epoch(value: float) -> datetime:
+    """Naive UTC datetime of a unix time"""
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+class EntitlementIndex:
+    """In-memory map of premium users to their expiry time.
+
+    Holds ``telegram_id -> expiry`` (unix time) for every active
+    subscription, so premium checks are a dict lookup instead of loading
+    and parsing the user row. It is loaded once at startup and updated
+    whenever this process changes a subscription. It is reloaded in the
+    background after ``refresh_interval`` seconds, to pick up changes
+    made by other workers.
+    """
+
+    def __init__(self, loader: Callable[[float], Dict[int, float]], refresh_interval: float = 300):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._expiries: Dict[int, float] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._recent: Optional[Dict[int, Optional[float]]] = None  # Changes made while a load runs
+        self.stats = {
+            'lookups': 0,
+            'loads': 0,
+            'updates': 0,
+            'expired': 0
+        }
+
+    def load(self) -> bool:
+        """Replace the index with the active subscriptions stored in the database"""
+        with self._lock:
+            self._recent = {}
+        try:
+            expiries = self.loader(time.time())
+        except Exception as e:
+            logger.error(f"Loading premium entitlements failed: {str(e)}")
+            with self._lock:
+                self._recent = None
+                self._refreshing = False
+            return False
+
+        with self._lock:
+            # Changes made while loading may be missing from the snapshot
+            for user_id, expiry in self._recent.items():
+                if expiry is None:
+                    expiries.pop(user_id, None)
+                else:
+                    expiries[user_id] = expiry
+            self._expiries = expiries
+            self._recent = None
+            self._loaded_at = time.monotonic()
+            self._refreshing = False
+            self.stats['loads'] += 1
+        return True
+
+    def expiry(self, user_id: int) -> float:
+        """Expiry time of a user's subscription, 0.0 without one"""
+        with self._lock:
+            self.stats['lookups'] += 1
+            expiry = self._expiries.get(user_id, 0.0)
+            stale = not self._refreshing and time.monotonic() - self._loaded_at >= self.refresh_interval
+            if stale:
+                self._refreshing = True
+        if stale:
+            threading.Thread(target=self.load, name='entitlement-refresh', daemon=True).start()
+        return expiry
+
+    def is_active(self, user_id: int) -> bool:
+        return self.expiry(user_id) > time.time()
+
+    def set(self, user_id: int, expiry: Optional[float]):
+        """Record a user's new expiry time, or None when premium was removed"""
+        with self._lock:
+            if expiry is None:
+                self._expiries.pop(user_id, None)
+            else:
+                self._expiries[user_id] = expiry
+            if self._recent is not None:
+                self._recent[user_id] = expiry
+            self.stats['updates'] += 1
+
+    def prune(self, now: float = None) -> int:
+        """Drop lapsed subscriptions; returns how many were dropped"""
+        now = now or time.time()
+        with self._lock:
+            lapsed = [user_id for user_id, expiry in self._expiries.items() if expiry <= now]
+            for user_id in lapsed:
+                del self._expiries[user_id]
+            self.stats['expired'] += len(lapsed)
+        return len(lapsed)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._expiries))
+
+# Export
+__all__ = ['EntitlementIndex', 'to_epoch', 'from_epoch']
@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Set
+from .moderation import normalize_text
+
+# Verdicts returned by FloodDetector.check
+USER_FLOOD = 'user_flood'
+DUPLICATE = 'duplicate'
+
+SIMHASH_BITS = 64
+SIMHASH_MASK = (1 << SIMHASH_BITS) - 1
+LSH_BANDS = 8
+LSH_BAND_BITS = SIMHASH_BITS // LSH_BANDS
+LSH_BAND_MASK = (1 << LSH_BAND_BITS) - 1
+MAX_TOKENS = 64
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over words and word bigrams, None for texts too short to fingerprint"""
+    words = normalize_text(text).split()
+    if len(words) < 3:
+        return None
+    tokens = (words + [f'{a} {b}' for a, b in zip(words, words[1:])])[:MAX_TOKENS]
+
+    # Bit-sliced counters: planes[i] holds bit i of the per-position count of set bits,
+    # so each token costs a few big-int ops instead of a 64-step loop
+    planes = []
+    for token in tokens:
+        carry = hash(token) & SIMHASH_MASK
+        for i, plane in enumerate(planes):
+            planes[i], carry = plane ^ carry, plane & carry
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+
+    # Set the bits whose count exceeds half the tokens, comparing all 64 counters at once
+    half = len(tokens) // 2
+    greater, equal = 0, SIMHASH_MASK
+    for i in range(len(planes) - 1, -1, -1):
+        if half >> i & 1:
+            equal &= planes[i]
+        else:
+            greater |= equal & planes[i]
+            equal &= ~planes[i]
+    return greater
+
+def _bands(fingerprint: int):
+    return [(band, fingerprint >> (band * LSH_BAND_BITS) & LSH_BAND_MASK) for band in range(LSH_BANDS)]
+
+def _window_full(times: deque, now: float, window: float) -> bool:
+    """Record now; True once maxlen events fall inside window"""
+    times.append(now)
+    return len(times) == times.maxlen and now - times[0] < window
+
+class _ChatState:
+    __slots__ = ('chat_times', 'user_times', 'ring', 'ring_pos', 'bands', 'last_seen')
+
+    def __init__(self, chat_limit: int, ring_size: int):
+        self.chat_times = deque(maxlen=chat_limit)
+        self.user_times: OrderedDict = OrderedDict()  # user_id -> deque of timestamps, LRU
+        self.ring = [None] * ring_size  # (fingerprint, timestamp) of recent messages
+        self.ring_pos = 0
+        self.bands: Dict[tuple, Set[int]] = {}  # (band, value) -> ring slots
+        self.last_seen = 0.0
+
+class FloodDetector:
+    """Per-group flood and near-duplicate spam detection.
+
+    Each group keeps sliding windows of message timestamps per user and
+    for the whole chat, and a ring of the last ``ring_size`` message
+    fingerprints (SimHash) indexed by LSH bands. A message is a duplicate
+    when ``duplicate_limit`` near-identical messages (within
+    ``max_distance`` bits) were seen in ``duplicate_window`` seconds, from
+    any accounts. While the chat itself is flooding (a raid), the
+    duplicate limit drops to 2. Memory per group is bounded by
+    ``ring_size`` and ``max_users``; idle groups are dropped.
+    """
+
+    def __init__(self, user_limit: int = 5, user_window: float = 10,
+                 chat_limit: int = 30, chat_window: float = 10,
+                 duplicate_limit: int = 3, duplicate_window: float = 120,
+                 max_distance: int = 10, ring_size: int = 256, max_users: int = 1000,
+                 idle_ttl: float = 3600):
+        self.user_limit = user_limit
+        self.user_window = user_window
+        self.chat_limit = chat_limit
+        self.chat_window = chat_window
+        self.duplicate_limit = duplicate_limit
+        self.duplicate_window = duplicate_window
+        self.max_distance = max_distance
+        self.ring_size = ring_size
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self._chats: Dict[int, _ChatState] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + idle_ttl
+        self.stats = {
+            'checked': 0,
+            'user_floods': 0,
+            'duplicates': 0,
+            'raids': 0
+        }
+
+    def check(self, chat_id: int, user_id: int, text: Optional[str] = None) -> Optional[str]:
+        """Record a group message and return USER_FLOOD, DUPLICATE or None"""
+        fingerprint = simhash(text) if text else None
+        now = time.monotonic()
+        with self._lock:
+            self.stats['checked'] += 1
+            if now >= self._next_sweep:
+                self._sweep(now)
+            state = self._chats.get(chat_id)
+            if state is None:
+                state = self._chats[chat_id] = _ChatState(self.chat_limit, self.ring_size)
+            state.last_seen = now
+
+            raid = _window_full(state.chat_times, now, self.chat_window)
+            if raid:
+                self.stats['raids'] += 1
+
+            times = state.user_times.get(user_id)
+            if times is None:
+                times = state.user_times[user_id] = deque(maxlen=self.user_limit)
+                if len(state.user_times) > self.max_users:
+                    state.user_times.popitem(last=False)
+            else:
+                state.user_times.move_to_end(user_id)
+            if _window_full(times, now, self.user_window):
+                times.clear()  # Report each burst once
+                self.stats['user_floods'] += 1
+                return USER_FLOOD
+
+            if fingerprint is None:
+                return None
+            limit = 2 if raid else self.duplicate_limit
+            if self._count_similar(state, fingerprint, now, limit - 1) >= limit - 1:
+                self._remember(state, fingerprint, now)
+                self.stats['duplicates'] += 1
+                return DUPLICATE
+            self._remember(state, fingerprint, now)
+            return None
+
+    def _count_similar(self, state: _ChatState, fingerprint: int, now: float, enough: int) -> int:
+        """Count recent near-duplicates of fingerprint, stopping at enough"""
+        seen = set()
+        count = 0
+        for key in _bands(fingerprint):
+            for slot in state.bands.get(key, ()):
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                other, timestamp = state.ring[slot]
+                if now - timestamp <= self.duplicate_window and bin(fingerprint ^ other).count('1') <= self.max_distance:
+                    count += 1
+                    if count >= enough:
+                        return count
+        return count
+
+    def _remember(self, state: _ChatState, fingerprint: int, now: float):
+        slot = state.ring_pos
+        old = state.ring[slot]
+        if old is not None:
+            for key in _bands(old[0]):
+                slots = state.bands.get(key)
+                if slots is not None:
+                    slots.discard(slot)
+                    if not slots:
+                        del state.bands[key]
+        state.ring[slot] = (fingerprint, now)
+        for key in _bands(fingerprint):
+            state.bands.setdefault(key, set()).add(slot)
+        state.ring_pos = (slot + 1) % self.ring_size
+
+    def _sweep(self, now: float):
+        idle = [chat_id for chat_id, state in self._chats.items() if now - state.last_seen > self.idle_ttl]
+        for chat_id in idle:
+            del self._chats[chat_id]
+        self._next_sweep = now + self.idle_ttl
+
+    def reset_user(self, chat_id: int, user_id: int):
+        """Forget a user's message rate, e.g. after they were muted"""
+        with self._lock:
+            state = self._chats.get(chat_id)
+            if state is not None:
+                state.user_times.pop(user_id, None)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, groups=len(self._chats))
+
+# Export
+__all__ = ['FloodDetector', 'simhash', 'USER_FLOOD', 'DUPLICATE']
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Sequence
+
+# Queue order for model calls
+PRIORITY_PREMIUM = 0
+PRIORITY_NORMAL = 1
+
+class AdmissionRejected(Exception):
+    """Raised when a model call is shed instead of being queued or run"""
+
+class AdmissionTicket:
+    """A model call's place in the admission queue; its priority can be raised while it waits"""
+    __slots__ = ('priority', 'entry')
+
+    def __init__(self, priority: int = PRIORITY_NORMAL):
+        self.priority = priority
+        self.entry: Optional[list] = None  # Its heap entry while queued
+
+class AdmissionController:
+    """Caps concurrent model calls and queues the rest by user tier.
+
+    At most ``max_concurrent`` calls hold a slot. Others wait in a
+    priority queue, premium before normal and FIFO within a tier, for at
+    most ``queue_timeouts[priority]`` seconds. A full queue sheds its
+    newest lowest-priority waiter to make room for a higher-priority
+    request, or rejects the newcomer. Timed-out and shed waiters get
+    ``AdmissionRejected``. A waiter queued with a ticket can be promoted
+    to a higher priority, e.g. when a premium request joins a call queued
+    for a normal one; it then also gets that priority's timeout. Used
+    from a single event loop, so it needs no locks.
+    """
+
+    def __init__(self, max_concurrent: int = 16, max_queue: int = 200, queue_timeouts: Sequence[float] = (30, 10)):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeouts = queue_timeouts
+        self._active = 0
+        self._queue: List[list] = []  # [priority, seq, future]; future is None once promoted away
+        self._seq = itertools.count()
+        self.stats = {
+            'admitted': 0,
+            'queued': 0,
+            'shed_full': 0,
+            'shed_timeout': 0,
+            'promoted': 0,
+            'waited': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0
+        }
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL, ticket: AdmissionTicket = None):
+        """Wait for a slot; raises AdmissionRejected when shed"""
+        ticket = ticket or AdmissionTicket(priority)
+        priority = ticket.priority
+        if self._active < self.max_concurrent and not self._waiting():
+            self._active += 1
+            self.stats['admitted'] += 1
+            return
+
+        if self._waiting() >= self.max_queue and not self._shed_below(priority):
+            self.stats['shed_full'] += 1
+            raise AdmissionRejected("queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        ticket.entry = [priority, next(self._seq), future]
+        heapq.heappush(self._queue, ticket.entry)
+        self.stats['queued'] += 1
+        queued_at = time.monotonic()
+        try:
+            while not future.done():
+                # Re-read the deadline after each timeout, since a promotion may extend it
+                remaining = queued_at + self.queue_timeouts[ticket.priority] - time.monotonic()
+                if remaining <= 0:
+                    future.cancel()
+                    self.stats['shed_timeout'] += 1
+                    raise AdmissionRejected("queue timeout")
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            future.result()
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()  # The slot was handed over as the caller went away
+            future.cancel()
+            raise
+        finally:
+            ticket.entry = None
+        wait = time.monotonic() - queued_at
+        self.stats['admitted'] += 1
+        self.stats['waited'] += 1
+        self.stats['total_wait'] += wait
+        self.stats['max_wait'] = max(self.stats['max_wait'], wait)
+
+    def promote(self, ticket: AdmissionTicket, priority: int):
+        """Raise a ticket to priority, moving it up the queue if it is waiting"""
+        if priority >= ticket.priority:
+            return
+        ticket.priority = priority
+        entry = ticket.entry
+        if entry is None or entry[2].done():
+            return
+        # Leave the old entry behind empty and queue the same future again, keeping its arrival order
+        ticket.entry = [priority, entry[1], entry[2]]
+        entry[2] = None
+        heapq.heappush(self._queue, ticket.entry)
+        self.stats['promoted'] += 1
+
+    def release(self):
+        """Free a slot, handing it to the first live waiter"""
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if future is not None and not future.done():
+                future.set_result(True)  # The slot passes over without touching _active
+                return
+        self._active -= 1
+
+    def _waiting(self) -> int:
+        # Timed-out, shed and promoted entries stay in the heap until release() pops them
+        return sum(1 for _, _, future in self._queue if future is not None and not future.done())
+
+    def _shed_below(self, priority: int) -> bool:
+        """Reject the newest waiter of a lower priority than 'priority'"""
+        victims = [entry for entry in self._queue
+                   if entry[0] > priority and entry[2] is not None and not entry[2].done()]
+        if not victims:
+            return False
+        victim = max(victims)
+        victim[2].set_exception(AdmissionRejected("shed for a higher priority request"))
+        self.stats['shed_full'] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get admission counts and queue wait times (seconds)"""
+        stats = dict(self.stats, active=self._active, waiting=self._waiting())
+        stats['avg_wait'] = stats['total_wait'] / stats['waited'] if stats['waited'] else 0.0
+        return stats
+
+# Export
+__all__ = ['AdmissionController', 'AdmissionRejected', 'AdmissionTicket', 'PRIORITY_PREMIUM', 'PRIORITY_NORMAL']
@@ -0,0 +1,179 @@
+import threading
+import unicodedata
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from .logger import logger
+
+# Fold common character substitutions back to the letters they stand for
+LEET_MAP = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't',
+    '@': 'a', '$': 's', '!': 'i', '|': 'l', '+': 't', '€': 'e'
+})
+
+DEFAULT_TERMS = ['spam', 'abuse', 'hate']
+
+def fold_text(text: str) -> str:
+    """Strip accents and casefold"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+def normalize_text(text: str) -> str:
+    """Strip accents, casefold and undo leetspeak so variants match one term"""
+    return fold_text(text).translate(LEET_MAP)
+
+class AhoCorasick:
+    """Multi-pattern automaton: one pass over the text finds every pattern"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Iterable[Tuple[int, int]]:
+        """Yield (start, pattern_index) for every match in text"""
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern_index in output[state]:
+                yield index - len(patterns[pattern_index]) + 1, pattern_index
+
+class Lexicon:
+    """Compiled set of moderation terms.
+
+    Terms match whole words by default; a term written with a leading
+    ``*`` in a lexicon file matches anywhere inside a word.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.whole_word: List[bool] = []
+        patterns = []
+        seen = set()
+        for term in terms:
+            substring = term.startswith('*')
+            pattern = normalize_text(term.lstrip('*').strip())
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            patterns.append(pattern)
+            self.whole_word.append(not substring)
+        self.automaton = AhoCorasick(patterns)
+
+    def __len__(self) -> int:
+        return len(self.automaton.patterns)
+
+    def find(self, text: str) -> Optional[str]:
+        """Return the first matched term in text, or None"""
+        # LEET_MAP maps one character to one, so positions line up. Word
+        # boundaries are judged before it turns punctuation like "spam!" into letters.
+        folded = fold_text(text)
+        normalized = folded.translate(LEET_MAP)
+        length = len(normalized)
+        for start, pattern_index in self.automaton.search(normalized):
+            if self.whole_word[pattern_index]:
+                end = start + len(self.automaton.patterns[pattern_index])
+                if start > 0 and folded[start - 1].isalnum():
+                    continue
+                if end < length and folded[end].isalnum():
+                    continue
+            return self.automaton.patterns[pattern_index]
+        return None
+
+def read_lexicon_file(path: Path) -> List[str]:
+    lines = path.read_text(encoding='utf-8').splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith('#')]
+
+class ModerationEngine:
+    """Keyword moderation with a global lexicon plus optional per-group lexicons.
+
+    Lexicons are read from ``lexicon_dir``: ``global.txt`` applies to every
+    group and ``<chat_id>.txt`` adds terms for one group. ``reload()``
+    compiles new automata in a background thread and swaps them in with a
+    single assignment, so message checks never wait for a rebuild.
+    """
+
+    def __init__(self, lexicon_dir: Path, default_terms: List[str] = None):
+        self.lexicon_dir = Path(lexicon_dir)
+        self.default_terms = default_terms if default_terms is not None else DEFAULT_TERMS
+        self._lexicons: Dict[Optional[int], Lexicon] = {}
+        self._reload_lock = threading.Lock()
+        self._build()
+
+    def _build(self):
+        global_terms = list(self.default_terms)
+        group_terms: Dict[int, List[str]] = {}
+        if self.lexicon_dir.exists():
+            for path in self.lexicon_dir.glob('*.txt'):
+                try:
+                    if path.stem == 'global':
+                        global_terms.extend(read_lexicon_file(path))
+                    else:
+                        group_terms[int(path.stem)] = read_lexicon_file(path)
+                except ValueError:
+                    logger.warning(f"Ignoring lexicon file with invalid name: {path.name}")
+
+        lexicons: Dict[Optional[int], Lexicon] = {None: Lexicon(global_terms)}
+        for chat_id, terms in group_terms.items():
+            lexicons[chat_id] = Lexicon(global_terms + terms)
+        self._lexicons = lexicons
+        logger.info(f"Moderation lexicons loaded: {len(lexicons[None])} global terms, {len(group_terms)} group lexicons")
+
+    def reload(self, background: bool = True):
+        """Rebuild lexicons from disk without blocking message checks"""
+        def rebuild():
+            with self._reload_lock:
+                try:
+                    self._build()
+                except Exception as e:
+                    logger.error(f"Lexicon reload failed: {str(e)}")
+
+        if background:
+            threading.Thread(target=rebuild, name='lexicon-reload', daemon=True).start()
+        else:
+            rebuild()
+
+    def check(self, text: Optional[str], chat_id: int = None) -> Optional[str]:
+        """Return the matched term if text violates the chat's lexicon"""
+        if not text:
+            return None
+        lexicons = self._lexicons
+        lexicon = lexicons.get(chat_id) or lexicons[None]
+        return lexicon.find(text)
+
+# Export
+__all__ = ['ModerationEngine', 'Lexicon', 'AhoCorasick', 'normalize_text', 'fold_text']
@@ -0,0 +1,294 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
+from ..config import config
+from .logger import logger
+
+# Priority lanes, served in this order
+PRIORITY_MODERATION = 0
+PRIORITY_REPLY = 1
+PRIORITY_NORMAL = 2
+PRIORITY_BULK = 3
+
+# Bot methods that take chat_id as a keyword rather than as the first argument
+KEYWORD_CHAT_ID_METHODS = {'edit_message_text', 'edit_message_reply_markup'}
+
+# Moderation actions post nothing to the chat, so only the global budget limits them
+MODERATION_METHODS = {'delete_message', 'restrict_chat_member', 'ban_chat_member'}
+
+class TokenBucket:
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated', 'paused_until')
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate  # tokens per second
+        self.tokens = capacity
+        self.updated = now
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Earliest time a token is available"""
+        self._refill(now)
+        ready = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(ready, self.paused_until)
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+class _Job:
+    __slots__ = ('method', 'chat_id', 'args', 'kwargs', 'priority', 'future', 'created', 'attempts')
+
+    def __init__(self, method: str, chat_id: int, args: tuple, kwargs: dict, priority: int):
+        self.method = method
+        self.chat_id = chat_id
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = Future()
+        self.created = time.monotonic()
+        self.attempts = 0
+
+class OutboundDispatcher:
+    """Central queue for outgoing Telegram calls honouring flood limits.
+
+    Calls are queued in priority lanes (moderation, replies, normal, bulk)
+    and sent by a few worker threads, each send taking a token from the
+    global bucket, the chat's bucket and, for groups, the per-group bucket.
+    Moderation actions (deleting messages, restricting members) have their
+    own lane and take only the global token, so a flood being cleaned up
+    does not wait behind the group's 20 messages a minute. A job whose
+    chat has no token yet is parked until it does, so other chats keep
+    flowing. 429 responses park the job (and its chat) for the
+    ``retry_after`` Telegram returns. Submitting never blocks: callers get
+    a Future and may attach a callback.
+    """
+
+    _instances: Dict[int, 'OutboundDispatcher'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, bot: TeleBot, workers: int = 4, global_rate: float = 30,
+                 chat_rate: float = 1, group_rate_per_minute: float = 20,
+                 max_retries: int = 3):
+        self.bot = bot
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_minute / 60.0
+        self.max_retries = max_retries
+        self._lanes = [deque(), deque(), deque(), deque()]
+        self._parked = []  # heap of (ready_at, priority, seq, job)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._global = TokenBucket(global_rate, global_rate, time.monotonic())
+        self._global_lock = threading.Lock()
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._group_buckets: Dict[int, TokenBucket] = {}
+        self._next_sweep = time.monotonic() + 300
+        self.stats = {
+            'queued': 0,
+            'sent': 0,
+            'failed': 0,
+            'retried': 0,
+            'rate_limited': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0
+        }
+        self._workers = [
+            threading.Thread(target=self._run, name=f'outbound-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @classmethod
+    def for_bot(cls, bot: TeleBot) -> 'OutboundDispatcher':
+        """Get the shared dispatcher of a bot, creating it on first use"""
+        with cls._instances_lock:
+            dispatcher = cls._instances.get(id(bot))
+            if dispatcher is None:
+                dispatcher = cls._instances[id(bot)] = cls(
+                    bot,
+                    workers=config.OUTBOUND_WORKERS,
+                    global_rate=config.OUTBOUND_GLOBAL_RATE,
+                    chat_rate=config.OUTBOUND_CHAT_RATE,
+                    group_rate_per_minute=config.OUTBOUND_GROUP_RATE_PER_MINUTE
+                )
+            return dispatcher
+
+    def submit(self, method: str, chat_id: int, *args, priority: int = PRIORITY_NORMAL,
+               callback: Optional[Callable[[Future], None]] = None,
+               not_before: float = None, **kwargs) -> Future:
+        """Queue bot.<method>(chat_id, *args, **kwargs); not_before is a time.monotonic() deadline"""
+        if method in MODERATION_METHODS:
+            priority = PRIORITY_MODERATION
+        job = _Job(method, chat_id, args, kwargs, priority)
+        if callback:
+            job.future.add_done_callback(callback)
+        with self._cond:
+            self.stats['queued'] += 1
+            if not_before and not_before > time.monotonic():
+                heapq.heappush(self._parked, (not_before, priority, next(self._seq), job))
+            else:
+                self._lanes[priority].append(job)
+            self._cond.notify()
+        return job.future
+
+    def send_message(self, chat_id: int, text: str, priority: int = PRIORITY_NORMAL, **kwargs) -> Future:
+        return self.submit('send_message', chat_id, text, priority=priority, **kwargs)
+
+    def reply_to(self, message, text: str, **kwargs) -> Future:
+        """Answer a message in its chat from the reply lane"""
+        return self.submit('send_message', message.chat.id, text, priority=PRIORITY_REPLY,
+                           reply_to_message_id=message.message_id, **kwargs)
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(lane) for lane in self._lanes) + len(self._parked)
+
+    def get_stats(self) -> dict:
+        """Get delivery metrics"""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['lanes'] = [len(lane) for lane in self._lanes]
+            stats['parked'] = len(self._parked)
+        stats['avg_latency'] = stats['total_latency'] / stats['sent'] if stats['sent'] else 0.0
+        return stats
+
+    def _park(self, job: _Job, ready_at: float):
+        heapq.heappush(self._parked, (ready_at, job.priority, next(self._seq), job))
+
+    def _chat_ready_at(self, chat_id: int, now: float) -> float:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(1, self.chat_rate, now)
+        ready = bucket.ready_at(now)
+        if chat_id < 0:
+            group = self._group_buckets.get(chat_id)
+            if group is None:
+                group = self._group_buckets[chat_id] = TokenBucket(3, self.group_rate, now)
+            ready = max(ready, group.ready_at(now))
+        return ready
+
+    def _take_chat_token(self, chat_id: int, now: float):
+        self._chat_buckets[chat_id].consume(now)
+        if chat_id < 0:
+            self._group_buckets[chat_id].consume(now)
+
+    def _sweep_buckets(self, now: float):
+        for buckets in (self._chat_buckets, self._group_buckets):
+            idle = [chat_id for chat_id, bucket in buckets.items()
+                    if now - bucket.updated > 300 and bucket.paused_until < now]
+            for chat_id in idle:
+                del buckets[chat_id]
+        self._next_sweep = now + 300
+
+    def _next_job(self) -> _Job:
+        """Block until a job may be sent to its chat now, take its chat token and return it"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now >= self._next_sweep:
+                    self._sweep_buckets(now)
+                due = []
+                while self._parked and self._parked[0][0] <= now:
+                    due.append(heapq.heappop(self._parked)[3])
+                # Parked jobs were queued earlier, so they go back in front in their original order
+                for job in reversed(due):
+                    self._lanes[job.priority].appendleft(job)
+
+                moderation = self._lanes[PRIORITY_MODERATION]
+                if moderation:
+                    return moderation.popleft()
+
+                for lane in self._lanes[PRIORITY_REPLY:]:
+                    while lane:
+                        job = lane.popleft()
+                        ready_at = self._chat_ready_at(job.chat_id, now)
+                        if ready_at > now:
+                            self._park(job, ready_at)
+                            continue
+                        self._take_chat_token(job.chat_id, now)
+                        return job
+
+                timeout = self._parked[0][0] - now if self._parked else None
+                self._cond.wait(timeout)
+
+    def _wait_global_token(self):
+        with self._global_lock:
+            now = time.monotonic()
+            ready_at = self._global.ready_at(now)
+            if ready_at > now:
+                time.sleep(ready_at - now)
+                now = ready_at
+            self._global.consume(now)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            self._wait_global_token()
+            self._send(job)
+
+    def _send(self, job: _Job):
+        job.attempts += 1
+        try:
+            if job.method in KEYWORD_CHAT_ID_METHODS:
+                result = getattr(self.bot, job.method)(*job.args, chat_id=job.chat_id, **job.kwargs)
+            else:
+                result = getattr(self.bot, job.method)(job.chat_id, *job.args, **job.kwargs)
+        except ApiTelegramException as e:
+            if e.error_code == 429 and job.attempts <= self.max_retries:
+                retry_after = (e.result_json or {}).get('parameters', {}).get('retry_after', 1)
+                self._retry(job, retry_after, pause_chat=True)
+                with self._cond:
+                    self.stats['rate_limited'] += 1
+                return
+            self._fail(job, e)
+            return
+        except Exception as e:
+            if job.attempts <= self.max_retries:
+                self._retry(job, 2 ** job.attempts)
+                return
+            self._fail(job, e)
+            return
+
+        latency = time.monotonic() - job.created
+        with self._cond:
+            self.stats['sent'] += 1
+            self.stats['total_latency'] += latency
+            self.stats['max_latency'] = max(self.stats['max_latency'], latency)
+        job.future.set_result(result)
+
+    def _retry(self, job: _Job, delay: float, pause_chat: bool = False):
+        with self._cond:
+            ready_at = time.monotonic() + delay
+            if pause_chat and job.chat_id in self._chat_buckets:
+                self._chat_buckets[job.chat_id].paused_until = ready_at
+            self.stats['retried'] += 1
+            self._park(job, ready_at)
+            self._cond.notify()
+
+    def _fail(self, job: _Job, error: Exception):
+        with self._cond:
+            self.stats['failed'] += 1
+        logger.error(f"Outbound {job.method} to {job.chat_id} failed: {str(error)}")
+        job.future.set_exception(error)
+
+# Export
+__all__ = [
+    'OutboundDispatcher',
+    'TokenBucket',
+    'PRIORITY_MODERATION',
+    'PRIORITY_REPLY',
+    'PRIORITY_NORMAL',
+    'PRIORITY_BULK'
+]
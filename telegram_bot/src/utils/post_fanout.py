@@ -0,0 +1,102 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import List
+from .database import Database
+from .outbound import OutboundDispatcher, PRIORITY_BULK
+from .logger import logger
+
+class PostFanout:
+    """Delivers every post of a daily time slot, spread across the slot.
+
+    Instead of sending all posts in the second the slot fires, the ``n``
+    posts of a slot are given evenly spaced, jittered send times over
+    ``spread_seconds`` and handed to the outbound dispatcher's bulk lane
+    with ``not_before``. The dispatcher's workers then send them in
+    parallel under Telegram's rate limits. Every post gets a
+    ``post_deliveries`` row whose status and send time are updated in
+    batches, so ``Database.get_slot_report`` shows how long a slot took
+    to drain.
+    """
+
+    def __init__(self, db: Database, outbound: OutboundDispatcher, spread_seconds: float = 600,
+                 batch_size: int = 1000, flush_interval: float = 2):
+        self.db = db
+        self.outbound = outbound
+        self.spread_seconds = spread_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._results: List[tuple] = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._flush_loop, name='post-fanout', daemon=True).start()
+
+    def deliver_slot(self, slot: str) -> str:
+        """Queue every active post of slot; returns the slot_run key used in post_deliveries"""
+        started = time.time()
+        slot_run = f"{datetime.fromtimestamp(started):%Y-%m-%d} {slot}"
+        total = self.db.count_slot_posts(slot)
+        if not total:
+            return slot_run
+
+        step = self.spread_seconds / total
+        index = 0
+        cursor = 0
+        while True:
+            posts = self.db.get_slot_posts(slot, cursor, self.batch_size)
+            if not posts:
+                break
+            cursor = posts[-1][0]
+
+            # Stratified jitter: post i goes at a random point of the i-th interval
+            planned = [started + (index + i + random.random()) * step for i in range(len(posts))]
+            index += len(posts)
+            delivery_ids = self.db.create_post_deliveries([
+                {'post_id': post_id, 'chat_id': chat_id, 'slot_run': slot_run, 'planned_at': planned_at}
+                for (post_id, chat_id, _), planned_at in zip(posts, planned)
+            ])
+            if len(delivery_ids) != len(posts):
+                logger.error(f"Slot {slot_run}: could not record deliveries, sending untracked")
+                delivery_ids = [None] * len(posts)
+
+            offset = time.monotonic() - time.time()
+            for (_, chat_id, content), planned_at, delivery_id in zip(posts, planned, delivery_ids):
+                self.outbound.submit(
+                    'send_message', chat_id, content,
+                    priority=PRIORITY_BULK,
+                    not_before=planned_at + offset,
+                    callback=self._on_result(delivery_id)
+                )
+
+        logger.info(f"Slot {slot_run}: {index} posts queued over {self.spread_seconds:.0f}s")
+        return slot_run
+
+    def _on_result(self, delivery_id: int):
+        def record(future: Future):
+            if delivery_id is None:
+                return
+            error = future.exception()
+            result = (delivery_id, 'failed' if error else 'sent', time.time(), str(error)[:255] if error else None)
+            with self._lock:
+                self._results.append(result)
+        return record
+
+    def flush(self):
+        """Write buffered delivery outcomes"""
+        with self._lock:
+            results, self._results = self._results, []
+        if results and not self.db.update_post_deliveries(results):
+            with self._lock:
+                self._results[:0] = results
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Delivery status flush failed: {str(e)}")
+
+# Export
+__all__ = ['PostFanout']
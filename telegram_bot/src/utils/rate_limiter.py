@@ -0,0 +1,187 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict
+from ..config import config
+
+class LimiterBackend(ABC):
+    """Storage interface for rate-limit and cooldown state.
+
+    Every operation must be atomic, so several bot workers sharing a
+    backend enforce the limits globally rather than once per process.
+    """
+
+    @abstractmethod
+    def take_token(self, key: str, capacity: float, refill_rate: float) -> bool:
+        """Refill the token bucket for key and consume one token if available"""
+
+    @abstractmethod
+    def check_cooldown(self, key: str, cooldown: float) -> bool:
+        """Return True and restart the cooldown if it has elapsed for key"""
+
+    @abstractmethod
+    def evict_idle(self, idle_ttl: float) -> int:
+        """Drop rate and cooldown state not touched for idle_ttl seconds"""
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+class InMemoryBackend(LimiterBackend):
+    """Process-local backend on monotonic time"""
+
+    def __init__(self):
+        self._buckets: Dict[str, _Bucket] = {}
+        self._cooldowns: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def take_token(self, key: str, capacity: float, refill_rate: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(capacity, now)
+            else:
+                bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * refill_rate)
+                bucket.updated = now
+            if bucket.tokens < 1:
+                return False
+            bucket.tokens -= 1
+            return True
+
+    def check_cooldown(self, key: str, cooldown: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            last_used = self._cooldowns.get(key)
+            if last_used is not None and now - last_used < cooldown:
+                return False
+            self._cooldowns[key] = now
+            return True
+
+    def evict_idle(self, idle_ttl: float) -> int:
+        cutoff = time.monotonic() - idle_ttl
+        with self._lock:
+            buckets = [key for key, bucket in self._buckets.items() if bucket.updated < cutoff]
+            cooldowns = [key for key, last_used in self._cooldowns.items() if last_used < cutoff]
+            for key in buckets:
+                del self._buckets[key]
+            for key in cooldowns:
+                del self._cooldowns[key]
+            return len(buckets) + len(cooldowns)
+
+class SQLiteBackend(LimiterBackend):
+    """Backend shared by all bot processes on one host via a WAL-mode SQLite file.
+
+    Each check is a single atomic upsert on an autocommit connection, so no
+    cross-process locking is needed beyond SQLite's own write lock. The
+    state is disposable, so fsync is disabled to keep checks in the
+    tens of microseconds.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS cooldowns (
+                key TEXT PRIMARY KEY, updated REAL NOT NULL
+            ) WITHOUT ROWID;
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def take_token(self, key: str, capacity: float, refill_rate: float) -> bool:
+        row = self._connection().execute(
+            "INSERT INTO buckets (key, tokens, updated) VALUES (:key, :capacity - 1, :now) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "tokens = min(:capacity, tokens + (:now - updated) * :rate) - 1, updated = :now "
+            "WHERE min(:capacity, tokens + (:now - updated) * :rate) >= 1 "
+            "RETURNING tokens",
+            {'key': key, 'capacity': capacity, 'rate': refill_rate, 'now': time.time()}
+        ).fetchone()
+        return row is not None
+
+    def check_cooldown(self, key: str, cooldown: float) -> bool:
+        row = self._connection().execute(
+            "INSERT INTO cooldowns (key, updated) VALUES (:key, :now) "
+            "ON CONFLICT (key) DO UPDATE SET updated = :now "
+            "WHERE :now - updated >= :cooldown "
+            "RETURNING updated",
+            {'key': key, 'cooldown': cooldown, 'now': time.time()}
+        ).fetchone()
+        return row is not None
+
+    def evict_idle(self, idle_ttl: float) -> int:
+        cutoff = time.time() - idle_ttl
+        connection = self._connection()
+        removed = 0
+        for table in ('buckets', 'cooldowns'):
+            removed += connection.execute(f"DELETE FROM {table} WHERE updated < ?", (cutoff,)).rowcount
+        return removed
+
+def create_backend(name: str = None) -> LimiterBackend:
+    """Create the limiter backend selected by RATE_LIMIT_BACKEND"""
+    name = name or config.RATE_LIMIT_BACKEND
+    if name == 'sqlite':
+        return SQLiteBackend(config.RATE_LIMIT_DB_PATH)
+    if name == 'memory':
+        return InMemoryBackend()
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+class RateLimiter:
+    """Token-bucket message limiter and per-command cooldowns.
+
+    Every check is O(1): the bucket is refilled from the time elapsed since
+    the user's last check instead of keeping a list of message timestamps.
+    State idle for longer than ``idle_ttl`` seconds is evicted in periodic
+    sweeps, at most once every ``sweep_interval`` seconds.
+    """
+
+    def __init__(self, max_per_minute: int, command_cooldown: float,
+                 backend: LimiterBackend = None, idle_ttl: float = 600,
+                 sweep_interval: float = 60):
+        self.capacity = float(max_per_minute)
+        self.refill_rate = max_per_minute / 60.0  # tokens per second
+        self.command_cooldown = command_cooldown
+        self.backend = backend or create_backend()
+        # Keep state while a command cooldown may still apply
+        self.idle_ttl = max(idle_ttl, command_cooldown)
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.backend.evict_idle(self.idle_ttl)
+
+    def allow_message(self, user_id: int) -> bool:
+        """Consume one message token, return False if the user is over the limit"""
+        self._maybe_sweep()
+        return self.backend.take_token(f'msg:{user_id}', self.capacity, self.refill_rate)
+
+    def allow_command(self, user_id: int, command: str) -> bool:
+        """Return False if the user ran this command within the cooldown period"""
+        self._maybe_sweep()
+        return self.backend.check_cooldown(f'cmd:{user_id}:{command}', self.command_cooldown)
+
+    def evict_idle(self) -> int:
+        """Drop state of idle users, return number evicted"""
+        return self.backend.evict_idle(self.idle_ttl)
+
+# Export
+__all__ = ['RateLimiter', 'LimiterBackend', 'InMemoryBackend', 'SQLiteBackend', 'create_backend']
@@ -0,0 +1,268 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import aiohttp
+from .outbound import OutboundDispatcher, PRIORITY_REPLY
+from .llm_admission import AdmissionController, AdmissionRejected, AdmissionTicket, PRIORITY_NORMAL
+from .logger import logger
+
+TELEGRAM_TEXT_LIMIT = 4096
+BUSY_TEXT = "I'm handling a lot of requests right now. Please try again in a minute."
+FAILED_TEXT = "Sorry, I couldn't generate a reply. Please try again."
+
+class AgentStreamClient:
+    """Streams Mistral agent completions over a pooled keep-alive connection.
+
+    One ``aiohttp.ClientSession`` is shared by all requests, so TLS
+    handshakes happen once per pooled connection rather than per reply.
+    ``stream`` yields content deltas parsed from the server-sent events.
+    """
+
+    def __init__(self, api_url: str, api_key: str, agent_id: str, max_connections: int = 100,
+                 timeout: float = 60):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.agent_id = agent_id
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_read=self.timeout),
+                headers={
+                    'Authorization': f'Bearer {self.api_key}',
+                    'Accept': 'text/event-stream'
+                }
+            )
+        return self._session
+
+    async def stream(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Yield reply text deltas for a conversation"""
+        payload = {'agent_id': self.agent_id, 'messages': messages, 'stream': True}
+        async with self._get_session().post(self.api_url, json=payload) as response:
+            response.raise_for_status()
+            async for raw_line in response.content:
+                line = raw_line.decode('utf-8').strip()
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    return
+                choices = json.loads(data).get('choices') or [{}]
+                delta = choices[0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+class _SharedStream:
+    __slots__ = ('chunks', 'done', 'error', 'cond', 'ticket')
+
+    def __init__(self, priority: int):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.cond = asyncio.Condition()
+        self.ticket = AdmissionTicket(priority)
+
+class ReplyEngine:
+    """Generates chat replies from the agent and streams them into Telegram.
+
+    Replies run as coroutines on a private event loop thread, so many can
+    stream at once without tying up handler threads. The first chunk of
+    text is sent as a reply as soon as it arrives; after that the message
+    is edited with the accumulated text at most every ``edit_interval``
+    seconds, plus a final edit when the stream ends. Telegram calls go
+    through the outbound dispatcher's reply lane, and only one call per
+    reply is in flight at a time.
+
+    Model calls are admitted by an ``AdmissionController``; replies it
+    sheds get a "busy" message. Requests with exactly the same messages
+    while one is in flight share its model call and each replay its
+    deltas; the shared call is queued at the highest priority among them.
+    """
+
+    def __init__(self, bot, client: AgentStreamClient, edit_interval: float = 1.0,
+                 admission: AdmissionController = None):
+        self.client = client
+        self.admission = admission or AdmissionController()
+        self._inflight: Dict[str, _SharedStream] = {}
+        self.outbound = OutboundDispatcher.for_bot(bot)
+        self.edit_interval = edit_interval
+        self._loop = asyncio.new_event_loop()
+        self._lock = threading.Lock()
+        self.stats = {
+            'replies': 0,
+            'failed': 0,
+            'busy': 0,
+            'coalesced': 0,
+            'edits': 0,
+            'total_first_text': 0.0,
+            'total_duration': 0.0
+        }
+        threading.Thread(target=self._loop.run_forever, name='reply-engine', daemon=True).start()
+
+    def reply(self, chat_id: int, reply_to_message_id: int, messages: List[dict],
+              on_done: Callable[[Optional[str]], None] = None, priority: int = PRIORITY_NORMAL) -> Future:
+        """Stream a reply to messages; on_done gets the full text (None on failure)"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._reply(chat_id, reply_to_message_id, messages, priority), self._loop
+        )
+        if on_done:
+            future.add_done_callback(lambda f: on_done(None if f.exception() else f.result()))
+        return future
+
+    def deliver(self, chat_id: int, reply_to_message_id: int, text: str):
+        """Send an already known reply, split at Telegram's length limit"""
+        for offset in range(0, len(text), TELEGRAM_TEXT_LIMIT):
+            self.outbound.submit(
+                'send_message', chat_id, text[offset:offset + TELEGRAM_TEXT_LIMIT],
+                priority=PRIORITY_REPLY, reply_to_message_id=reply_to_message_id
+            )
+
+    async def _call(self, method: str, chat_id: int, *args, **kwargs):
+        return await asyncio.wrap_future(
+            self.outbound.submit(method, chat_id, *args, priority=PRIORITY_REPLY, **kwargs)
+        )
+
+    async def _shared_stream(self, messages: List[dict], priority: int) -> AsyncIterator[str]:
+        """Yield completion deltas, joining an identical in-flight model call if there is one"""
+        key = hashlib.sha1(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()
+        shared = self._inflight.get(key)
+        if shared is None:
+            shared = self._inflight[key] = _SharedStream(priority)
+            asyncio.ensure_future(self._produce(key, shared, messages))
+        else:
+            self.admission.promote(shared.ticket, priority)
+            with self._lock:
+                self.stats['coalesced'] += 1
+
+        seen = 0
+        while True:
+            async with shared.cond:
+                await shared.cond.wait_for(lambda: len(shared.chunks) > seen or shared.done)
+                chunks = shared.chunks[seen:]
+                done = shared.done
+            seen += len(chunks)
+            if chunks:
+                yield ''.join(chunks)
+            if done:
+                if shared.error is not None:
+                    raise shared.error
+                return
+
+    async def _produce(self, key: str, shared: _SharedStream, messages: List[dict]):
+        try:
+            await self.admission.acquire(ticket=shared.ticket)
+            try:
+                async for delta in self.client.stream(messages):
+                    async with shared.cond:
+                        shared.chunks.append(delta)
+                        shared.cond.notify_all()
+            finally:
+                self.admission.release()
+        except Exception as e:
+            shared.error = e
+        finally:
+            del self._inflight[key]
+            async with shared.cond:
+                shared.done = True
+                shared.cond.notify_all()
+
+    async def _reply(self, chat_id: int, reply_to_message_id: int, messages: List[dict],
+                     priority: int) -> Optional[str]:
+        started = time.monotonic()
+        text = ''
+        shown = ''  # Text of the current Telegram message as last sent
+        offset = 0  # Start of the current Telegram message within text
+        message_id = None
+        pending: Optional[asyncio.Task] = None
+        first_text_at = None
+        last_edit = 0.0
+
+        async def publish(body: str):
+            nonlocal message_id, shown, last_edit, first_text_at
+            if message_id is None:
+                sent = await self._call('send_message', chat_id, body, reply_to_message_id=reply_to_message_id)
+                message_id = sent.message_id
+                first_text_at = time.monotonic()
+            else:
+                await self._call('edit_message_text', chat_id, body, message_id=message_id)
+                with self._lock:
+                    self.stats['edits'] += 1
+            shown = body
+            last_edit = time.monotonic()
+
+        try:
+            async for delta in self._shared_stream(messages, priority):
+                text += delta
+                if pending is not None and not pending.done():
+                    continue  # Debounce: the next edit carries everything received meanwhile
+                if pending is not None:
+                    pending.result()
+
+                if len(text) - offset > TELEGRAM_TEXT_LIMIT:
+                    # Finish this message at the limit and continue in a new one
+                    await publish(text[offset:offset + TELEGRAM_TEXT_LIMIT])
+                    offset += TELEGRAM_TEXT_LIMIT
+                    message_id, shown = None, ''
+                body = text[offset:]
+                if body.strip() and body != shown and (message_id is None or time.monotonic() - last_edit >= self.edit_interval):
+                    pending = asyncio.ensure_future(publish(body))
+
+            if pending is not None:
+                await pending
+            while len(text) - offset > TELEGRAM_TEXT_LIMIT:
+                await publish(text[offset:offset + TELEGRAM_TEXT_LIMIT])
+                offset += TELEGRAM_TEXT_LIMIT
+                message_id, shown = None, ''
+            if text[offset:].strip() and text[offset:] != shown:
+                await publish(text[offset:])
+            if not text.strip():
+                raise ValueError("empty completion")
+        except Exception as e:
+            busy = isinstance(e, AdmissionRejected)
+            if not busy:
+                logger.error(f"Reply to chat {chat_id} failed: {str(e)}")
+            with self._lock:
+                self.stats['busy' if busy else 'failed'] += 1
+            if pending is not None and not pending.done():
+                pending.cancel()
+            self.outbound.submit(
+                'send_message', chat_id, BUSY_TEXT if busy else FAILED_TEXT,
+                priority=PRIORITY_REPLY, reply_to_message_id=reply_to_message_id
+            )
+            return None
+
+        with self._lock:
+            self.stats['replies'] += 1
+            self.stats['total_duration'] += time.monotonic() - started
+            if first_text_at is not None:
+                self.stats['total_first_text'] += first_text_at - started
+        return text
+
+    def get_stats(self) -> dict:
+        """Get reply counts and average time to first visible text"""
+        with self._lock:
+            stats = dict(self.stats)
+        replies = stats['replies']
+        stats['avg_first_text'] = stats['total_first_text'] / replies if replies else 0.0
+        stats['avg_duration'] = stats['total_duration'] / replies if replies else 0.0
+        stats['admission'] = self.admission.get_stats()
+        return stats
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+# Export
+__all__ = ['ReplyEngine', 'AgentStreamClient']
@@ -0,0 +1,129 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+from .logger import logger
+
+PRUNE_EVERY = 500  # Puts between deletions of expired rows from the SQLite file
+
+def normalize_prompt(text: str) -> str:
+    """Casefold and reduce a prompt to its words, so trivial variations share a cache entry"""
+    return ' '.join(re.findall(r'\w+', unicodedata.normalize('NFKC', text or '').casefold()))
+
+class ResponseCache:
+    """LRU + TTL cache of model replies to standalone prompts.
+
+    Entries are keyed on the normalized prompt plus the settings that
+    shape the answer (personality and language). Up to ``max_entries``
+    replies are kept in memory in LRU order and expire after ``ttl``
+    seconds. With a ``path`` they are also written to a SQLite file, so
+    a restart or another worker starts warm. Each entry remembers how
+    long the model took to produce it, which hits report as latency saved.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1000, ttl: float = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (response, latency, created_at)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, latency REAL NOT NULL, created_at REAL NOT NULL)"
+                )
+            except Exception as e:
+                logger.error(f"Response cache persistence disabled: {str(e)}")
+                self._db = None
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'disk_hits': 0,
+            'latency_saved': 0.0
+        }
+
+    @staticmethod
+    def make_key(prompt: str, personality: str, language: str) -> Optional[str]:
+        """Cache key of a prompt, or None if it has no words to match on"""
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return None
+        return hashlib.sha1(f"{personality}\x00{language}\x00{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached reply"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] >= self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                entry = self._load(key, now)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            self.stats['latency_saved'] += entry[1]
+            return entry[0]
+
+    def _load(self, key: str, now: float) -> Optional[tuple]:
+        try:
+            row = self._db.execute(
+                "SELECT response, latency, created_at FROM response_cache WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"Response cache read failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        self.stats['disk_hits'] += 1
+        self._remember(key, row)
+        return row
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key: str, response: str, latency: float):
+        """Cache a reply that took latency seconds to generate"""
+        entry = (response, latency, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            self.stats['stores'] += 1
+            if self._db is None:
+                return
+            self._puts += 1
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, response, latency, created_at) VALUES (?, ?, ?, ?)",
+                    (key, *entry)
+                )
+                if self._puts % PRUNE_EVERY == 0:
+                    self._db.execute("DELETE FROM response_cache WHERE created_at <= ?", (entry[2] - self.ttl,))
+            except Exception as e:
+                logger.error(f"Response cache write failed: {str(e)}")
+
+    def get_stats(self) -> dict:
+        """Get hit ratio and model time saved (seconds)"""
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+# Export
+__all__ = ['ResponseCache', 'normalize_prompt']
@@ -0,0 +1,235 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+from .logger import logger
+
+RETRY_SECONDS = 5  # Retry delay for jobs whose handler is not registered yet or whose claim failed
+MAX_SLEEP_SECONDS = 60  # Re-check the heap at least this often in case the wall clock jumps
+
+def next_daily_run(daily_at: str, after: float) -> float:
+    """Next unix time strictly after 'after' at local time HH:MM"""
+    hour, minute = (int(part) for part in daily_at.split(':'))
+    base = datetime.fromtimestamp(after)
+    run = base.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run.timestamp() <= after:
+        run += timedelta(days=1)
+    return run.timestamp()
+
+class Scheduler:
+    """Persistent job scheduler with one timer thread and a worker pool.
+
+    Jobs run a handler registered by name, either every ``interval_seconds``
+    or daily at a local ``HH:MM``, and are stored in the ``scheduled_jobs``
+    table so they survive restarts. Due times sit in a min-heap; the timer
+    thread sleeps until the earliest one and hands due jobs to the pool.
+    Before running, a job is claimed by moving its ``next_run`` in the
+    database, so when several workers share the database only one of them
+    fires each run. Jobs missed while the bot was down run once on start.
+    """
+
+    def __init__(self, db, workers: int = 4):
+        self.db = db
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+        self._jobs: Dict[str, dict] = {}
+        self._heap: List[tuple] = []  # (fire_at, seq, name, next_run the entry was pushed for)
+        self._seq = itertools.count()
+        self._running: Set[str] = set()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler')
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.stats = {
+            'runs': 0,
+            'failures': 0,
+            'skipped_overlap': 0,
+            'claimed_elsewhere': 0,
+            'total_lateness': 0.0,
+            'max_lateness': 0.0
+        }
+        self._lateness: Dict[str, float] = {}
+
+    def register(self, handler: str, func: Callable[[dict], None]):
+        """Make func(payload) available to jobs naming handler"""
+        with self._cond:
+            self._handlers[handler] = func
+
+    def start(self):
+        """Load persisted jobs and start the timer thread"""
+        with self._cond:
+            if self._thread or self._stopped:
+                return
+            for job in self.db.get_scheduled_jobs():
+                # Jobs defined before start() are already queued
+                if job['enabled'] and job['name'] not in self._jobs:
+                    self._jobs[job['name']] = job
+                    self._push(job['next_run'], job)
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+        logger.info(f"Scheduler started with {len(self._jobs)} persisted jobs")
+
+    def stop(self, wait: bool = True):
+        """Stop the timer thread; with wait, also wait for running jobs to finish"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def schedule_interval(self, name: str, handler: str, seconds: int, payload: dict = None):
+        """Run handler every 'seconds'; re-defining an unchanged job keeps its next run"""
+        self._define({
+            'name': name,
+            'handler': handler,
+            'payload': payload or {},
+            'interval_seconds': seconds,
+            'daily_at': None
+        })
+
+    def schedule_daily(self, name: str, handler: str, at: str, payload: dict = None):
+        """Run handler every day at local time 'at' (HH:MM)"""
+        self._define({
+            'name': name,
+            'handler': handler,
+            'payload': payload or {},
+            'interval_seconds': None,
+            'daily_at': at
+        })
+
+    def cancel(self, name: str) -> bool:
+        with self._cond:
+            if self._jobs.pop(name, None) is None:
+                return False
+        return self.db.delete_scheduled_job(name)
+
+    def jobs(self, handler: str = None) -> List[dict]:
+        with self._cond:
+            return [dict(job) for job in self._jobs.values() if handler is None or job['handler'] == handler]
+
+    def _define(self, spec: dict):
+        now = time.time()
+        with self._cond:
+            existing = self._jobs.get(spec['name'])
+            known = existing is not None
+            if not known:
+                # Jobs are usually defined before start() loads them, so check the stored row too
+                existing = self.db.get_scheduled_job(spec['name'])
+            if existing and all(existing[key] == value for key, value in spec.items()):
+                if not known:
+                    self._jobs[existing['name']] = existing
+                    if existing['enabled']:
+                        self._push(existing['next_run'], existing)
+                        self._cond.notify()
+                return
+            job = dict(spec, next_run=self._next_run(spec, now), last_run=None, enabled=True)
+            if not self.db.save_scheduled_job(job):
+                return
+            self._jobs[job['name']] = job
+            self._push(job['next_run'], job)
+            self._cond.notify()
+
+    def _next_run(self, job: dict, after: float) -> float:
+        if job['daily_at']:
+            return next_daily_run(job['daily_at'], after)
+        return after + job['interval_seconds']
+
+    def _push(self, fire_at: float, job: dict):
+        heapq.heappush(self._heap, (fire_at, next(self._seq), job['name'], job['next_run']))
+
+    def _due_jobs(self) -> List[dict]:
+        """Sleep until at least one job is due and return the due jobs, or None once stopped"""
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, name, next_run = heapq.heappop(self._heap)
+                    job = self._jobs.get(name)
+                    # Entries of cancelled or rescheduled jobs are dropped lazily
+                    if job is not None and job['next_run'] == next_run and job not in due:
+                        due.append(job)
+                if due:
+                    return due
+                timeout = min(self._heap[0][0] - now, MAX_SLEEP_SECONDS) if self._heap else MAX_SLEEP_SECONDS
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            due = self._due_jobs()
+            if due is None:
+                return
+            for job in due:
+                try:
+                    self._fire(job)
+                except Exception as e:
+                    logger.error(f"Scheduling job {job['name']} failed: {str(e)}")
+
+    def _fire(self, job: dict):
+        now = time.time()
+        scheduled = job['next_run']
+        with self._cond:
+            if job['handler'] not in self._handlers:
+                self._push(now + RETRY_SECONDS, job)
+                return
+
+        next_run = self._next_run(job, scheduled)
+        if next_run <= now:
+            next_run = self._next_run(job, now)  # Skip runs missed while down
+        claimed = self.db.claim_scheduled_job(job['name'], scheduled, next_run, now)
+
+        with self._cond:
+            if job['name'] not in self._jobs:
+                return
+            if not claimed:
+                self.stats['claimed_elsewhere'] += 1
+                stored = self.db.get_scheduled_job(job['name'])
+                if stored is None:
+                    del self._jobs[job['name']]
+                    return
+                job['next_run'] = stored['next_run']
+                self._push(max(job['next_run'], now + RETRY_SECONDS), job)
+                return
+
+            job['next_run'] = next_run
+            job['last_run'] = now
+            self._push(next_run, job)
+            if job['name'] in self._running:
+                self.stats['skipped_overlap'] += 1
+                return
+            self._running.add(job['name'])
+            func = self._handlers[job['handler']]
+        self._executor.submit(self._execute, job['name'], func, dict(job['payload']), scheduled)
+
+    def _execute(self, name: str, func: Callable[[dict], None], payload: dict, scheduled: float):
+        lateness = max(time.time() - scheduled, 0.0)
+        try:
+            func(payload)
+            failed = False
+        except Exception as e:
+            failed = True
+            logger.error(f"Scheduled job {name} failed: {str(e)}")
+        with self._cond:
+            self._running.discard(name)
+            self._lateness[name] = lateness
+            self.stats['runs'] += 1
+            self.stats['failures'] += failed
+            self.stats['total_lateness'] += lateness
+            self.stats['max_lateness'] = max(self.stats['max_lateness'], lateness)
+
+    def get_stats(self) -> dict:
+        """Get run counts and how late jobs fired (seconds)"""
+        with self._cond:
+            stats = dict(self.stats, jobs=len(self._jobs), running=len(self._running))
+            stats['last_lateness'] = dict(self._lateness)
+        stats['avg_lateness'] = stats['total_lateness'] / stats['runs'] if stats['runs'] else 0.0
+        return stats
+
+# Export
+__all__ = ['Scheduler', 'next_daily_run']
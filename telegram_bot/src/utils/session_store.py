@@ -0,0 +1,196 @@
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from .logger import logger
+
+class ConversationStore:
+    """Dict-like store of active conversations with a memory budget.
+
+    Conversations are kept in LRU order. When the estimated resident size
+    exceeds ``memory_budget`` bytes, or a conversation has been idle for
+    ``idle_timeout`` seconds, the least recently used ones are spilled to a
+    SQLite file and loaded back transparently on the next access. Resident
+    conversations are spilled on shutdown so they survive restarts.
+
+    A spill drops the resident object, so code that changes a conversation
+    holds it through ``use``: pinned conversations are never spilled and
+    the change cannot land on a copy that was already written to disk.
+    """
+
+    def __init__(self, spill_path: str, memory_budget: int, idle_timeout: float = 3600):
+        self.memory_budget = memory_budget
+        self.idle_timeout = idle_timeout
+        self._resident: OrderedDict = OrderedDict()  # {user_id: conversation}
+        self._meta: Dict[int, list] = {}  # {user_id: [size_bytes, last_access]}
+        self._pins: Dict[int, int] = {}  # {user_id: callers inside use()}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._spill = sqlite3.connect(spill_path, check_same_thread=False, isolation_level=None)
+        self._spill.execute('PRAGMA journal_mode=WAL')
+        self._spill.execute(
+            "CREATE TABLE IF NOT EXISTS spilled_conversations ("
+            "user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, spilled_at REAL NOT NULL)"
+        )
+        self.stats_counters = {'spills': 0, 'reloads': 0}
+        self._started = time.monotonic()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _estimate_size(conversation: dict) -> int:
+        return len(json.dumps(conversation, default=str))
+
+    def __contains__(self, user_id: int) -> bool:
+        with self._lock:
+            if user_id in self._resident:
+                return True
+            return self._spill.execute(
+                "SELECT 1 FROM spilled_conversations WHERE user_id = ?", (user_id,)
+            ).fetchone() is not None
+
+    def __getitem__(self, user_id: int) -> dict:
+        with self._lock:
+            conversation = self._resident.get(user_id)
+            if conversation is None:
+                conversation = self._reload(user_id)
+                if conversation is None:
+                    raise KeyError(user_id)
+            else:
+                self._resident.move_to_end(user_id)
+                self._meta[user_id][1] = time.monotonic()
+            return conversation
+
+    def get(self, user_id: int, default=None) -> Optional[dict]:
+        try:
+            return self[user_id]
+        except KeyError:
+            return default
+
+    def __setitem__(self, user_id: int, conversation: dict):
+        with self._lock:
+            self._discard(user_id)
+            self._admit(user_id, conversation)
+            self._spill.execute("DELETE FROM spilled_conversations WHERE user_id = ?", (user_id,))
+            self._enforce_budget()
+
+    def __delitem__(self, user_id: int):
+        with self._lock:
+            resident = self._discard(user_id)
+            deleted = self._spill.execute(
+                "DELETE FROM spilled_conversations WHERE user_id = ?", (user_id,)
+            ).rowcount
+            if not resident and not deleted:
+                raise KeyError(user_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            spilled = self._spill.execute("SELECT count(*) FROM spilled_conversations").fetchone()[0]
+            return len(self._resident) + spilled
+
+    @contextmanager
+    def use(self, user_id: int) -> Iterator[dict]:
+        """Pin a conversation in memory while the caller changes it; KeyError if there is none"""
+        with self._lock:
+            conversation = self[user_id]
+            self._pins[user_id] = self._pins.get(user_id, 0) + 1
+        try:
+            yield conversation
+        finally:
+            with self._lock:
+                if self._pins[user_id] == 1:
+                    del self._pins[user_id]
+                else:
+                    self._pins[user_id] -= 1
+                self._enforce_budget()
+
+    def touch(self, user_id: int, added_bytes: int = None):
+        """Record that a resident conversation changed; pass added_bytes to skip re-measuring"""
+        with self._lock:
+            if user_id not in self._resident:
+                return
+            meta = self._meta[user_id]
+            size = meta[0] + added_bytes if added_bytes is not None else self._estimate_size(self._resident[user_id])
+            self._bytes += size - meta[0]
+            meta[0] = size
+            meta[1] = time.monotonic()
+            self._resident.move_to_end(user_id)
+            self._enforce_budget()
+
+    def _admit(self, user_id: int, conversation: dict):
+        size = self._estimate_size(conversation)
+        self._resident[user_id] = conversation
+        self._meta[user_id] = [size, time.monotonic()]
+        self._bytes += size
+
+    def _discard(self, user_id: int) -> bool:
+        if user_id not in self._resident:
+            return False
+        del self._resident[user_id]
+        self._bytes -= self._meta.pop(user_id)[0]
+        return True
+
+    def _reload(self, user_id: int) -> Optional[dict]:
+        row = self._spill.execute(
+            "SELECT data FROM spilled_conversations WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        conversation = json.loads(row[0])
+        self._spill.execute("DELETE FROM spilled_conversations WHERE user_id = ?", (user_id,))
+        self._admit(user_id, conversation)
+        self.stats_counters['reloads'] += 1
+        self._enforce_budget(keep=user_id)
+        return conversation
+
+    def _spill_one(self, user_id: int):
+        conversation = self._resident[user_id]
+        self._spill.execute(
+            "INSERT OR REPLACE INTO spilled_conversations (user_id, data, spilled_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(conversation, default=str), time.time())
+        )
+        self._discard(user_id)
+        self.stats_counters['spills'] += 1
+
+    def _enforce_budget(self, keep: int = None):
+        idle_cutoff = time.monotonic() - self.idle_timeout
+        for user_id in list(self._resident):
+            if user_id == keep or user_id in self._pins:
+                continue
+            over_budget = self._bytes > self.memory_budget
+            if not over_budget and self._meta[user_id][1] > idle_cutoff:
+                break
+            try:
+                self._spill_one(user_id)
+            except Exception as e:
+                logger.error(f"Conversation spill failed: {str(e)}")
+                break
+
+    def flush(self):
+        """Spill every resident conversation to disk"""
+        with self._lock:
+            for user_id in list(self._resident):
+                try:
+                    self._spill_one(user_id)
+                except Exception as e:
+                    logger.error(f"Conversation spill failed: {str(e)}")
+
+    def stats(self) -> dict:
+        """Get resident count/bytes and spill/reload rates"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            return {
+                'resident_count': len(self._resident),
+                'resident_bytes': self._bytes,
+                'memory_budget': self.memory_budget,
+                'spills': self.stats_counters['spills'],
+                'reloads': self.stats_counters['reloads'],
+                'spills_per_minute': self.stats_counters['spills'] * 60 / elapsed,
+                'reloads_per_minute': self.stats_counters['reloads'] * 60 / elapsed
+            }
+
+# Export
+__all__ = ['ConversationStore']
@@ -0,0 +1,202 @@
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+from .database import Database, decay
+from .logger import logger
+
+T = TypeVar('T')
+
+class _Entry:
+    __slots__ = ('stored', 'stored_at', 'pending', 'pending_at', 'loaded', 'generation')
+
+    def __init__(self, stored: float, stored_at: float, loaded: float):
+        self.stored = stored  # Score persisted in the database, as of stored_at
+        self.stored_at = stored_at
+        self.pending = 0.0  # Increments not flushed yet, as of pending_at
+        self.pending_at = stored_at
+        self.loaded = loaded
+        self.generation = 0  # Bumped on reset, so in-flight flushes of older increments are ignored
+
+    def score(self, now: float, half_life: float) -> float:
+        return decay(self.stored, now - self.stored_at, half_life) + decay(self.pending, now - self.pending_at, half_life)
+
+class WarningLedger:
+    """Decaying per-group warning scores, persisted in the database.
+
+    A warning adds 1 to a user's score, and the score halves every
+    ``half_life`` seconds, so old warnings fade instead of counting
+    forever. Scores of recently warned users stay in memory. Increments
+    are flushed in one batch every ``flush_interval`` seconds, merged in
+    SQL so several workers can share the table. Cached scores are
+    re-read after ``refresh_interval`` to pick up other workers' warnings.
+    Those reads happen outside the ledger lock, so a slow database does not
+    stall warnings in other groups; the result is merged under the lock.
+    """
+
+    def __init__(self, db: Database, half_life: float = 7 * 86400, flush_interval: float = 5,
+                 refresh_interval: float = 60, max_entries: int = 50000):
+        self.db = db
+        self.half_life = half_life
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # (chat_id, user_id) -> _Entry
+        self._resets: Dict[Tuple[int, int], float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushing = False
+        self._flush_epoch = 0  # Flushes started, to spot reads that a flush overtook
+        self._stop = threading.Event()
+        self.stats = {
+            'warnings': 0,
+            'loads': 0,
+            'flushes': 0,
+            'flushed_rows': 0
+        }
+        self._thread = threading.Thread(target=self._run, name='warning-ledger', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _cached(self, key: Tuple[int, int], now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        # While a flush is being written the stored score is in flux, so keep the cached one
+        if entry is not None and (self._flushing or now - entry.loaded < self.refresh_interval):
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    def _merge(self, key: Tuple[int, int], stored: Optional[tuple], now: float, epoch: int) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is not None and (self._flushing or epoch != self._flush_epoch):
+            # A flush moved pending increments into the stored score after the read
+            self._entries.move_to_end(key)
+            return entry
+        if entry is None:
+            entry = _Entry(0.0, now, now)
+            self._entries[key] = entry
+            self._evict()
+        entry.stored, entry.stored_at = stored if stored else (0.0, now)
+        entry.loaded = now
+        self._entries.move_to_end(key)
+        return entry
+
+    def _update(self, key: Tuple[int, int], apply: Callable[[_Entry, float], T]) -> T:
+        """Run apply(entry, now) under the lock, re-reading a stale entry from the database outside it"""
+        now = time.time()
+        with self._lock:
+            entry = self._cached(key, now)
+            if entry is not None:
+                return apply(entry, now)
+            epoch = self._flush_epoch
+
+        stored = self.db.get_group_warning(*key)
+        with self._lock:
+            self.stats['loads'] += 1
+            entry = self._cached(key, now) or self._merge(key, stored, now, epoch)
+            return apply(entry, now)
+
+    def _evict(self):
+        # Entries with unflushed increments are kept until the next flush
+        while len(self._entries) > self.max_entries:
+            for key, entry in self._entries.items():
+                if not entry.pending and key not in self._resets:
+                    del self._entries[key]
+                    break
+            else:
+                return
+
+    def add(self, chat_id: int, user_id: int) -> float:
+        """Record a warning and return the user's new score in the group"""
+        def apply(entry: _Entry, now: float) -> float:
+            entry.pending = decay(entry.pending, now - entry.pending_at, self.half_life) + 1
+            entry.pending_at = now
+            self.stats['warnings'] += 1
+            return entry.score(now, self.half_life)
+
+        return self._update((chat_id, user_id), apply)
+
+    def get(self, chat_id: int, user_id: int) -> float:
+        return self._update((chat_id, user_id), lambda entry, now: entry.score(now, self.half_life))
+
+    def reset(self, chat_id: int, user_id: int):
+        """Clear a user's warnings in a group"""
+        def apply(entry: _Entry, now: float):
+            entry.stored, entry.stored_at = 0.0, now
+            entry.pending, entry.pending_at = 0.0, now
+            entry.generation += 1
+            self._resets[(chat_id, user_id)] = now
+
+        self._update((chat_id, user_id), apply)
+
+    def count(self, chat_id: int) -> int:
+        """Number of users in a group with a warning still in effect"""
+        self.flush()
+        now = time.time()
+        return sum(
+            1 for _, score, updated_at in self.db.get_chat_warnings(chat_id)
+            if decay(score, now - updated_at, self.half_life) >= 0.5
+        )
+
+    def flush(self):
+        """Persist pending resets and increments in one batch each"""
+        with self._flush_lock:
+            with self._lock:
+                resets = [(chat_id, user_id, as_of) for (chat_id, user_id), as_of in self._resets.items()]
+                increments = [
+                    (key, entry.pending, entry.pending_at, entry.generation)
+                    for key, entry in self._entries.items() if entry.pending
+                ]
+                self._resets.clear()
+                self._flushing = True
+                self._flush_epoch += 1
+
+            resets_saved = increments_saved = False
+            try:
+                resets_saved = not resets or self.db.reset_group_warnings(resets)
+                increments_saved = not increments or self.db.add_group_warnings(
+                    [(chat_id, user_id, score, as_of) for (chat_id, user_id), score, as_of, _ in increments],
+                    self.half_life
+                )
+            finally:
+                with self._lock:
+                    self._flushing = False
+                    if not resets_saved:
+                        for chat_id, user_id, as_of in resets:
+                            self._resets.setdefault((chat_id, user_id), as_of)
+                    if increments_saved and (increments or resets):
+                        # Move the flushed part of each pending score into the stored score
+                        for key, score, as_of, generation in increments:
+                            entry = self._entries.get(key)
+                            if entry is None or entry.generation != generation:
+                                continue
+                            flushed = decay(score, entry.pending_at - as_of, self.half_life)
+                            entry.pending = max(entry.pending - flushed, 0.0)
+                            entry.stored = decay(entry.stored, entry.pending_at - entry.stored_at, self.half_life) + flushed
+                            entry.stored_at = max(entry.pending_at, entry.stored_at)
+                        self.stats['flushes'] += 1
+                        self.stats['flushed_rows'] += len(increments) + len(resets)
+
+    def _run(self):
+        next_prune = time.time()
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.time() >= next_prune:
+                    # Scores untouched for 10 half-lives are below 0.1% of a warning
+                    self.db.prune_group_warnings(time.time() - 10 * self.half_life)
+                    next_prune = time.time() + 3600
+            except Exception as e:
+                logger.error(f"Warning ledger flush failed: {str(e)}")
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, cached=len(self._entries), pending_resets=len(self._resets))
+
+# Export
+__all__ = ['WarningLedger']
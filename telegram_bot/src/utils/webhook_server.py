@@ -0,0 +1,151 @@
+import asyncio
+import hmac
+import secrets
+from collections import OrderedDict
+from typing import List, Optional
+from aiohttp import web
+from telebot import types
+from .async_engine import AsyncEngine
+from .logger import logger
+
+_CHAT_SOURCES = ('message', 'edited_message', 'channel_post', 'edited_channel_post',
+                 'my_chat_member', 'chat_member', 'chat_join_request')
+
+def _payload_chat_id(payload: dict) -> Optional[int]:
+    for key in _CHAT_SOURCES:
+        if key in payload:
+            return payload[key].get('chat', {}).get('id')
+    message = payload.get('callback_query', {}).get('message')
+    if message:
+        return message.get('chat', {}).get('id')
+    return None
+
+class WebhookServer:
+    """Embedded HTTP server receiving Bot API updates by webhook.
+
+    Each POST is checked against the secret token header, de-duplicated by
+    update_id, put on an internal queue and acknowledged immediately.
+    ``workers`` dispatch tasks feed the queued updates into the
+    ``AsyncEngine``. Updates are sharded across workers by chat, so updates
+    from one chat keep their order. Without a configured secret a random one
+    is generated and registered with the webhook; if the webhook is not
+    registered here, a secret is required.
+    """
+
+    SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+    def __init__(self, engine: AsyncEngine, secret_token: str, host: str = '0.0.0.0',
+                 port: int = 8443, path: str = '/webhook', workers: int = 4,
+                 queue_size: int = 10000, dedupe_size: int = 10000):
+        self.engine = engine
+        self.generated_secret = not secret_token
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.workers = workers
+        self.queue_size = queue_size
+        self.dedupe_size = dedupe_size
+        self._queues: List[asyncio.Queue] = []
+        self._seen: OrderedDict = OrderedDict()  # Recent update_ids
+        self._runner: Optional[web.AppRunner] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {
+            'received': 0,
+            'duplicates': 0,
+            'rejected': 0,
+            'dispatched': 0
+        }
+
+    def _is_duplicate(self, update_id: int) -> bool:
+        if update_id in self._seen:
+            return True
+        self._seen[update_id] = None
+        if len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+        return False
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        token = request.headers.get(self.SECRET_HEADER, '')
+        if not hmac.compare_digest(token, self.secret_token):
+            self.stats['rejected'] += 1
+            return web.Response(status=403)
+
+        try:
+            payload = await request.json()
+            update_id = int(payload['update_id'])
+        except Exception:
+            self.stats['rejected'] += 1
+            return web.Response(status=400)
+
+        self.stats['received'] += 1
+        if self._is_duplicate(update_id):
+            self.stats['duplicates'] += 1
+            return web.Response(text='ok')
+
+        chat_id = _payload_chat_id(payload)
+        shard = (chat_id if chat_id is not None else update_id) % len(self._queues)
+        try:
+            self._queues[shard].put_nowait(payload)
+        except asyncio.QueueFull:
+            # Let Telegram redeliver the update later
+            del self._seen[update_id]
+            return web.Response(status=503)
+        return web.Response(text='ok')
+
+    async def _dispatch_worker(self, queue: asyncio.Queue):
+        while True:
+            payload = await queue.get()
+            try:
+                await self.engine.dispatch(types.Update.de_json(payload))
+                self.stats['dispatched'] += 1
+            except Exception as e:
+                logger.error(f"Webhook update dispatch failed: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def start(self, webhook_url: str = None):
+        """Start the HTTP server and dispatch workers; register the webhook if a URL is given"""
+        if self.generated_secret and not webhook_url:
+            raise ValueError("WEBHOOK_SECRET must be set when the webhook is registered outside the bot")
+        self.engine._setup_loop_state()
+        per_worker = max(1, self.queue_size // self.workers)
+        self._queues = [asyncio.Queue(maxsize=per_worker) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._dispatch_worker(queue)) for queue in self._queues]
+
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+        if webhook_url:
+            await self.engine.api.set_webhook(
+                url=webhook_url,
+                secret_token=self.secret_token,
+                allowed_updates=self.engine.allowed_updates
+            )
+
+    async def stop(self):
+        for queue in self._queues:
+            await queue.join()
+        for task in self._tasks:
+            task.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+        await self.engine.close()
+
+    async def _serve(self, webhook_url: str = None):
+        await self.start(webhook_url)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    def run(self, webhook_url: str = None):
+        """Serve webhook updates until interrupted"""
+        asyncio.run(self._serve(webhook_url))
+
+# Export
+__all__ = ['WebhookServer']
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from typing import Callable, Optional
+from .logger import logger
+
+_STOP = object()
+
+class WriteBehindQueue:
+    """Bounded queue of database writes drained by a single writer thread.
+
+    Each queued operation is a callable taking an open session. The writer
+    groups operations into one transaction per batch (up to ``batch_size``
+    operations or ``flush_interval`` seconds after the first one arrives),
+    so SQLite commits once per batch instead of once per user action.
+    """
+
+    def __init__(self, session_factory, batch_size: int = 100,
+                 flush_interval: float = 0.05, max_size: int = 10000,
+                 put_timeout: float = 5.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._closed = False
+        self.stats = {
+            'enqueued': 0,
+            'committed': 0,
+            'failed': 0,
+            'batches': 0,
+            'rejected': 0
+        }
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: Callable, on_commit: Optional[Callable] = None) -> bool:
+        """Queue a write; blocks while the queue is full (back-pressure).
+
+        Returns False if the queue stayed full for ``put_timeout`` seconds or
+        the writer is closed, so the caller can fall back to a direct write.
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put((operation, on_commit), timeout=self.put_timeout)
+            self.stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            self.stats['rejected'] += 1
+            logger.warning("Write-behind queue full, falling back to direct write")
+            return False
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        self._queue.join()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((_STOP, None))
+        self._thread.join()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1][0] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            operations = [item for item in batch if item[0] is not _STOP]
+            try:
+                if operations:
+                    self._commit_batch(operations)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(operations) != len(batch):
+                return
+
+    def _commit_batch(self, operations: list):
+        session = self.session_factory()
+        try:
+            for operation, _ in operations:
+                operation(session)
+            session.commit()
+            committed = [on_commit for _, on_commit in operations]
+            self.stats['batches'] += 1
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Write batch failed, retrying writes one by one: {str(e)}")
+            committed = self._commit_individually(session, operations)
+        finally:
+            session.close()
+
+        self.stats['committed'] += len(committed)
+        for on_commit in committed:
+            if on_commit:
+                try:
+                    on_commit()
+                except Exception as e:
+                    logger.error(f"Write commit hook failed: {str(e)}")
+
+    def _commit_individually(self, session, operations: list) -> list:
+        committed = []
+        for operation, on_commit in operations:
+            try:
+                operation(session)
+                session.commit()
+                committed.append(on_commit)
+            except Exception as e:
+                session.rollback()
+                self.stats['failed'] += 1
+                logger.error(f"Queued write failed: {str(e)}")
+        return committed
+
+# Export
+__all__ = ['WriteBehindQueue']
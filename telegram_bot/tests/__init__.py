@@ -30,19 +30,22 @@ class MockBot(MagicMock):
             'text': text,
             'kwargs': kwargs
         })
-        return True
+        return MagicMock(message_id=len(self.sent_messages))
 
 @pytest.fixture
 def mock_bot():
     return MockBot()
 
 @pytest.fixture
-def test_db():
-    from ..src.utils.database import Database
+def test_db(tmp_path, monkeypatch):
+    from ..src.config import config
+    # A file per test, so the bot's own database is never touched
+    monkeypatch.setattr(config, 'DB_PATH', str(tmp_path / 'bot_data.db'))
+    monkeypatch.setattr(config, 'BACKUP_DIR', tmp_path / 'backups')
     db = Database()
-    db.engine = create_engine('sqlite:///:memory:')
-    Base.metadata.create_all(db.engine)
-    return db
+    db.setup()
+    yield db
+    db.close()
 
 @pytest.fixture
 def test_user():
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from ..src.utils.admin_cache import AdminStatusCache
+
+CHAT = -100
+
+def _member(user_id: int, status: str):
+    return SimpleNamespace(user=SimpleNamespace(id=user_id), status=status)
+
+def _bot(*members):
+    bot = MagicMock()
+    bot.get_chat_administrators.return_value = list(members)
+    return bot
+
+def test_roster_is_loaded_once_per_ttl():
+    bot = _bot(_member(1, 'creator'), _member(2, 'administrator'), _member(3, 'member'))
+    cache = AdminStatusCache(bot, ttl=600)
+
+    assert [cache.is_admin(CHAT, user_id) for user_id in (1, 2, 3, 4)] == [True, True, False, False]
+    assert not cache.is_admin(5, 5)  # Private chat
+
+    assert bot.get_chat_administrators.call_count == 1
+    stats = cache.get_stats()
+    assert (stats['misses'], stats['hits'], stats['warms']) == (1, 3, 1)
+
+def test_member_updates_patch_the_roster():
+    bot = _bot(_member(1, 'creator'))
+    cache = AdminStatusCache(bot)
+    cache.warm(CHAT)
+
+    cache.update_member(CHAT, 2, 'administrator')
+    cache.update_member(CHAT, 1, 'left')
+
+    assert (cache.is_admin(CHAT, 1), cache.is_admin(CHAT, 2)) == (False, True)
+    cache.invalidate(CHAT)
+    assert cache.is_admin(CHAT, 1)
+    assert bot.get_chat_administrators.call_count == 2
+
+def test_api_error_falls_back_to_the_stale_roster():
+    bot = _bot(_member(1, 'administrator'))
+    cache = AdminStatusCache(bot, ttl=0, retry_after=600)
+    assert cache.is_admin(CHAT, 1)
+
+    bot.get_chat_administrators.side_effect = RuntimeError('Too Many Requests')
+
+    assert cache.is_admin(CHAT, 1)
+    assert not cache.is_admin(CHAT, 2)
+    # The stale roster answers until the retry delay is over
+    assert bot.get_chat_administrators.call_count == 2
+    stats = cache.get_stats()
+    assert (stats['errors'], stats['stale_answers']) == (1, 1)
+
+def test_api_error_without_a_roster_denies():
+    bot = _bot()
+    bot.get_chat_administrators.side_effect = RuntimeError('chat not found')
+    cache = AdminStatusCache(bot)
+
+    assert not cache.is_admin(CHAT, 1)
+    assert cache.get_stats()['errors'] == 1
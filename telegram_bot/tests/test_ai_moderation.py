@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from ..src.utils.ai_moderation import AIModerator
+
+class StubModel:
+    """Chat-completions stub that flags every message containing 'bad'"""
+
+    def __init__(self):
+        self.batches = []
+        self.delay = 0.0
+        self.status = 200
+        self.content = None  # Replaces the model's answer when set
+        self.trickle = 0.0  # Seconds between bytes of the answer when set
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        texts = json.loads(body['messages'][1]['content'])
+        with stub.lock:
+            stub.batches.append(texts)
+            stub.active += 1
+            stub.max_active = max(stub.max_active, stub.active)
+        time.sleep(stub.delay)
+        with stub.lock:
+            stub.active -= 1
+        content = stub.content or json.dumps({'flags': ['bad' in text for text in texts]})
+        data = json.dumps({'choices': [{'message': {'content': content}}]}).encode('utf-8')
+        self.send_response(stub.status)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if not stub.trickle:
+            self.wfile.write(data)
+            return
+        for byte in data:
+            self.wfile.write(bytes([byte]))
+            self.wfile.flush()
+            time.sleep(stub.trickle)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_model():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.stub = StubModel()
+    server.stub.url = f'http://127.0.0.1:{server.server_port}/v1/chat/completions'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.stub
+    server.shutdown()
+    server.server_close()
+
+def _moderate(moderator: AIModerator, texts: list) -> dict:
+    results = {}
+    done = threading.Event()
+
+    def callback(index):
+        def record(flagged, source):
+            results[index] = (flagged, source)
+            if len(results) == len(texts):
+                done.set()
+        return record
+
+    for index, text in enumerate(texts):
+        moderator.submit(-100, text, callback(index))
+    assert done.wait(10)
+    return results
+
+def _fallback(text: str, chat_id: int) -> bool:
+    return 'spam' in text
+
+def test_batches_and_fans_out_verdicts(stub_model):
+    moderator = AIModerator(stub_model.url, 'key', 'model', _fallback, batch_size=20, batch_window=0.2)
+    texts = [f"message {i} {'bad' if i % 7 == 0 else 'fine'}" for i in range(50)]
+
+    results = _moderate(moderator, texts)
+
+    assert sorted(len(batch) for batch in stub_model.batches) == [10, 20, 20]
+    assert results == {i: ('bad' in text, 'ai') for i, text in enumerate(texts)}
+    stats = moderator.get_stats()
+    assert stats['batches'] == 3
+    assert stats['flagged'] == 8
+
+@pytest.mark.parametrize('failure', ['slow', 'trickle', 'error', 'wrong_shape'])
+def test_falls_back_to_keywords(stub_model, failure):
+    if failure == 'slow':
+        stub_model.delay = 1.0
+    elif failure == 'trickle':
+        stub_model.trickle = 0.05  # Every read is quick, the whole answer is not
+    elif failure == 'error':
+        stub_model.status = 500
+    else:
+        stub_model.content = json.dumps({'flags': [True]})
+    moderator = AIModerator(stub_model.url, 'key', 'model', _fallback, batch_window=0.1, timeout=0.3)
+    texts = ['bad spam', 'bad', 'fine spam', 'fine']
+
+    results = _moderate(moderator, texts)
+
+    assert results == {0: (True, 'fallback'), 1: (False, 'fallback'), 2: (True, 'fallback'), 3: (False, 'fallback')}
+    assert moderator.get_stats()['fallbacks'] == 4
+
+def test_batches_in_flight_are_bounded(stub_model):
+    stub_model.delay = 0.3
+    moderator = AIModerator(stub_model.url, 'key', 'model', _fallback, batch_size=1, batch_window=0, workers=2)
+    results = []
+    for i in range(6):
+        moderator.submit(-100, f'message {i}', lambda flagged, source: results.append(source))
+    time.sleep(0.15)
+
+    # Two batches are in flight; the rest wait in the bounded queue, not in the executor
+    assert moderator._executor._work_queue.qsize() == 0
+    assert moderator.get_stats()['pending'] >= 3
+
+    deadline = time.monotonic() + 5
+    while len(results) < 6 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert results == ['ai'] * 6
+    assert stub_model.max_active == 2
+
+def test_messages_waiting_past_the_deadline_use_the_fallback(stub_model):
+    stub_model.delay = 0.6
+    moderator = AIModerator(stub_model.url, 'key', 'model', _fallback, batch_size=1, batch_window=0,
+                            workers=1, max_wait=0.3)
+
+    results = _moderate(moderator, ['bad first', 'bad spam', 'fine'])
+
+    assert results == {0: (True, 'ai'), 1: (True, 'fallback'), 2: (False, 'fallback')}
+    assert stub_model.batches == [['bad first']]
+    assert moderator.get_stats()['expired_to_fallback'] == 2
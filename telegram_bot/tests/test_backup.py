@@ -0,0 +1,113 @@
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from ..src.utils.backup import BackupEngine
+
+def _make_database(path, rows: int):
+    with closing(sqlite3.connect(str(path))) as connection:
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)')
+        connection.executemany('INSERT INTO notes (body) VALUES (?)', ((f'note {i} ' * 20,) for i in range(rows)))
+        connection.commit()
+
+def _restore(backup_path, tmp_path):
+    restored = tmp_path / 'restored.db'
+    with gzip.open(backup_path, 'rb') as compressed:
+        restored.write_bytes(compressed.read())
+    with closing(sqlite3.connect(str(restored))) as connection:
+        return connection.execute('SELECT count(*) FROM notes').fetchone()[0]
+
+def test_backup_is_streamed_without_a_copy(tmp_path):
+    db_path = tmp_path / 'bot_data.db'
+    _make_database(db_path, 5000)
+    backup_dir = tmp_path / 'backups'
+    backup_dir.mkdir()
+    engine = BackupEngine(str(db_path), backup_dir, step_sleep=0)
+    steps = []
+    engine._on_progress = lambda *args: steps.append(args)
+
+    backup_path = engine.create_backup()
+
+    assert backup_path is not None and backup_path.name.endswith('.db.gz')
+    assert os.listdir(backup_dir) == [backup_path.name]
+    assert steps == []  # Serialized in one go, no page copy
+    assert _restore(backup_path, tmp_path) == 5000
+    stats = engine.stats
+    assert stats['pages_copied'] == stats['pages_total'] > 0
+    assert stats['last_compressed_size'] < stats['last_size']
+
+def test_large_backup_is_copied_in_steps(tmp_path):
+    db_path = tmp_path / 'bot_data.db'
+    _make_database(db_path, 5000)
+    backup_dir = tmp_path / 'backups'
+    backup_dir.mkdir()
+    engine = BackupEngine(str(db_path), backup_dir, pages_per_step=16, step_sleep=0, max_in_memory=0)
+
+    backup_path = engine.create_backup()
+
+    assert backup_path is not None
+    assert os.listdir(backup_dir) == [backup_path.name]  # No temporary copy left behind
+    assert _restore(backup_path, tmp_path) == 5000
+    stats = engine.stats
+    assert stats['pages_copied'] == stats['pages_total'] > 16
+
+def test_writes_during_the_copy_do_not_restart_it(tmp_path):
+    db_path = tmp_path / 'bot_data.db'
+    _make_database(db_path, 5000)
+    backup_dir = tmp_path / 'backups'
+    backup_dir.mkdir()
+    engine = BackupEngine(str(db_path), backup_dir, pages_per_step=16, step_sleep=0.005, max_in_memory=0)
+    steps = []
+    copying, stopped = threading.Event(), threading.Event()
+    on_progress = engine._on_progress
+
+    def record(status, remaining, total):
+        steps.append(remaining)
+        copying.set()
+        on_progress(status, remaining, total)
+
+    engine._on_progress = record
+
+    def write():
+        copying.wait(5)  # Only write once the snapshot is taken
+        with closing(sqlite3.connect(str(db_path))) as connection:
+            while not stopped.is_set():
+                connection.execute("INSERT INTO notes (body) VALUES ('written during the backup')")
+                connection.commit()
+                time.sleep(0.002)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        backup_path = engine.create_backup()
+    finally:
+        stopped.set()
+        writer.join()
+
+    # Each step moves forward: the copy never starts over
+    assert steps == sorted(steps, reverse=True) and steps[-1] == 0
+    assert len(steps) == -(-engine.stats['pages_total'] // 16)
+    assert _restore(backup_path, tmp_path) == 5000
+
+def test_failed_backup_cleans_up(tmp_path):
+    backup_dir = tmp_path / 'backups'
+    backup_dir.mkdir()
+    (tmp_path / 'broken.db').write_bytes(b'not a database' * 100)
+    engine = BackupEngine(str(tmp_path / 'broken.db'), backup_dir, step_sleep=0)
+
+    assert engine.create_backup() is None
+    assert engine.stats['failures'] == 1
+    assert os.listdir(backup_dir) == []
+
+def test_cleanup_removes_expired_backups(tmp_path):
+    engine = BackupEngine(str(tmp_path / 'bot_data.db'), tmp_path)
+    today = time.strftime('%Y%m%d_%H%M%S')
+    names = ['backup_20200101_000000.db.gz', 'backup_20200101_000000.zip', f'backup_{today}.db.gz', 'notes.txt']
+    for name in names:
+        (tmp_path / name).write_bytes(b'')
+
+    assert engine.cleanup_old_backups(retention_days=15) == 2
+    assert sorted(os.listdir(tmp_path)) == [f'backup_{today}.db.gz', 'notes.txt']
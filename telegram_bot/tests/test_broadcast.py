@@ -0,0 +1,76 @@
+import threading
+import pytest
+from telebot.apihelper import ApiTelegramException
+from . import mock_bot, test_db
+from ..src.utils.broadcast import BroadcastRunner
+from ..src.utils.outbound import OutboundDispatcher
+
+BLOCKED_USER = 1007
+
+class Crash(BaseException):
+    """Stands in for the process dying; not caught by the runner's error handling"""
+
+@pytest.fixture
+def recipients(test_db):
+    for telegram_id in range(1000, 1025):
+        assert test_db.add_user({'telegram_id': telegram_id})
+    return list(range(1000, 1025))
+
+@pytest.fixture
+def outbound(mock_bot):
+    send_message = mock_bot.send_message
+
+    def send_or_block(chat_id, text, **kwargs):
+        if chat_id == BLOCKED_USER:
+            raise ApiTelegramException('sendMessage', None,
+                                       {'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'})
+        return send_message(chat_id, text, **kwargs)
+
+    mock_bot.send_message = send_or_block
+    return OutboundDispatcher(mock_bot, workers=4, global_rate=1000)
+
+def test_broadcast_resumes_from_its_checkpoint(test_db, mock_bot, outbound, recipients):
+    broadcast_id = test_db.create_broadcast(1, 'News')
+    batches = []
+
+    def crash_after_first_batch(progress):
+        batches.append(progress)
+        raise Crash()
+
+    with pytest.raises(Crash):
+        BroadcastRunner(test_db, outbound, batch_size=10)._run(broadcast_id, crash_after_first_batch)
+
+    checkpoint = test_db.get_broadcast(broadcast_id)
+    assert (checkpoint['status'], checkpoint['sent'], checkpoint['blocked']) == ('running', 9, 1)
+    assert len(mock_bot.sent_messages) == 9
+
+    # A new process picks the broadcast up where the checkpoint left it
+    done = threading.Event()
+    progress = []
+
+    def record(update):
+        progress.append(update)
+        if update['status'] == 'done':
+            done.set()
+
+    assert BroadcastRunner(test_db, outbound, batch_size=10).resume_all(record) == 1
+    assert done.wait(10)
+
+    delivered = [message['chat_id'] for message in mock_bot.sent_messages]
+    assert sorted(delivered) == [telegram_id for telegram_id in recipients if telegram_id != BLOCKED_USER]
+    assert len(delivered) == len(set(delivered))  # Nobody got it twice
+    final = test_db.get_broadcast(broadcast_id)
+    assert (final['status'], final['sent'], final['failed'], final['blocked']) == ('done', 24, 0, 1)
+    assert [update['sent'] for update in progress] == [19, 24, 24]
+    assert test_db.get_unfinished_broadcasts() == []
+
+def test_finished_broadcast_is_not_resent(test_db, mock_bot, outbound, recipients):
+    broadcast_id = test_db.create_broadcast(1, 'News')
+    runner = BroadcastRunner(test_db, outbound, batch_size=10)
+    runner._run(broadcast_id, None)
+    sent = len(mock_bot.sent_messages)
+
+    assert runner.resume_all() == 0
+    runner._run(broadcast_id, None)
+
+    assert sent == len(mock_bot.sent_messages) == 24
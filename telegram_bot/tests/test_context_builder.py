@@ -0,0 +1,72 @@
+from ..src.utils.context_builder import ContextBuilder, count_tokens, extractive_summary
+
+def _message(role: str, index: int) -> dict:
+    # 23 tokens each: 19 for the text, 4 of overhead
+    return {'role': role, 'content': f"Message {index:03d} ends here. " + 'x' * 53}
+
+def _chat(builder: ContextBuilder, turns: int):
+    conversation = {'messages': []}
+    prompts = []
+    for turn in range(turns):
+        conversation['messages'].append(_message('user', 2 * turn))
+        prompts.append(builder.build(conversation))
+        conversation['messages'].append(_message('assistant', 2 * turn + 1))
+    return conversation, prompts
+
+def test_short_conversation_is_sent_whole():
+    builder = ContextBuilder(budget=1000, summary_budget=100, stale_tokens=100)
+
+    conversation, prompts = _chat(builder, 3)
+
+    assert [m['content'] for m in prompts[-1]] == [m['content'] for m in conversation['messages'][:5]]
+    assert all(m['tokens'] == 23 for m in conversation['messages'][:5])
+    assert conversation['context']['summary'] == ''
+    assert builder.get_stats()['last_prompt_tokens'] == 5 * 23
+
+def test_prompt_stays_within_budget():
+    builder = ContextBuilder(budget=300, summary_budget=50, stale_tokens=150)
+
+    conversation, prompts = _chat(builder, 30)
+
+    assert builder.get_stats()['max_prompt_tokens'] <= 300
+    last = prompts[-1]
+    assert last[0]['role'] == 'system' and last[0]['content'].startswith('Summary of the earlier conversation')
+    assert last[1]['role'] == 'user'  # The model rejects an assistant turn right after the summary
+    assert last[-1]['content'] == conversation['messages'][-2]['content']
+
+def test_summary_rolls_over_every_few_turns():
+    builder = ContextBuilder(budget=300, summary_budget=50, stale_tokens=150)
+
+    conversation, prompts = _chat(builder, 30)
+
+    summaries = builder.get_stats()['summaries']
+    assert 0 < summaries < 30 // 2
+    # Between rollovers the summary, and so the prompt prefix, stays the same
+    heads = [prompt[0]['content'] for prompt in prompts if prompt[0]['role'] == 'system']
+    assert len(set(heads)) == summaries
+    summary = conversation['context']['summary']
+    assert summary.splitlines()[-1].startswith('assistant: Message')
+    assert sum(count_tokens(line) for line in summary.splitlines()) <= 50  # Oldest lines dropped to fit
+
+def test_failed_summary_keeps_the_messages():
+    def broken(previous, messages, max_tokens):
+        raise RuntimeError('summarizer down')
+
+    builder = ContextBuilder(budget=300, summary_budget=50, stale_tokens=150, summarizer=broken)
+
+    conversation, prompts = _chat(builder, 10)
+
+    assert conversation['context']['summary'] == '' and builder.get_stats()['summaries'] == 0
+    assert len(prompts[-1]) == 19  # Nothing was dropped without being summarized
+
+def test_extractive_summary_keeps_first_sentences_within_budget():
+    messages = [
+        {'role': 'user', 'content': 'Where is Vienna? I want to go.'},
+        {'role': 'assistant', 'content': 'In Austria. It is lovely.'}
+    ]
+
+    summary = extractive_summary('user: Hello there', messages, max_tokens=1000)
+    assert summary.splitlines() == ['user: Hello there', 'user: Where is Vienna?', 'assistant: In Austria.']
+
+    trimmed = extractive_summary('user: Hello there', messages, max_tokens=count_tokens('assistant: In Austria.'))
+    assert trimmed == 'assistant: In Austria.'
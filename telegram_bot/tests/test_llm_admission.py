@@ -0,0 +1,102 @@
+import asyncio
+import time
+import pytest
+from . import mock_bot
+from ..src.utils.llm_admission import (
+    AdmissionController, AdmissionRejected, AdmissionTicket, PRIORITY_NORMAL, PRIORITY_PREMIUM
+)
+from ..src.utils.reply_engine import ReplyEngine
+
+async def _queue(admission: AdmissionController, order: list, name: str, **kwargs):
+    await admission.acquire(**kwargs)
+    order.append(name)
+
+def test_promoted_ticket_moves_ahead():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1)
+        await admission.acquire()
+        order = []
+        ticket = AdmissionTicket(PRIORITY_NORMAL)
+        waiters = [
+            asyncio.ensure_future(_queue(admission, order, 'earlier normal')),
+            asyncio.ensure_future(_queue(admission, order, 'promoted', ticket=ticket))
+        ]
+        await asyncio.sleep(0)
+        admission.promote(ticket, PRIORITY_PREMIUM)
+        assert admission.get_stats()['waiting'] == 2
+
+        admission.release()
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*waiters)
+        return order, admission.get_stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ['promoted', 'earlier normal']
+    assert (stats['promoted'], stats['active'], stats['waiting']) == (1, 1, 0)
+
+def test_promotion_extends_queue_timeout():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, queue_timeouts=(1.0, 0.2))
+        await admission.acquire()
+        promoted = AdmissionTicket(PRIORITY_NORMAL)
+        waiters = [
+            asyncio.ensure_future(admission.acquire(ticket=promoted)),
+            asyncio.ensure_future(admission.acquire(PRIORITY_NORMAL))
+        ]
+        await asyncio.sleep(0.1)
+        admission.promote(promoted, PRIORITY_PREMIUM)
+        await asyncio.sleep(0.3)
+        admission.release()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    promoted, normal = asyncio.run(scenario())
+    assert promoted is None
+    assert isinstance(normal, AdmissionRejected)
+
+def test_shedding_skips_promoted_entries():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1)
+        await admission.acquire()
+        ticket = AdmissionTicket(PRIORITY_NORMAL)
+        queued = asyncio.ensure_future(admission.acquire(ticket=ticket))
+        await asyncio.sleep(0)
+        admission.promote(ticket, PRIORITY_PREMIUM)
+        with pytest.raises(AdmissionRejected):
+            await admission.acquire(PRIORITY_PREMIUM)  # Nothing of lower priority is left to shed
+        admission.release()
+        await queued
+
+    asyncio.run(scenario())
+
+class RecordingClient:
+    """Agent client that answers with the user's prompt and records the calls in order"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def stream(self, messages):
+        self.calls.append(messages[-1]['content'])
+        yield f"reply to {messages[-1]['content']}"
+
+    async def close(self):
+        pass
+
+def test_premium_follower_promotes_shared_call(mock_bot):
+    client = RecordingClient()
+    engine = ReplyEngine(mock_bot, client, admission=AdmissionController(max_concurrent=1))
+    asyncio.run_coroutine_threadsafe(engine.admission.acquire(), engine._loop).result(timeout=5)
+    prompt = lambda text: [{'role': 'user', 'content': text}]
+
+    replies = [engine.reply(1, 1, prompt('shared'))]
+    time.sleep(0.05)
+    replies.append(engine.reply(2, 1, prompt('other')))
+    time.sleep(0.05)
+    replies.append(engine.reply(3, 1, prompt('shared'), priority=PRIORITY_PREMIUM))
+    time.sleep(0.05)
+    engine._loop.call_soon_threadsafe(engine.admission.release)
+
+    assert [reply.result(timeout=5) for reply in replies] == ['reply to shared', 'reply to other', 'reply to shared']
+    assert client.calls == ['shared', 'other']
+    assert engine.get_stats()['coalesced'] == 1
+    engine.close()
@@ -0,0 +1,31 @@
+import pytest
+from ..src.utils.moderation import Lexicon, ModerationEngine
+
+@pytest.fixture
+def lexicon():
+    return Lexicon(['spam', 'abuse', 'hate', '*bad'])
+
+@pytest.mark.parametrize('text', ["spam!", "hate!!!", "spam$", "spam|", "spam+", "!spam", "(abuse)", "HATE."])
+def test_trailing_punctuation_keeps_word_boundary(lexicon, text):
+    assert lexicon.find(text) is not None
+
+@pytest.mark.parametrize('text,term', [("5p@m", 'spam'), ("$pam", 'spam'), ("h4te", 'hate'), ("ábüse", 'abuse')])
+def test_folds_leetspeak_and_accents(lexicon, text, term):
+    assert lexicon.find(text) == term
+
+@pytest.mark.parametrize('text', ["spammer", "whatever", "hateful", "abused1"])
+def test_whole_word_terms_ignore_longer_words(lexicon, text):
+    assert lexicon.find(text) is None
+
+def test_substring_terms_match_inside_words(lexicon):
+    assert lexicon.find("notbadatall") == 'bad'
+
+def test_group_lexicon_extends_global(tmp_path):
+    (tmp_path / 'global.txt').write_text("scam\n", encoding='utf-8')
+    (tmp_path / '-100.txt').write_text("crypto\n", encoding='utf-8')
+    engine = ModerationEngine(tmp_path, default_terms=[])
+
+    assert engine.check("crypto giveaway", chat_id=-100) == 'crypto'
+    assert engine.check("crypto giveaway", chat_id=-200) is None
+    assert engine.check("obvious scam", chat_id=-200) == 'scam'
+    assert engine.check(None) is None
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import wait
+from unittest.mock import MagicMock
+from . import mock_bot
+from ..src.utils.outbound import OutboundDispatcher
+
+GROUP = -1001234567890
+
+def test_group_flood_deletions_skip_the_group_bucket(mock_bot):
+    outbound = OutboundDispatcher(mock_bot, workers=4, global_rate=1000)
+    warnings = [outbound.send_message(GROUP, f"Warning {i}") for i in range(5)]
+
+    started = time.monotonic()
+    deletions = [outbound.submit('delete_message', GROUP, message_id) for message_id in range(200)]
+    done, pending = wait(deletions, timeout=5)
+    drained = time.monotonic() - started
+
+    assert not pending and all(future.exception() is None for future in done)
+    assert mock_bot.delete_message.call_count == 200
+    assert drained < 1.0
+    # Posting to the group still waits for its per-chat and per-group tokens
+    warnings[0].result(timeout=5)
+    assert 1 <= len(mock_bot.sent_messages) <= 2
+    assert not all(future.done() for future in warnings)
+
+def test_restrictions_take_the_moderation_lane(mock_bot):
+    outbound = OutboundDispatcher(mock_bot, workers=1, global_rate=1000)
+    outbound.send_message(GROUP, "Posted first").result(timeout=5)
+
+    # The chat token was just spent, so a regular send would wait a second here
+    outbound.submit('restrict_chat_member', GROUP, 42, until_date=0).result(timeout=0.5)
+
+    mock_bot.restrict_chat_member.assert_called_once_with(GROUP, 42, until_date=0)
+    assert outbound.get_stats()['lanes'] == [0, 0, 0, 0]
+
+def test_replies_overtake_queued_sends(mock_bot):
+    outbound = OutboundDispatcher(mock_bot, workers=1, global_rate=1000, chat_rate=20)
+    message = MagicMock(message_id=7)
+    message.chat.id = 5
+    sends = [outbound.send_message(5, f"notice {i}") for i in range(3)]
+
+    reply = outbound.reply_to(message, "Settings Menu:")
+    reply.result(timeout=5)
+    wait(sends, timeout=5)
+
+    texts = [sent['text'] for sent in mock_bot.sent_messages]
+    assert texts.index("Settings Menu:") < texts.index("notice 2")
+    assert mock_bot.sent_messages[texts.index("Settings Menu:")]['kwargs'] == {'reply_to_message_id': 7}
@@ -0,0 +1,56 @@
+import time
+from telebot.apihelper import ApiTelegramException
+from . import mock_bot, test_db
+from ..src.utils.outbound import OutboundDispatcher
+from ..src.utils.post_fanout import PostFanout
+
+BLOCKED_CHAT = 1000
+
+def _wait_for_outcomes(outbound: OutboundDispatcher, count: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = outbound.get_stats()
+        if stats['sent'] + stats['failed'] >= count:
+            return
+        time.sleep(0.05)
+    raise AssertionError(f"only {outbound.get_stats()} after {timeout}s")
+
+def test_slot_is_spread_and_reported(test_db, mock_bot):
+    send_message = mock_bot.send_message
+
+    def send_or_block(chat_id, text, **kwargs):
+        if chat_id == BLOCKED_CHAT:
+            raise ApiTelegramException('sendMessage', None,
+                                       {'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'})
+        return send_message(chat_id, text, **kwargs)
+
+    mock_bot.send_message = send_or_block
+    for chat_id in range(BLOCKED_CHAT, BLOCKED_CHAT + 30):
+        assert test_db.add_scheduled_post(chat_id, '18:00', f'post for {chat_id}')
+    test_db.add_scheduled_post(BLOCKED_CHAT, '09:00', 'another slot')
+    outbound = OutboundDispatcher(mock_bot, workers=4, global_rate=1000)
+    fanout = PostFanout(test_db, outbound, spread_seconds=1.5, batch_size=8, flush_interval=60)
+
+    started = time.time()
+    slot_run = fanout.deliver_slot('18:00')
+    assert test_db.get_slot_report(slot_run)['queued'] == 30
+
+    _wait_for_outcomes(outbound, 30)
+    fanout.flush()
+
+    assert sorted(m['chat_id'] for m in mock_bot.sent_messages) == list(range(BLOCKED_CHAT + 1, BLOCKED_CHAT + 30))
+    report = test_db.get_slot_report(slot_run)
+    assert (report['total'], report['sent'], report['failed'], report['queued']) == (30, 29, 1, 0)
+    # Planned send times cover the spread instead of bunching at the start
+    assert started <= report['first_planned'] < started + 0.1
+    assert started + 1.4 < report['last_planned'] <= started + 1.5
+    assert report['drain_seconds'] < 2.5
+    assert report['max_delay'] < 0.5
+
+def test_empty_slot(test_db, mock_bot):
+    fanout = PostFanout(test_db, OutboundDispatcher(mock_bot, workers=1), flush_interval=60)
+
+    slot_run = fanout.deliver_slot('07:30')
+
+    assert slot_run.endswith(' 07:30')
+    assert test_db.get_slot_report(slot_run) is None
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event, text
+from . import test_db
+from ..src.utils.database import Database
+
+def _add_premium(db, telegram_id: int, is_premium: bool, expiry: datetime):
+    assert db.add_user({'telegram_id': telegram_id})
+    assert db.update_premium_status(telegram_id, is_premium, expiry)
+
+def test_sweep_expires_only_lapsed_subscriptions(test_db):
+    now = datetime.utcnow()
+    _add_premium(test_db, 1, True, now - timedelta(days=1))
+    _add_premium(test_db, 2, True, now + timedelta(days=1))
+    _add_premium(test_db, 3, False, now - timedelta(days=1))
+
+    assert test_db.expire_premium_users() == 1
+    assert test_db.expire_premium_users() == 0
+
+    with test_db.engine.connect() as connection:
+        premium = connection.execute(text("SELECT telegram_id, is_premium FROM users ORDER BY telegram_id")).all()
+    assert premium == [(1, 0), (2, 1), (3, 0)]
+    assert [test_db.is_premium_user(i) for i in (1, 2, 3)] == [False, True, False]
+
+def test_sweep_uses_partial_index(test_db):
+    statements = []
+
+    @event.listens_for(test_db.engine, 'before_cursor_execute')
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE users'):
+            statements.append((statement, parameters))
+
+    test_db.expire_premium_users()
+
+    statement, parameters = statements[0]
+    assert 'RETURNING' in statement
+    with test_db.engine.connect() as connection:
+        plan = ' '.join(row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+    assert 'ix_users_premium_expiry_active' in plan
+
+def test_old_index_is_replaced(test_db):
+    with test_db.engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_users_premium_expiry_active"))
+        connection.execute(text("CREATE INDEX ix_users_premium_expiry ON users (premium_expiry)"))
+
+    restarted = Database()
+    restarted.setup()
+
+    with restarted.engine.connect() as connection:
+        indexes = dict(connection.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'users' AND sql IS NOT NULL"
+        )).all())
+    restarted.close()
+    assert list(indexes) == ['ix_users_premium_expiry_active']
+    assert indexes['ix_users_premium_expiry_active'].endswith('WHERE is_premium = 1')
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from . import mock_bot
+from ..src.config import config
+from ..src.utils.reply_engine import AgentStreamClient, FAILED_TEXT, ReplyEngine
+
+MESSAGES = [{'role': 'user', 'content': 'hello'}]
+
+class StubAgent:
+    """Agent endpoint that streams ``deltas`` as server-sent events, ``interval`` seconds apart"""
+
+    def __init__(self):
+        self.deltas = []
+        self.interval = 0.0
+        self.status = 200
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(stub.status)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for delta in stub.deltas:
+            time.sleep(stub.interval)
+            event = {'choices': [{'delta': {'content': delta}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_agent():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.stub = StubAgent()
+    server.stub.url = f'http://127.0.0.1:{server.server_port}/v1/agents/completions'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.stub
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def engine(stub_agent, mock_bot, monkeypatch):
+    # Let the engine's own debounce, not the per-chat send rate, space the edits
+    monkeypatch.setattr(config, 'OUTBOUND_CHAT_RATE', 100)
+    engine = ReplyEngine(mock_bot, AgentStreamClient(stub_agent.url, 'key', 'agent'), edit_interval=0.25)
+    yield engine
+    engine.close()
+
+def _shown_messages(bot) -> dict:
+    """Final text of each message the bot sent, after its edits"""
+    shown = {i + 1: sent['text'] for i, sent in enumerate(bot.sent_messages)}
+    for call in bot.edit_message_text.call_args_list:
+        shown[call.kwargs['message_id']] = call.args[0]
+    return shown
+
+def test_edits_are_debounced_and_final_text_flushed(engine, stub_agent, mock_bot):
+    stub_agent.deltas = [f'word{i} ' for i in range(40)]
+    stub_agent.interval = 0.025
+    full_text = ''.join(stub_agent.deltas)
+
+    started = time.monotonic()
+    assert engine.reply(42, 7, MESSAGES).result(timeout=10) == full_text
+    duration = time.monotonic() - started
+
+    assert len(mock_bot.sent_messages) == 1
+    assert mock_bot.sent_messages[0]['kwargs'] == {'reply_to_message_id': 7}
+    edits = mock_bot.edit_message_text.call_count
+    assert 1 <= edits <= duration / engine.edit_interval + 1
+    assert engine.get_stats()['edits'] == edits
+    assert mock_bot.edit_message_text.call_args.kwargs == {'chat_id': 42, 'message_id': 1}
+    assert _shown_messages(mock_bot) == {1: full_text}
+
+def test_long_reply_continues_in_new_message(engine, stub_agent, mock_bot):
+    stub_agent.deltas = [str(i % 10) * 500 for i in range(10)]
+    full_text = ''.join(stub_agent.deltas)
+
+    assert engine.reply(42, 7, MESSAGES).result(timeout=10) == full_text
+
+    shown = _shown_messages(mock_bot)
+    assert [len(text) for text in shown.values()] == [4096, 904]
+    assert ''.join(shown.values()) == full_text
+
+def test_failed_stream_sends_apology(engine, stub_agent, mock_bot):
+    stub_agent.status = 500
+    results = []
+    done = threading.Event()
+
+    engine.reply(42, 7, MESSAGES, on_done=lambda text: (results.append(text), done.set()))
+
+    assert done.wait(10)
+    assert results == [None]
+    deadline = time.monotonic() + 5
+    while not mock_bot.sent_messages and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert [sent['text'] for sent in mock_bot.sent_messages] == [FAILED_TEXT]
+    assert engine.get_stats()['failed'] == 1
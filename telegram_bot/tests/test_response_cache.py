@@ -0,0 +1,68 @@
+import pytest
+from ..src.utils import response_cache
+from ..src.utils.response_cache import ResponseCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, 'time', clock)
+    return clock
+
+def test_key_ignores_case_and_punctuation_but_not_settings():
+    key = ResponseCache.make_key('What is the capital of France?', 'friendly', 'en')
+
+    assert ResponseCache.make_key('  what is THE capital of france ', 'friendly', 'en') == key
+    assert ResponseCache.make_key('What is the capital of France?', 'formal', 'en') != key
+    assert ResponseCache.make_key('What is the capital of France?', 'friendly', 'de') != key
+    assert ResponseCache.make_key('?!', 'friendly', 'en') is None
+
+def test_hit_and_miss(clock):
+    cache = ResponseCache(max_entries=10, ttl=60)
+    key = ResponseCache.make_key('hello', 'friendly', 'en')
+
+    assert cache.get(key) is None
+    cache.put(key, 'Hi there!', latency=2.5)
+    assert cache.get(key) == 'Hi there!'
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['stores']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+    assert stats['latency_saved'] == 2.5
+
+def test_entries_expire_after_ttl(clock, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.db'), ttl=60)
+    cache.put('key', 'reply', latency=1.0)
+
+    clock.now += 59
+    assert cache.get('key') == 'reply'
+    clock.now += 1
+    assert cache.get('key') is None  # Expired in memory and on disk
+    assert cache.get_stats()['entries'] == 0
+
+def test_least_recently_used_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.put('a', 'A', latency=1.0)
+    cache.put('b', 'B', latency=1.0)
+    cache.get('a')
+
+    cache.put('c', 'C', latency=1.0)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == ('A', None, 'C')
+
+def test_restart_starts_warm_from_disk(clock, tmp_path):
+    path = str(tmp_path / 'cache.db')
+    ResponseCache(path, ttl=60).put('key', 'reply', latency=3.0)
+
+    restarted = ResponseCache(path, ttl=60)
+
+    assert restarted.get('key') == 'reply'
+    assert restarted.get_stats()['disk_hits'] == 1
+    clock.now += 60
+    assert ResponseCache(path, ttl=60).get('key') is None
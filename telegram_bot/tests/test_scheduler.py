@@ -0,0 +1,39 @@
+import time
+from . import test_db
+from ..src.utils.database import Database
+
+def test_persisted_next_run_survives_restart(test_db):
+    due = time.time() + 60
+    job = test_db.get_scheduled_job('db_backup')
+    job['next_run'] = due
+    assert test_db.save_scheduled_job(job)
+
+    restarted = Database()
+    restarted.setup()
+
+    assert restarted.get_scheduled_job('db_backup')['next_run'] == due
+    assert [j['next_run'] for j in restarted.scheduler.jobs() if j['name'] == 'db_backup'] == [due]
+    restarted.close()
+
+def test_changed_interval_reschedules(test_db):
+    job = test_db.get_scheduled_job('backup_cleanup')
+    job['next_run'] = time.time() + 60
+    assert test_db.save_scheduled_job(job)
+
+    test_db.scheduler.schedule_interval('backup_cleanup', 'backup_cleanup', 3600)
+
+    stored = test_db.get_scheduled_job('backup_cleanup')
+    assert stored['interval_seconds'] == 3600
+    assert stored['next_run'] > time.time() + 3000
+
+def test_stop_ends_the_timer_thread(test_db):
+    runs = []
+    test_db.scheduler.register('tick', lambda payload: runs.append(payload))
+    test_db.scheduler.schedule_interval('tick', 'tick', 1)
+    test_db.scheduler.start()
+
+    test_db.scheduler.stop()
+
+    assert not test_db.scheduler._thread.is_alive()
+    time.sleep(1.2)
+    assert runs == []
@@ -0,0 +1,92 @@
+from sqlalchemy import event, text
+from . import test_db, test_user
+from ..src.utils.database import Database
+
+OTHER_USER = 987654321
+
+def _save(db, telegram_id: int, title: str, *contents: str) -> int:
+    assert db.save_conversation(telegram_id, title, {'messages': [
+        {'role': 'user', 'content': content} for content in contents
+    ]})
+    return db.get_saved_conversations(telegram_id, limit=1)[0]['id']
+
+def _index_rows(db) -> list:
+    with db.engine.connect() as connection:
+        return connection.execute(text(
+            "SELECT rowid, owner, conversation_id, seq FROM conversation_search ORDER BY rowid"
+        )).all()
+
+def test_search_matches_titles_and_messages_of_one_user(test_db, test_user):
+    assert test_db.add_user(dict(test_user))
+    assert test_db.add_user({'telegram_id': OTHER_USER})
+    trip = _save(test_db, test_user['telegram_id'], 'Holiday plans', 'Book the train to Vienna', 'Pack boots')
+    _save(test_db, test_user['telegram_id'], 'Recipes', 'Apple strudel needs cinnamon')
+    _save(test_db, OTHER_USER, 'Vienna notes', 'Visit the Prater')
+
+    assert [(r['conversation_id'], r['seq']) for r in test_db.search_conversations(test_user['telegram_id'], 'vienna')] \
+        == [(trip, 1)]
+    assert [r['title'] for r in test_db.search_conversations(test_user['telegram_id'], 'holi')] == ['Holiday plans']
+    assert '«strudel»' in test_db.search_conversations(test_user['telegram_id'], 'strudel')[0]['snippet']
+    assert test_db.search_conversations(test_user['telegram_id'], 'prater') == []
+    assert test_db.search_conversations(123, 'vienna') == []
+
+def test_search_pages_results(test_db, test_user):
+    assert test_db.add_user(dict(test_user))
+    for i in range(7):
+        _save(test_db, test_user['telegram_id'], f'Chat {i}', f'weather report {i}')
+
+    first = test_db.search_conversations(test_user['telegram_id'], 'weather', offset=0, limit=5)
+    second = test_db.search_conversations(test_user['telegram_id'], 'weather', offset=5, limit=5)
+    assert (len(first), len(second)) == (5, 2)
+    assert not {r['conversation_id'] for r in first} & {r['conversation_id'] for r in second}
+
+def test_appended_messages_are_searchable(test_db, test_user):
+    assert test_db.add_user(dict(test_user))
+    conversation_id = _save(test_db, test_user['telegram_id'], 'Chat', 'hello')
+
+    assert test_db.append_messages(conversation_id, [{'role': 'assistant', 'content': 'Try the lighthouse tour'}])
+
+    assert [(r['conversation_id'], r['seq']) for r in test_db.search_conversations(test_user['telegram_id'], 'lighthouse')] \
+        == [(conversation_id, 2)]
+
+def test_append_to_missing_conversation_is_refused(test_db):
+    assert not test_db.append_messages(404, [{'role': 'user', 'content': 'orphan'}])
+    assert _index_rows(test_db) == []
+
+def test_delete_removes_index_rows_by_rowid(test_db, test_user):
+    assert test_db.add_user(dict(test_user))
+    kept = _save(test_db, test_user['telegram_id'], 'Kept', 'kept message')
+    deleted = _save(test_db, test_user['telegram_id'], 'Deleted', 'first', 'second')
+    statements = []
+
+    @event.listens_for(test_db.engine, 'before_cursor_execute')
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith('DELETE FROM conversation_search'):
+            statements.append(statement)
+
+    assert test_db.delete_conversation(test_user['telegram_id'], deleted)
+
+    assert statements == ['DELETE FROM conversation_search WHERE rowid = ?']
+    assert {row.conversation_id for row in _index_rows(test_db)} == {kept}
+    assert test_db.search_conversations(test_user['telegram_id'], 'second') == []
+
+def test_index_is_rebuilt_with_rowids(test_db, test_user):
+    assert test_db.add_user(dict(test_user))
+    conversation_id = _save(test_db, test_user['telegram_id'], 'Chat', 'hello', 'world')
+    expected = _index_rows(test_db)
+    # An index written before rows were keyed by rowid
+    with test_db.engine.begin() as connection:
+        connection.execute(text("DELETE FROM conversation_search"))
+        connection.execute(text(
+            "INSERT INTO conversation_search (title, content, owner, conversation_id, seq) "
+            "VALUES ('Chat', '', 'u1', :id, 0)"
+        ), {'id': conversation_id})
+        connection.execute(text("PRAGMA user_version = 2"))
+
+    restarted = Database()
+    restarted.setup()
+    rows = _index_rows(restarted)
+    restarted.close()
+
+    assert rows == expected
+    assert [row.rowid for row in rows][0] == -conversation_id
@@ -0,0 +1,69 @@
+import json
+from ..src.utils.session_store import ConversationStore
+
+def _conversation(text: str) -> dict:
+    return {'messages': [{'role': 'user', 'content': text}], 'message_count': 1}
+
+def _size(text: str) -> int:
+    return len(json.dumps(_conversation(text)))
+
+def test_least_recently_used_is_spilled_over_budget(tmp_path):
+    store = ConversationStore(str(tmp_path / 'sessions.db'), memory_budget=_size('x' * 100) * 2)
+    for user_id in (1, 2):
+        store[user_id] = _conversation('x' * 100)
+    store[1]  # 2 is now the least recently used
+
+    store[3] = _conversation('x' * 100)
+
+    stats = store.stats()
+    assert (stats['resident_count'], stats['spills']) == (2, 1)
+    assert stats['resident_bytes'] <= store.memory_budget
+    assert 2 not in store._resident and 2 in store
+    assert len(store) == 3
+
+def test_spilled_conversation_reloads_with_its_changes(tmp_path):
+    store = ConversationStore(str(tmp_path / 'sessions.db'), memory_budget=_size('x' * 100))
+    store[1] = _conversation('first')
+    store[1]['messages'].append({'role': 'assistant', 'content': 'answer'})
+    store.touch(1)
+    store[2] = _conversation('x' * 100)  # Spills 1
+
+    assert 1 not in store._resident
+    assert [m['content'] for m in store[1]['messages']] == ['first', 'answer']
+    assert store.stats()['reloads'] == 1
+    assert 1 in store._resident and 2 not in store._resident
+
+def test_flushed_conversations_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    store = ConversationStore(path, memory_budget=10 ** 6)
+    store[1] = _conversation('kept')
+    store.flush()
+
+    restarted = ConversationStore(path, memory_budget=10 ** 6)
+
+    assert 1 in restarted and len(restarted) == 1
+    assert restarted[1]['messages'][0]['content'] == 'kept'
+    del restarted[1]
+    assert 1 not in restarted
+
+def test_pinned_conversation_is_not_spilled(tmp_path):
+    store = ConversationStore(str(tmp_path / 'sessions.db'), memory_budget=_size('x' * 100))
+    store[1] = _conversation('x' * 100)
+
+    with store.use(1) as conv:
+        store[2] = _conversation('x' * 100)  # Another user pushes the store over budget
+        assert 1 in store._resident and 2 not in store._resident
+        conv['messages'].append({'role': 'assistant', 'content': 'kept while pinned'})
+        store.touch(1)
+
+    # Unpinned: back under the capacity bound, and the change was not lost
+    assert store.stats()['resident_bytes'] <= store.memory_budget
+    assert store[1]['messages'][-1]['content'] == 'kept while pinned'
+
+def test_idle_conversations_are_spilled(tmp_path):
+    store = ConversationStore(str(tmp_path / 'sessions.db'), memory_budget=10 ** 6, idle_timeout=0)
+    store[1] = _conversation('idle')
+
+    store.touch(1)
+
+    assert store.stats()['resident_count'] == 0 and 1 in store
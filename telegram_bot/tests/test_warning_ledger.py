@@ -0,0 +1,121 @@
+import threading
+import pytest
+from . import test_db
+from ..src.utils import warning_ledger
+from ..src.utils.warning_ledger import WarningLedger
+
+CHAT = -100
+DAY = 86400
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def ledger(test_db):
+    ledger = WarningLedger(test_db, half_life=7 * DAY, flush_interval=3600)
+    yield ledger
+    ledger.close()
+
+def test_scores_halve_every_half_life(test_db, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(warning_ledger, 'time', clock)
+    ledger = WarningLedger(test_db, half_life=7 * DAY, flush_interval=3600, refresh_interval=10 ** 9)
+
+    assert ledger.add(CHAT, 1) == 1.0
+    assert ledger.add(CHAT, 1) == 2.0
+    clock.now += 7 * DAY
+    assert ledger.get(CHAT, 1) == pytest.approx(1.0)
+    ledger.flush()
+    clock.now += 7 * DAY
+    assert ledger.add(CHAT, 1) == pytest.approx(1.5)
+    ledger.close()
+
+def test_increments_are_flushed_in_one_batch(ledger, test_db):
+    for user_id in (1, 2, 3):
+        ledger.add(CHAT, user_id)
+    ledger.add(CHAT, 1)
+    assert test_db.get_group_warning(CHAT, 1) is None  # Nothing written before the flush
+
+    ledger.flush()
+
+    stats = ledger.get_stats()
+    assert (stats['flushes'], stats['flushed_rows']) == (1, 3)
+    assert test_db.get_group_warning(CHAT, 1)[0] == pytest.approx(2.0, abs=1e-3)
+    assert ledger.get(CHAT, 1) == pytest.approx(2.0, abs=1e-3)
+    assert ledger.count(CHAT) == 3
+    ledger.flush()
+    assert ledger.get_stats()['flushes'] == 1  # Nothing pending, nothing written
+
+def test_reset_is_flushed(ledger, test_db):
+    ledger.add(CHAT, 1)
+    ledger.flush()
+
+    ledger.reset(CHAT, 1)
+    ledger.flush()
+
+    assert test_db.get_group_warning(CHAT, 1)[0] == 0
+    assert ledger.count(CHAT) == 0
+
+def test_warnings_of_other_workers_are_merged(test_db):
+    first = WarningLedger(test_db, half_life=7 * DAY, flush_interval=3600, refresh_interval=0)
+    second = WarningLedger(test_db, half_life=7 * DAY, flush_interval=3600, refresh_interval=0)
+    first.add(CHAT, 1)
+    second.add(CHAT, 1)
+    first.flush()
+    second.flush()
+
+    assert first.get(CHAT, 1) == pytest.approx(2.0, abs=1e-3)
+    first.close()
+    second.close()
+
+def _blocking_reads(test_db, monkeypatch, user_id: int):
+    """Hold reads of one user's score until released; other reads go through"""
+    reading, release = threading.Event(), threading.Event()
+    read = test_db.get_group_warning
+
+    def blocked(chat_id, other_id):
+        stored = read(chat_id, other_id)
+        if other_id == user_id:
+            reading.set()
+            assert release.wait(5)
+        return stored
+
+    monkeypatch.setattr(test_db, 'get_group_warning', blocked)
+    return reading, release
+
+def test_database_reads_do_not_hold_the_lock(ledger, test_db, monkeypatch):
+    reading, release = _blocking_reads(test_db, monkeypatch, user_id=1)
+    slow = threading.Thread(target=ledger.get, args=(CHAT, 1))
+    slow.start()
+    assert reading.wait(5)
+
+    warned = threading.Thread(target=ledger.add, args=(CHAT, 2))
+    warned.start()
+    warned.join(1)
+    finished_while_reading = not warned.is_alive()
+    release.set()
+    slow.join(5)
+    warned.join(5)
+
+    assert finished_while_reading
+    assert ledger.get(CHAT, 2) == pytest.approx(1.0)
+
+def test_flush_during_a_read_keeps_the_increment(test_db, monkeypatch):
+    ledger = WarningLedger(test_db, half_life=7 * DAY, flush_interval=3600, refresh_interval=0)
+    ledger.add(CHAT, 1)
+    reading, release = _blocking_reads(test_db, monkeypatch, user_id=1)
+    scores = []
+    slow = threading.Thread(target=lambda: scores.append(ledger.get(CHAT, 1)))
+    slow.start()
+    assert reading.wait(5)
+
+    ledger.flush()  # Moves the pending warning into the stored score while the old row is being read
+    release.set()
+    slow.join(5)
+
+    assert scores == [pytest.approx(1.0, abs=1e-3)]
+    ledger.close()
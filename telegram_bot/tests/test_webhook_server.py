@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from ..src.utils.webhook_server import WebhookServer
+
+UPDATE = {'update_id': 1, 'message': {'message_id': 1, 'date': 0, 'chat': {'id': 5, 'type': 'private'}, 'text': 'hi'}}
+
+def _post_with_headers(server: WebhookServer, headers_list: list) -> list:
+    async def scenario():
+        server._queues = [asyncio.Queue()]
+        app = web.Application()
+        app.router.add_post(server.path, server.handle_update)
+        async with TestClient(TestServer(app)) as client:
+            statuses = []
+            for headers in headers_list:
+                response = await client.post(server.path, json=UPDATE, headers=headers)
+                statuses.append(response.status)
+            return statuses
+
+    return asyncio.run(scenario())
+
+def test_missing_or_wrong_secret_is_rejected():
+    server = WebhookServer(MagicMock(), 'configured-secret')
+
+    statuses = _post_with_headers(server, [
+        {},
+        {WebhookServer.SECRET_HEADER: 'wrong-secret'},
+        {WebhookServer.SECRET_HEADER: 'configured-secret'}
+    ])
+
+    assert statuses == [403, 403, 200]
+    assert (server.stats['rejected'], server.stats['received']) == (2, 1)
+
+def test_empty_secret_is_replaced_by_a_generated_one():
+    server = WebhookServer(MagicMock(), '')
+
+    statuses = _post_with_headers(server, [{}, {WebhookServer.SECRET_HEADER: ''}])
+
+    assert server.generated_secret and len(server.secret_token) >= 32
+    assert statuses == [403, 403]
+
+def test_empty_secret_without_webhook_url_refuses_to_start():
+    server = WebhookServer(MagicMock(), '')
+
+    with pytest.raises(ValueError):
+        asyncio.run(server.start())
+    server.engine._setup_loop_state.assert_not_called()
@@ -0,0 +1,37 @@
+import pytest
+from . import test_db, test_user
+from ..src.config import config
+
+@pytest.fixture
+def write_behind_db(test_db, test_user, monkeypatch):
+    # Hold each batch open for a second, well after the caller changes its copy
+    monkeypatch.setattr(config, 'DB_WRITE_FLUSH_MS', 1000)
+    monkeypatch.setattr(config, 'DB_WRITE_BATCH_SIZE', 1000)
+    assert test_db.add_user(dict(test_user))
+    test_db.enable_write_behind()
+    yield test_db
+    test_db.shutdown()
+
+def test_saved_conversation_is_a_snapshot(write_behind_db, test_user):
+    conversation = {'messages': [{'role': 'user', 'content': 'first'}]}
+
+    assert write_behind_db.save_conversation(test_user['telegram_id'], 'Title', conversation)
+    conversation['messages'].append({'role': 'assistant', 'content': 'added after saving'})
+    conversation['messages'][0]['content'] = 'edited after saving'
+    write_behind_db.flush_writes()
+
+    saved = write_behind_db.get_saved_conversations(test_user['telegram_id'])
+    messages = write_behind_db.get_conversation_messages(test_user['telegram_id'], saved[0]['id'])
+    assert [m['content'] for m in messages] == ['first']
+
+def test_update_of_missing_user_fails(write_behind_db, test_user):
+    assert not write_behind_db.update_user(987654321, {'referral_count': 3})
+    assert not write_behind_db.save_conversation(987654321, 'Title', {'messages': []})
+
+    settings = {'language': 'en'}
+    assert write_behind_db.update_user(test_user['telegram_id'], {'referral_count': 3, 'settings': settings})
+    settings['language'] = 'changed after updating'
+    write_behind_db.flush_writes()
+
+    user = write_behind_db.get_user(test_user['telegram_id'])
+    assert (user['referral_count'], user['settings']) == (3, {'language': 'en'})